@@ -7,12 +7,25 @@ import logging
 from typing import Dict, Any, Optional
 from abc import ABC, abstractmethod
 
+from django.conf import settings
+
+from ..services.deepseek import ERROR_RESPONSE
+from ..services.prompt_builder import PromptBuilder
+from ..services.response_cache import get_response_cache
+
 logger = logging.getLogger(__name__)
 
 
 class BaseAgent(ABC):
     """Base class for all specialized agents"""
     
+    # LLM response cache TTL in seconds; None disables caching for the agent
+    response_cache_ttl: Optional[int] = None
+    
+    # Prompt token budget (None = LLM_PROMPT_TOKEN_BUDGET) and max history turns
+    prompt_token_budget: Optional[int] = None
+    history_turns = 5
+    
     def __init__(self, deepseek_service, memory_service=None):
         self.deepseek = deepseek_service
         self.memory = memory_service
@@ -36,32 +49,37 @@ class BaseAgent(ABC):
         raise NotImplementedError(f"{self.agent_name} must implement get_system_prompt()")
     
     def build_messages(self, lead, message: str, context: Dict[str, Any]) -> list:
-        """Build message list for DeepSeek API"""
+        """Build message list for DeepSeek API within the agent's token budget"""
         system_prompt = self.get_system_prompt(lead, context)
         
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history if available
-        if self.memory:
-            history = self.memory.get_conversation_history(lead.telegram_id)
-            for msg in history[-5:]:  # Last 5 messages for context
-                messages.append({"role": "user", "content": msg["user"]})
-                messages.append({"role": "assistant", "content": msg["assistant"]})
-        
-        # Add current message
-        messages.append({"role": "user", "content": message})
-        
-        return messages
+        history = self.memory.get_conversation_history(lead.telegram_id) if self.memory else []
+        builder = PromptBuilder(
+            self.prompt_token_budget or settings.LLM_PROMPT_TOKEN_BUDGET,
+            max_turns=self.history_turns,
+            summary_store=self.memory,
+        )
+        return builder.build(system_prompt, history, message, conversation_id=lead.telegram_id)
     
     def call_ai(self, messages: list, temperature: float = 0.7) -> str:
-        """Call DeepSeek API with messages"""
+        """Call DeepSeek API with messages (through the response cache if enabled for this agent)"""
+        cache = get_response_cache() if self.response_cache_ttl else None
+        cache_key = None
+        if cache:
+            cache_key = cache.make_key(self.agent_name, temperature, messages)
+            cached = cache.get(self.agent_name, cache_key)
+            if cached is not None:
+                return cached
+        
         try:
             response = self.deepseek.chat_completion(messages, temperature)
             logger.debug(f"{self.agent_name} AI response: {response[:200]}...")
-            return response
         except Exception as e:
             logger.error(f"{self.agent_name} AI call failed: {e}")
-            return "Извините, произошла техническая ошибка. Попробуйте позже."
+            return ERROR_RESPONSE
+        
+        if cache and response and response != ERROR_RESPONSE:
+            cache.set(cache_key, response, self.response_cache_ttl)
+        return response
     
     def extract_context_data(self, lead) -> Dict[str, Any]:
         """Extract relevant data from lead for context"""
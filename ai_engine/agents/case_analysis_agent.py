@@ -20,6 +20,9 @@ class CaseAnalysisAgent(BaseAgent):
     - Guides client toward signing contract
     """
     
+    # Won cases context plus the case story told over the last few turns
+    prompt_token_budget = 6000
+    
     def __init__(self, deepseek_service, memory_service=None):
         super().__init__(deepseek_service, memory_service)
     
@@ -17,6 +17,13 @@ class ContractAgent(BaseAgent):
     Handles data collection, contract generation, and verification
     """
     
+    # Never cache: responses carry personal data and trigger contract generation
+    response_cache_ttl = None
+    
+    # Client data is collected over many turns and must reach the contract command intact
+    prompt_token_budget = 12000
+    history_turns = 10
+    
     def process(self, lead, message: str, context: Dict[str, Any]) -> str:
         """Process message for contract workflow"""
         logger.info(f"ContractAgent processing message for lead {lead.telegram_id}")
@@ -19,6 +19,14 @@ class IntakeAgent(BaseAgent):
     Uses knowledge base for accurate article matching
     """
     
+    # First-contact questions repeat a lot - cache answers for 6 hours
+    response_cache_ttl = 3600 * 6
+    
+    # ~3.7k-token knowledge base prompt; first contact needs little history,
+    # and a shorter history makes cached answers more reusable
+    prompt_token_budget = 6000
+    history_turns = 3
+    
     def __init__(self, deepseek_service, memory_service=None):
         super().__init__(deepseek_service, memory_service)
         self.kb = get_knowledge_base()
@@ -0,0 +1,154 @@
+"""
+Local intent classifier
+Multinomial naive Bayes over character n-grams, trained from stored
+conversations and serialized to JSON. Pure Python: inference is a few
+hundred dict lookups, well under a millisecond for chat-sized messages.
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def char_ngrams(text: str, sizes: Tuple[int, ...] = (2, 3, 4), max_chars: int = 400) -> List[str]:
+    """Character n-grams of each word, with word boundaries marked by spaces"""
+    grams = []
+    for word in NON_WORD_RE.split(text.lower()[:max_chars]):
+        if not word:
+            continue
+        padded = f" {word} "
+        for size in sizes:
+            grams.extend(padded[i:i + size] for i in range(len(padded) - size + 1))
+    return grams
+
+
+class IntentClassifier:
+    """Char n-gram naive Bayes over agent labels"""
+
+    def __init__(self, labels: List[str], log_priors: List[float], log_likelihoods: Dict[str, List[float]],
+                 samples: int = 0):
+        self.labels = labels
+        self.log_priors = log_priors
+        self.log_likelihoods = log_likelihoods
+        self.samples = samples
+
+    @classmethod
+    def train(cls, samples: Iterable[Tuple[str, str]], alpha: float = 0.5) -> "IntentClassifier":
+        """Fit on (message, agent) pairs"""
+        label_counts: Counter = Counter()
+        gram_counts: Dict[str, Counter] = defaultdict(Counter)
+        for text, label in samples:
+            label_counts[label] += 1
+            gram_counts[label].update(char_ngrams(text))
+
+        labels = sorted(label_counts)
+        if len(labels) < 2:
+            raise ValueError("Need samples for at least two agents")
+        total = sum(label_counts.values())
+        vocabulary = set().union(*(gram_counts[label] for label in labels))
+
+        log_priors = [math.log(label_counts[label] / total) for label in labels]
+        denominators = [sum(gram_counts[label].values()) + alpha * len(vocabulary) for label in labels]
+        log_likelihoods = {
+            gram: [math.log((gram_counts[label][gram] + alpha) / d) for label, d in zip(labels, denominators)]
+            for gram in vocabulary
+        }
+        return cls(labels, log_priors, log_likelihoods, samples=total)
+
+    def predict_proba(self, text: str, candidates: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Posterior per label (optionally restricted to candidate labels)"""
+        indexes = [i for i, label in enumerate(self.labels) if candidates is None or label in candidates]
+        if not indexes:
+            return {}
+        scores = [self.log_priors[i] for i in indexes]
+        for gram in char_ngrams(text):
+            row = self.log_likelihoods.get(gram)
+            if row is None:
+                continue  # Unknown n-grams carry no evidence
+            for position, i in enumerate(indexes):
+                scores[position] += row[i]
+        top = max(scores)
+        weights = [math.exp(score - top) for score in scores]
+        total = sum(weights)
+        return {self.labels[i]: weight / total for i, weight in zip(indexes, weights)}
+
+    def predict(self, text: str, candidates: Optional[Iterable[str]] = None) -> Tuple[Optional[str], float]:
+        """Best label and its probability"""
+        probabilities = self.predict_proba(text, candidates)
+        if not probabilities:
+            return None, 0.0
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+    def accuracy(self, samples: Iterable[Tuple[str, str]]) -> float:
+        samples = list(samples)
+        if not samples:
+            return 0.0
+        return sum(self.predict(text)[0] == label for text, label in samples) / len(samples)
+
+    # Serialization
+    def to_dict(self) -> Dict:
+        return {
+            "labels": self.labels,
+            "log_priors": self.log_priors,
+            "log_likelihoods": self.log_likelihoods,
+            "samples": self.samples,
+        }
+
+    def save(self, path: str):
+        """Write atomically so running workers never read a half-written model"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+def split_samples(samples: List[Tuple[str, str]], holdout: float = 0.2, seed: int = 42):
+    """Shuffle and split into (train, test)"""
+    samples = list(samples)
+    random.Random(seed).shuffle(samples)
+    cut = int(len(samples) * (1 - holdout))
+    return samples[:cut], samples[cut:]
+
+
+_classifier = None
+_classifier_mtime = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    """Get process-wide classifier; reloads when the model file changes, None if not trained"""
+    global _classifier, _classifier_mtime
+    path = str(settings.INTENT_CLASSIFIER_PATH)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _classifier is None or mtime != _classifier_mtime:
+        with _classifier_lock:
+            if _classifier is None or mtime != _classifier_mtime:
+                try:
+                    _classifier = IntentClassifier.load(path)
+                    _classifier_mtime = mtime
+                    logger.info(f"Loaded intent classifier ({_classifier.samples} samples, labels {_classifier.labels})")
+                except Exception as e:
+                    logger.error(f"Failed to load intent classifier: {str(e)}")
+                    return None
+    return _classifier
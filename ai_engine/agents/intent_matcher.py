@@ -0,0 +1,55 @@
+"""
+Compiled multi-pattern keyword matcher
+Compiles keyword tables once into a single trie-shaped alternation, so
+every matching label is found in one pass over the text.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+from ai_engine.data.keyword_index import trie_pattern
+
+
+class IntentMatcher:
+    """
+    Match many keywords at once and return the labels they belong to
+
+    Keywords are lowercase substrings; entries starting with \\b are
+    regular expressions. Literal keywords are compiled into one
+    prefix-factored regex: a search returns the longest keyword at the
+    leftmost position (standing for the shorter keywords it starts with),
+    and the next search starts one character later so overlapping keywords
+    are found too. Cost grows with the text, not the keyword count.
+    Regex keywords (few) are searched separately.
+    """
+
+    def __init__(self, tables: Dict[str, Iterable[str]]):
+        labels: Dict[str, set] = {}
+        for label, keywords in tables.items():
+            for keyword in keywords:
+                labels.setdefault(keyword, set()).add(label)
+
+        literals = [keyword for keyword in labels if not keyword.startswith(r'\b')]
+        # keyword -> labels of the keyword and of every literal it starts with
+        self._closure: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset().union(*(labels[other] for other in literals if keyword.startswith(other)))
+            for keyword in literals
+        }
+        self._regex = re.compile(trie_pattern(literals)) if literals else None
+        self._patterns: List[Tuple[re.Pattern, FrozenSet[str]]] = [
+            (re.compile(keyword), frozenset(found)) for keyword, found in labels.items() if keyword.startswith(r'\b')
+        ]
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """All labels with at least one keyword in text"""
+        found = set()
+        if self._regex is not None:
+            search = self._regex.search
+            match = search(text)
+            while match:
+                found |= self._closure[match.group()]
+                match = search(text, match.start() + 1)
+        for pattern, labels in self._patterns:
+            if pattern.search(text):
+                found |= labels
+        return frozenset(found)
@@ -5,15 +5,27 @@ Routes messages to appropriate specialized agents
 
 import logging
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, NamedTuple, Optional
+
+from django.conf import settings
+
+from .intent_classifier import get_intent_classifier
+from .intent_matcher import IntentMatcher
 
 logger = logging.getLogger(__name__)
 
 
+class Route(NamedTuple):
+    """Routing decision: agent type and the rule that chose it (Conversation.route_reason)"""
+    agent: str
+    reason: str
+
+
 class AgentOrchestrator:
     """
     Lightweight orchestrator for routing messages to agents
-    Uses keyword-based routing first (no API call), AI classification only when needed
+    Uses keyword-based routing first (no API call); a local classifier
+    trained on past conversations settles ambiguous or keyword-less messages
     """
     
     # Keyword patterns for intent detection
@@ -44,6 +56,38 @@ class AgentOrchestrator:
         ],
     }
     
+    # Explicit intents in priority order
+    INTENT_PRIORITY = ['contract', 'case_analysis', 'petition', 'pricing']
+    
+    # Stage hints checked when the case is known but not yet priced
+    STAGE_KEYWORDS = {
+        'pricing_question': ['сколько', 'цена', 'стоимость', 'оплата', 'платить'],
+        'ready_after_value': ['спасибо за ходатайство', 'что дальше', 'дальше что', 'берем', 'давайте'],
+    }
+    
+    # Phrases in the last AI reply that mean we are collecting data for a flow
+    HISTORY_KEYWORDS = {
+        # AI recently asked for PETITION data (ФИО, адрес, город for ходатайство)
+        'petition': [
+            'для ходатайства нужно', 'для подготовки ходатайства',
+            'напишите эти данные', 'фио полностью', 'адрес регистрации', 'город (где было нарушение)',
+            'подготовлю ходатайство', 'бесплатно подготовлю'
+        ],
+        # AI recently asked for CONTRACT data (паспорт, дата рождения, инстанция)
+        'contract': [
+            'для договора нужны', 'паспортные данные', 'дата рождения',
+            'серия и номер паспорта', 'договор готовлю', 'данные для договора',
+            'инстанция суда', 'личное присутствие в суде'
+        ],
+    }
+    
+    VERIFICATION_CODE_RE = re.compile(r'^\d{6}$')
+    
+    # Compiled once per process, shared by all instances (only the tables routing consults)
+    _message_matcher = IntentMatcher(dict(zip(INTENT_PRIORITY, map(INTENT_KEYWORDS.get, INTENT_PRIORITY))))
+    _stage_matcher = IntentMatcher(STAGE_KEYWORDS)
+    _history_matcher = IntentMatcher(HISTORY_KEYWORDS)
+    
     def __init__(self):
         logger.info("AgentOrchestrator initialized")
     
@@ -52,79 +96,72 @@ class AgentOrchestrator:
         Route message to appropriate agent
         Returns agent name: 'intake', 'pricing', 'contract', 'petition'
         """
+        return self.route(lead, message, context).agent
+    
+    def route(self, lead, message: str, context: Dict[str, Any]) -> Route:
+        """Route message and report which rule decided"""
         message_lower = message.lower().strip()
         
         # Priority 1: Verification code (6 digits)
         if self._is_verification_code(message):
             logger.info("Detected verification code - routing to contract agent")
-            return 'contract'
+            return Route('contract', 'verification')
         
         # Priority 2: Check conversation history for context
         conversation_history = context.get('conversation_history', [])
         if conversation_history:
-            last_ai_message = conversation_history[-1].get('assistant', '').lower() if conversation_history else ''
-            
-            # Check if AI recently asked for PETITION data (ФИО, адрес, город for ходатайство)
-            petition_data_keywords = [
-                'для ходатайства нужно', 'для подготовки ходатайства', 
-                'напишите эти данные', 'фио полностью', 'адрес регистрации', 'город (где было нарушение)',
-                'подготовлю ходатайство', 'бесплатно подготовлю'
-            ]
-            if any(keyword in last_ai_message for keyword in petition_data_keywords):
+            last_ai_message = conversation_history[-1].get('assistant', '').lower()
+            flows = self._history_matcher.match(last_ai_message)
+            if 'petition' in flows:
                 # User is responding with petition data - route to petition agent
                 logger.info("Continuing petition flow - user providing data for ходатайство")
-                return 'petition'
-            
-            # Check if AI recently asked for CONTRACT data (паспорт, дата рождения, инстанция)
-            contract_data_keywords = [
-                'для договора нужны', 'паспортные данные', 'дата рождения',
-                'серия и номер паспорта', 'договор готовлю', 'данные для договора',
-                'инстанция суда', 'личное присутствие в суде'
-            ]
-            if any(keyword in last_ai_message for keyword in contract_data_keywords):
+                return Route('petition', 'history')
+            if 'contract' in flows:
                 # User is responding with contract data - stay in contract flow
                 logger.info("Continuing contract flow - user providing data")
-                return 'contract'
+                return Route('contract', 'history')
         
-        # Priority 3: Explicit contract request
-        if self._matches_keywords(message_lower, self.INTENT_KEYWORDS['contract']):
-            logger.info("Detected contract intent via keywords")
-            return 'contract'
+        # One pass over the message finds every intent; priority is applied afterwards
+        intents = self._message_matcher.match(message_lower)
         
-        # Priority 4: Case analysis request (win probability, examples)
-        if self._matches_keywords(message_lower, self.INTENT_KEYWORDS['case_analysis']):
-            logger.info("Detected case analysis intent via keywords")
-            return 'case_analysis'
+        # Priority 3-6: contract, case analysis, petition, pricing
+        matched = [intent for intent in self.INTENT_PRIORITY if intent in intents]
+        if len(matched) > 1 and matched[0] != 'contract':
+            # Keywords of several agents: let the classifier choose among them
+            # (an explicit contract request always keeps its priority)
+            classified = self._classify(message, candidates=matched)
+            if classified:
+                return Route(classified, 'classifier')
+        if matched:
+            logger.info(f"Detected {matched[0]} intent via keywords")
+            return Route(matched[0], 'keywords')
         
-        # Priority 5: Petition request
-        if self._matches_keywords(message_lower, self.INTENT_KEYWORDS['petition']):
-            logger.info("Detected petition intent via keywords")
-            return 'petition'
-        
-        # Priority 6: Pricing query
-        if self._matches_keywords(message_lower, self.INTENT_KEYWORDS['pricing']):
-            logger.info("Detected pricing intent via keywords")
-            return 'pricing'
-        
-        # Priority 6: Check conversation stage
+        # Priority 7: Check conversation stage
         # Stay in intake for document collection and consultation
         # Only move to pricing when client explicitly asks or after value is shown
         if lead.case_type and not lead.estimated_cost:
+            # Stage tables are only scanned when no explicit intent matched
+            stages = self._stage_matcher.match(message_lower)
+            
             # Check if client is asking about price/cost
-            pricing_triggers = ['сколько', 'цена', 'стоимость', 'оплата', 'платить']
-            if any(word in message_lower for word in pricing_triggers):
+            if 'pricing_question' in stages:
                 logger.info("Explicit pricing question - routing to pricing")
-                return 'pricing'
+                return Route('pricing', 'stage')
             
             # Check if client is ready after receiving value (thanks, what next, etc)
-            ready_phrases = ['спасибо за ходатайство', 'что дальше', 'дальше что', 'берем', 'давайте']
-            if any(phrase in message_lower for phrase in ready_phrases):
+            if 'ready_after_value' in stages:
                 logger.info("Client ready after value - routing to pricing")
-                return 'pricing'
+                return Route('pricing', 'stage')
             
             # Otherwise stay in intake for document collection and consultation
             logger.info("Staying in intake for document collection and consultation")
-            return 'intake'
+            return Route('intake', 'stage')
+        
+        # No keywords: classifier may recognize a paraphrase
+        # Never contract: a contract needs an explicit request (keywords or flow)
+        classified = self._classify(message, require_intake=True)
+        if classified and classified not in ('intake', 'contract'):
+            return Route(classified, 'classifier')
         
         # Only route to contract if client EXPLICITLY wants contract
         # Don't route just because lead is HOT - that's too early!
@@ -132,23 +169,32 @@ class AgentOrchestrator:
         
         # Default: Intake agent for case analysis
         logger.info("No specific intent detected - routing to intake agent")
-        return 'intake'
+        return Route('intake', 'default')
     
-    def _matches_keywords(self, message: str, keywords: list) -> bool:
-        """Check if message matches any keyword patterns"""
-        for keyword in keywords:
-            if keyword.startswith(r'\b'):  # Regex pattern
-                if re.search(keyword, message):
-                    return True
-            else:  # Simple substring match
-                if keyword in message:
-                    return True
-        return False
+    def _classify(self, message: str, candidates: Optional[list] = None, require_intake: bool = False) -> Optional[str]:
+        """
+        Local classifier prediction if confident enough, else None
+        require_intake: abstain unless the model knows 'intake'; without that class
+        naive Bayes confidently pushes greetings and case stories to another agent
+        """
+        classifier = get_intent_classifier()
+        if classifier is None:
+            return None
+        if require_intake and 'intake' not in classifier.labels:
+            return None
+        try:
+            agent_type, confidence = classifier.predict(message, candidates)
+        except Exception as e:
+            logger.error(f"Intent classifier failed: {str(e)}")
+            return None
+        if agent_type and confidence >= settings.INTENT_CLASSIFIER_MIN_CONFIDENCE:
+            logger.info(f"Classifier routed to {agent_type} ({confidence:.2f})")
+            return agent_type
+        return None
     
     def _is_verification_code(self, message: str) -> bool:
         """Check if message is a 6-digit verification code"""
-        message_clean = message.strip()
-        return bool(re.match(r'^\d{6}$', message_clean))
+        return bool(self.VERIFICATION_CODE_RE.match(message.strip()))
     
     def get_agent_name(self, agent_type: str) -> str:
         """Get full agent class name from type"""
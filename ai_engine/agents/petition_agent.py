@@ -19,6 +19,13 @@ class PetitionAgent(BaseAgent):
     Uses knowledge base templates for accurate legal formatting
     """
     
+    # Never cache: petitions are built from the client's personal data
+    response_cache_ttl = None
+    
+    # Room for the template context, the collected details and a full petition draft in history
+    prompt_token_budget = 12000
+    history_turns = 8
+    
     PETITION_TYPES = {
         'возврат прав': 'return_license',
         'перенос суд': 'postpone_hearing',
@@ -18,6 +18,12 @@ class PricingAgent(BaseAgent):
     Shows client the financial benefit of legal representation
     """
     
+    # Cost questions repeat, but answers quote the pricing tables - keep them for 1 hour only
+    response_cache_ttl = 3600
+    
+    # Pricing tables are ~1.1k tokens; the answer depends on the recent case details only
+    prompt_token_budget = 4000
+    
     def __init__(self, deepseek_service, memory_service=None):
         super().__init__(deepseek_service, memory_service)
         self.pricing_data = analytics.load_pricing_data()
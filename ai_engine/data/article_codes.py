@@ -0,0 +1,45 @@
+"""
+Article code parsing
+Every article code format used in the project ("ч.1 ст.12.8 КоАП РФ",
+"ст. 12.8", "12.8", "12.8ч.1", "ст.264.1 УК РФ") is reduced to one
+canonical key: "12.8ч.1" / "12.8" for КоАП, "УК:264.1" for the criminal code.
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+ARTICLE_RE = re.compile(r'(\d+(?:\.\d+)+)')
+PART_RE = re.compile(r'(?<![а-яё])ч(?:асть|асти|\.)?\s*(\d+)(?!\.\d)', re.IGNORECASE)
+CRIMINAL_CODE_RE = re.compile(r'\bУК\b')
+
+
+class ArticleCode(NamedTuple):
+    number: str  # '12.8'
+    part: Optional[str]  # '1'
+    codex: str  # 'КоАП' or 'УК'
+
+    @property
+    def key(self) -> str:
+        key = f"{self.number}ч.{self.part}" if self.part else self.number
+        return key if self.codex == 'КоАП' else f"{self.codex}:{key}"
+
+
+@lru_cache(maxsize=4096)
+def parse_article_code(code: str) -> Optional[ArticleCode]:
+    """Parse any supported article code format; None if it has no article number"""
+    # The part may precede or follow the article number, so it is searched
+    # with the number blanked out ("ч.1 ст.12.8" and "12.8ч.1")
+    article = ARTICLE_RE.search(code)
+    if not article:
+        return None
+    rest = code[:article.start()] + ' ' + code[article.end():]
+    part = PART_RE.search(rest)
+    codex = 'УК' if CRIMINAL_CODE_RE.search(code) else 'КоАП'
+    return ArticleCode(article.group(1), part.group(1) if part else None, codex)
+
+
+def canonical_article_key(code: str) -> Optional[str]:
+    """'ч.1 ст.12.8 КоАП РФ' -> '12.8ч.1', 'ст. 8.23' -> '8.23', 'ст.264.1 УК РФ' -> 'УК:264.1'"""
+    parsed = parse_article_code(code)
+    return parsed.key if parsed else None
@@ -0,0 +1,73 @@
+"""
+Inverted keyword index
+Maps lowercased keywords to the ids of the documents that list them and
+finds every keyword present in a text with one regex pass. The keywords
+are compiled into a trie-shaped pattern, so scanning cost depends on the
+text length, not on how many documents or keywords are indexed.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Regex matching any of `words`, factored by common prefixes (longest alternative first)"""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie)
+
+
+class KeywordIndex:
+    """Keyword -> document ids, with a single-pass scanner"""
+
+    def __init__(self, documents: Iterable[Tuple[Hashable, Iterable[str]]] = ()):
+        # keyword -> ids, one entry per listing (duplicates in a list count twice)
+        self.postings: Dict[str, List[Hashable]] = defaultdict(list)
+        for doc_id, keywords in documents:
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    self.postings[keyword].append(doc_id)
+        self._compile()
+
+    def _compile(self):
+        keywords = list(self.postings)
+        # A match at one position reports only the longest keyword there,
+        # so each keyword also stands for the shorter keywords it starts with
+        self._closure: Dict[str, Set[str]] = {
+            keyword: {other for other in keywords if keyword.startswith(other)} for keyword in keywords
+        }
+        self._regex: Optional[re.Pattern] = None
+        if keywords:
+            first_chars = ''.join(sorted({re.escape(keyword[0]) for keyword in keywords}))
+            self._regex = re.compile(f"(?=[{first_chars}])(?=({trie_pattern(keywords)}))")
+
+    def find_keywords(self, text: str) -> Set[str]:
+        """Distinct indexed keywords occurring in text (case-insensitive)"""
+        found: Set[str] = set()
+        if self._regex is None:
+            return found
+        for match in self._regex.finditer(text.lower()):
+            found |= self._closure[match.group(1)]
+        return found
+
+    def score(self, text: str) -> Dict[Hashable, int]:
+        """Number of matching keywords per document"""
+        scores: Dict[Hashable, int] = defaultdict(int)
+        for keyword in self.find_keywords(text):
+            for doc_id in self.postings[keyword]:
+                scores[doc_id] += 1
+        return scores
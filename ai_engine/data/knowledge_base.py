@@ -1,15 +1,26 @@
 """
 Knowledge Base Loader
 Loads КоАП articles and petition templates for agents
-Uses koap_fines_complete.json (128 articles) scraped from https://shtrafy-gibdd.ru/koap
-Dynamically fetches current penalties from shtrafy-gibdd.ru when needed
+Uses koap_fines_complete.json (128 articles) scraped from https://shtrafy-gibdd.ru/koap,
+hot-reloaded when the refresh pipeline publishes a newer snapshot (see koap_snapshot)
+Missing articles are scraped from shtrafy-gibdd.ru in the background (see koap_cache)
 """
 
 import json
 import logging
+import threading
+import time
 from pathlib import Path
 from typing import List, Dict, Optional
 
+from django.conf import settings
+
+from .article_codes import canonical_article_key
+from .keyword_index import KeywordIndex
+from .koap_snapshot import KoapSnapshotStore
+from .russian_stemmer import stem, tokenize
+from .search_index import fine_key_to_code, load_or_build_index
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,10 +29,19 @@ class KnowledgeBase:
     
     def __init__(self):
         self.data_dir = Path(__file__).parent
+        self.data_version = self.current_data_version()
+        self.snapshot_store = KoapSnapshotStore(settings.KOAP_SNAPSHOT_DIR)
+        self._reload_lock = threading.Lock()
+        self._next_snapshot_check = 0.0
         self.koap_articles = self._load_koap_articles()
-        self.koap_fines_complete = self._load_koap_fines_complete()
         self.petition_templates = self._load_petition_templates()
-        self.scraper = None  # Lazy load scraper
+        self.articles_by_key = {}
+        for article in self.koap_articles:
+            self._index_article(article)
+        self.keyword_index = self._build_keyword_index()
+        self.stemmed_keyword_index = self._build_keyword_index(stemmed=True)
+        self._set_fines(*self._load_koap_fines_complete())
+        self.article_cache = None  # Lazy load shared cache of scraped articles
         logger.info(f"Loaded {len(self.koap_articles)} КоАП articles, {len(self.koap_fines_complete)} complete fines, and {len(self.petition_templates)} petition templates")
     
     def _load_koap_articles(self) -> List[Dict]:
@@ -35,18 +55,72 @@ class KnowledgeBase:
             logger.error(f"Failed to load КоАП articles: {e}")
             return []
     
-    def _load_koap_fines_complete(self) -> Dict:
-        """Load complete КоАП fines database from koap_fines_complete.json (scraped from shtrafy-gibdd.ru/koap)"""
+    def _load_koap_fines_complete(self):
+        """Load current snapshot of the complete КоАП fines database (scraped from shtrafy-gibdd.ru/koap)"""
         try:
-            # Load from root directory
-            file_path = self.data_dir.parent.parent / 'koap_fines_complete.json'
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                logger.info(f"Loaded complete fines database from {file_path} - Source: {data.get('source', 'unknown')}")
-                return data.get('articles', {})
+            version, data = self.snapshot_store.load()
+            logger.info(f"Loaded complete fines database v{version} - Source: {data.get('source', 'unknown')}")
+            return version, data.get('articles', {})
         except Exception as e:
             logger.error(f"Failed to load КоАП fines complete: {e}")
-            return {}
+            return 0, {}
+    
+    def current_data_version(self) -> tuple:
+        """Modification times of the article and template files (fines reload through the snapshot store)"""
+        versions = []
+        for name in ('koap_articles.json', 'petition_templates.json'):
+            try:
+                versions.append((self.data_dir / name).stat().st_mtime_ns)
+            except OSError:
+                versions.append(None)
+        return tuple(versions)
+    
+    def search_sources(self, fines_version: int = None) -> List[Path]:
+        """Files the search index is built from"""
+        version = self.fines_version if fines_version is None else fines_version
+        return [self.data_dir / 'koap_articles.json', self.snapshot_store.path(version)]
+    
+    def search_index_path(self, fines_version: int = None) -> Path:
+        """Committed index for the baseline fines, one next to each published snapshot"""
+        version = self.fines_version if fines_version is None else fines_version
+        if not version:
+            return self.data_dir / 'koap_search_index.json'
+        return self.snapshot_store.directory / f"koap_search_index_v{version}.json"
+    
+    def _set_fines(self, version: int, fines: Dict):
+        """Swap in a fines dataset with its lookup and search indexes"""
+        fines_by_key = {canonical_article_key(key) or key: fine for key, fine in fines.items()}
+        search_index = load_or_build_index(
+            self.search_index_path(version),
+            self.search_sources(version),
+            self.koap_articles,
+            fines,
+        )
+        self.koap_fines_complete, self.fines_by_key, self.search_index = fines, fines_by_key, search_index
+        self.fines_version = version
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Hot-reload the fines database when a newer snapshot has been published
+        The snapshot pointer is checked at most every KOAP_SNAPSHOT_CHECK_INTERVAL seconds
+        """
+        now = time.monotonic()
+        if now < self._next_snapshot_check:
+            return False
+        self._next_snapshot_check = now + settings.KOAP_SNAPSHOT_CHECK_INTERVAL
+        if self.snapshot_store.current_version() == self.fines_version:
+            return False
+        with self._reload_lock:
+            try:
+                version, data = self.snapshot_store.load()
+                if version == self.fines_version:
+                    return False
+                self._set_fines(version, data.get('articles', {}))
+            except Exception as e:
+                logger.error(f"Failed to reload КоАП fines snapshot: {e}")
+                return False
+        logger.info(f"Hot-reloaded complete fines database v{version} ({len(self.koap_fines_complete)} articles)")
+        return True
     
     def _load_petition_templates(self) -> List[Dict]:
         """Load petition templates from JSON"""
@@ -59,42 +133,57 @@ class KnowledgeBase:
             logger.error(f"Failed to load petition templates: {e}")
             return []
     
+    @staticmethod
+    def _stem_text(text: str) -> str:
+        return ' '.join(stem(token) for token in tokenize(text))
+    
+    def _build_keyword_index(self, stemmed: bool = False) -> KeywordIndex:
+        """Index article keywords (raw or stemmed) by position in koap_articles"""
+        return KeywordIndex(
+            (position, self._article_keywords(article, stemmed)) for position, article in enumerate(self.koap_articles)
+        )
+    
+    def _article_keywords(self, article: Dict, stemmed: bool = False) -> List[str]:
+        keywords = article.get('keywords', [])
+        return [self._stem_text(keyword) for keyword in keywords] if stemmed else keywords
+    
+    @staticmethod
+    def _article_key(article_code: str) -> str:
+        return canonical_article_key(article_code) or article_code
+    
+    def _index_article(self, article: Dict):
+        # First article wins for a key, as with the former linear scan
+        self.articles_by_key.setdefault(self._article_key(article['article']), article)
+    
     def find_article_by_keywords(self, text: str) -> Optional[Dict]:
         """
         Find КоАП article by keywords in text
-        Returns article with highest keyword match
+        Returns article with highest keyword match (earliest article on ties).
+        Falls back to stemmed keywords so other word forms
+        ("пьяного", "опьянении") still match.
         """
-        text_lower = text.lower()
-        best_match = None
-        best_score = 0
-        
-        for article in self.koap_articles:
-            score = 0
-            keywords = article.get('keywords', [])
-            
-            for keyword in keywords:
-                if keyword.lower() in text_lower:
-                    score += 1
-            
-            if score > best_score:
-                best_score = score
-                best_match = article
+        scores = self.keyword_index.score(text)
+        if not scores:
+            scores = self.stemmed_keyword_index.score(self._stem_text(text))
+        if not scores:
+            return None
         
-        if best_match:
-            logger.info(f"Found article {best_match['article']} with score {best_score}")
+        position = min(scores, key=lambda p: (-scores[p], p))
+        best_match = self.koap_articles[position]
+        logger.info(f"Found article {best_match['article']} with score {scores[position]}")
         
         return best_match
     
     def get_article_by_code(self, article_code: str) -> Optional[Dict]:
         """
-        Get article by exact code (e.g., 'ч.1 ст.12.8 КоАП РФ')
-        First checks local cache, then complete fines database, then scrapes from shtrafy-gibdd.ru if needed
+        Get article by code in any format ('ч.1 ст.12.8 КоАП РФ', 'ст. 12.8', '12.8ч.1')
+        First checks local cache, then complete fines database, then articles scraped from shtrafy-gibdd.ru
         """
         # Try local cache first
-        for article in self.koap_articles:
-            if article['article'] == article_code:
-                logger.info(f"Found article {article_code} in local cache")
-                return article
+        article = self.articles_by_key.get(self._article_key(article_code))
+        if article:
+            logger.info(f"Found article {article_code} in local cache")
+            return article
         
         # Try complete fines database
         fine_info = self.get_fine_from_complete_db(article_code)
@@ -102,17 +191,8 @@ class KnowledgeBase:
             logger.info(f"Found article {article_code} in complete fines database")
             return fine_info
         
-        # If not found, try scraping from shtrafy-gibdd.ru
-        logger.info(f"Article {article_code} not in cache, attempting to scrape...")
-        scraped_article = self._scrape_article(article_code)
-        
-        if scraped_article:
-            # Add to cache for future use
-            self.koap_articles.append(scraped_article)
-            logger.info(f"Successfully scraped and cached article {article_code}")
-            return scraped_article
-        
-        return None
+        # Then articles scraped from shtrafy-gibdd.ru by a background task
+        return self._get_scraped_article(article_code)
     
     def get_fine_from_complete_db(self, article_code: str) -> Optional[Dict]:
         """
@@ -120,25 +200,9 @@ class KnowledgeBase:
         Converts article code like 'ч.1 ст.12.8 КоАП РФ' to '12.8ч.1'
         Source: https://shtrafy-gibdd.ru/koap
         """
-        # Extract article number from code
-        # Example: 'ч.1 ст.12.8 КоАП РФ' -> '12.8ч.1'
-        import re
-        match = re.search(r'ч\.(\d+)\s+ст\.(\d+\.\d+)', article_code)
-        if match:
-            part = match.group(1)
-            article_num = match.group(2)
-            key = f"{article_num}ч.{part}"
-        else:
-            # Try without part number: 'ст.12.8 КоАП РФ' -> '12.8'
-            match = re.search(r'ст\.(\d+\.\d+)', article_code)
-            if match:
-                key = match.group(1)
-            else:
-                return None
-        
-        # Look up in complete database
-        if key in self.koap_fines_complete:
-            fine_data = self.koap_fines_complete[key]
+        self.reload_if_changed()
+        fine_data = self.fines_by_key.get(canonical_article_key(article_code))
+        if fine_data:
             # Convert to standard format
             return {
                 'article': article_code,
@@ -154,17 +218,28 @@ class KnowledgeBase:
         
         return None
     
-    def _scrape_article(self, article_code: str) -> Optional[Dict]:
-        """Scrape article from shtrafy-gibdd.ru/koap"""
+    def _get_scraped_article(self, article_code: str) -> Optional[Dict]:
+        """
+        Get article from the shared scrape cache
+        Misses and stale entries schedule a background scrape; stale entries are still returned
+        """
         try:
-            # Lazy load scraper
-            if self.scraper is None:
-                from ai_engine.services.koap_scraper import get_koap_scraper
-                self.scraper = get_koap_scraper()
+            # Lazy load cache
+            if self.article_cache is None:
+                from ai_engine.services.koap_cache import get_koap_article_cache
+                self.article_cache = get_koap_article_cache()
             
-            return self.scraper.get_article_info(article_code)
+            cached = self.article_cache.get(article_code)
+            if cached is None or cached.stale:
+                self.article_cache.schedule_refresh(article_code)
+            if cached is None:
+                logger.info(f"Article {article_code} not cached yet, scrape scheduled")
+                return None
+            if cached.article:
+                logger.info(f"Found article {article_code} in scraped articles cache")
+            return cached.article
         except Exception as e:
-            logger.error(f"Failed to scrape article {article_code}: {e}")
+            logger.error(f"Failed to get scraped article {article_code}: {e}")
             return None
     
     def get_petition_template(self, petition_type: str) -> Optional[Dict]:
@@ -174,37 +249,30 @@ class KnowledgeBase:
                 return template
         return None
     
-    def search_articles(self, query: str) -> List[Dict]:
+    def search_articles(self, query: str, limit: Optional[int] = None) -> List[Dict]:
         """
         Search articles by query
-        Returns list of matching articles sorted by relevance
+        Returns list of matching articles sorted by BM25 relevance over stemmed
+        titles, texts, keywords and complete-database descriptions
         """
-        query_lower = query.lower()
+        self.reload_if_changed()
         results = []
+        seen = set()
+        for document, score in self.search_index.search(query):
+            if document['source'] == 'koap':
+                article = self.articles_by_key.get(self._article_key(document['key']))
+            else:
+                # Prefer the curated article when both sources describe the same code
+                article = (self.articles_by_key.get(document['key'])
+                           or self.get_fine_from_complete_db(fine_key_to_code(document['key'])))
+            if not article or article['article'] in seen:
+                continue
+            seen.add(article['article'])
+            results.append(article)
+            if limit and len(results) >= limit:
+                break
         
-        for article in self.koap_articles:
-            score = 0
-            
-            # Check title
-            if query_lower in article.get('title', '').lower():
-                score += 3
-            
-            # Check keywords
-            for keyword in article.get('keywords', []):
-                if keyword.lower() in query_lower:
-                    score += 2
-            
-            # Check full text
-            if query_lower in article.get('full_text', '').lower():
-                score += 1
-            
-            if score > 0:
-                results.append((score, article))
-        
-        # Sort by score descending
-        results.sort(key=lambda x: x[0], reverse=True)
-        
-        return [article for score, article in results]
+        return results
     
     def get_article_info_for_prompt(self, article_code: str) -> str:
         """
@@ -248,10 +316,40 @@ class KnowledgeBase:
 
 # Global knowledge base instance
 _kb_instance = None
+_kb_next_check = 0.0
+_kb_lock = threading.Lock()
 
 def get_knowledge_base() -> KnowledgeBase:
-    """Get global knowledge base instance (singleton)"""
-    global _kb_instance
+    """
+    Get global knowledge base instance (singleton)
+    Rebuilt when koap_articles.json or petition_templates.json is edited, checked at most
+    every KNOWLEDGE_RELOAD_INTERVAL seconds; requests keep using the old instance meanwhile
+    """
+    global _kb_instance, _kb_next_check
     if _kb_instance is None:
-        _kb_instance = KnowledgeBase()
+        with _kb_lock:
+            if _kb_instance is None:
+                _kb_instance = KnowledgeBase()
+                _kb_next_check = time.monotonic() + settings.KNOWLEDGE_RELOAD_INTERVAL
+    elif time.monotonic() >= _kb_next_check:
+        with _kb_lock:
+            if time.monotonic() >= _kb_next_check:
+                _kb_next_check = time.monotonic() + settings.KNOWLEDGE_RELOAD_INTERVAL
+                if _kb_instance.current_data_version() != _kb_instance.data_version:
+                    logger.info("Knowledge base data files changed, rebuilding")
+                    _kb_instance = KnowledgeBase()
     return _kb_instance
+
+
+def preload_knowledge():
+    """
+    Build the knowledge base (articles, templates, fines database and search index) and
+    won cases in the gunicorn master (--preload), so forked workers start with them
+    instead of paying the load on the first request
+    """
+    from .won_cases_db import get_won_cases_db
+
+    start = time.perf_counter()
+    get_knowledge_base()
+    get_won_cases_db()
+    logger.info(f"Preloaded knowledge base and won cases in {(time.perf_counter() - start) * 1000:.0f}ms")
@@ -0,0 +1,95 @@
+"""
+Versioned snapshots of the КоАП fines database
+Each refresh writes koap_fines_v{N}.json and then atomically repoints the
+CURRENT file at it, so readers always see a complete dataset. Before the
+first refresh the committed koap_fines_complete.json is the current dataset.
+"""
+
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = Path(__file__).resolve().parent.parent.parent / 'koap_fines_complete.json'
+
+
+def write_json_atomic(path: Path, data: Dict, indent: Optional[int] = None):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class KoapSnapshotStore:
+    """Directory of versioned fines snapshots with an atomic CURRENT pointer"""
+
+    POINTER = 'CURRENT'
+    HTTP_CACHE = 'http_cache.json'
+    KEEP = 5
+
+    def __init__(self, directory, baseline_path: Path = BASELINE_PATH):
+        self.directory = Path(directory)
+        self.baseline_path = Path(baseline_path)
+
+    @property
+    def pointer_path(self) -> Path:
+        return self.directory / self.POINTER
+
+    def path(self, version: int) -> Path:
+        """File of a published version (the baseline for version 0)"""
+        return self.directory / f"koap_fines_v{version}.json" if version else self.baseline_path
+
+    def current_version(self) -> int:
+        """Published version, 0 while the baseline file is in use"""
+        try:
+            return int(self.pointer_path.read_text().strip())
+        except (OSError, ValueError):
+            return 0
+
+    def load(self) -> Tuple[int, Dict]:
+        """(version, dataset) of the current snapshot"""
+        version = self.current_version()
+        with open(self.path(version), 'r', encoding='utf-8') as f:
+            return version, json.load(f)
+
+    def publish(self, dataset: Dict) -> int:
+        """Write dataset as the next version and make it current"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        version = self.current_version() + 1
+        dataset = dict(dataset, version=version)
+        write_json_atomic(self.path(version), dataset, indent=2)
+        tmp_pointer = f"{self.pointer_path}.tmp"
+        with open(tmp_pointer, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp_pointer, self.pointer_path)
+        logger.info(f"Published КоАП fines snapshot v{version} ({len(dataset.get('articles', {}))} articles)")
+        self._prune(version)
+        return version
+
+    def _prune(self, version: int):
+        """Keep the last KEEP snapshots and their search indexes (readers may still be loading an older one)"""
+        for path in self.directory.glob('koap_*_v*.json'):
+            match = re.fullmatch(r'koap_\w+_v(\d+)\.json', path.name)
+            if match and int(match.group(1)) <= version - self.KEEP:
+                try:
+                    path.unlink()
+                except OSError as e:
+                    logger.warning(f"Could not remove old snapshot {path}: {e}")
+
+    # Conditional GET validators, kept apart so unchanged pages do not bump the version
+    def load_http_cache(self) -> Dict:
+        try:
+            with open(self.directory / self.HTTP_CACHE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_http_cache(self, http_cache: Dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(self.directory / self.HTTP_CACHE, http_cache)
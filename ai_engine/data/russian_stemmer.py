@@ -0,0 +1,121 @@
+"""
+Russian stemmer
+Pure-Python implementation of the Snowball (Porter) Russian stemming
+algorithm: https://snowballstem.org/algorithms/russian/stemmer.html
+"""
+
+import re
+from functools import lru_cache
+from typing import List
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND_1 = ("вшись", "вши", "в")  # Must follow а/я
+PERFECTIVE_GERUND_2 = ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв")
+ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому",
+    "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")  # Must follow а/я
+PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+REFLEXIVE = ("ся", "сь")
+VERB_1 = ("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н")  # Must follow а/я
+VERB_2 = (
+    "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют",
+    "ены", "ить", "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+)
+NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях",
+    "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий", "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья",
+    "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+)
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+WORD_RE = re.compile(r"[а-яёa-z0-9]+(?:\.[0-9]+)*")
+
+
+def _regions(word: str):
+    """Start indexes of RV and R2"""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def r_after(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = r_after(0)
+    r2 = r_after(r1)
+    return rv, r2
+
+
+def _strip(word: str, rv: int, endings, after_a_ya: bool = False):
+    """Remove the longest matching ending inside RV; None if nothing matched"""
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending) and len(word) - len(ending) >= rv:
+            if after_a_ya:
+                position = len(word) - len(ending) - 1
+                if position < rv or word[position] not in "ая":
+                    continue
+            return word[:len(word) - len(ending)]
+    return None
+
+
+@lru_cache(maxsize=50000)
+def stem(word: str) -> str:
+    """Stem one lowercase Russian word; other words are returned unchanged"""
+    word = word.lower().replace("ё", "е")
+    if not re.fullmatch(r"[а-я]+", word):
+        return word
+    rv, r2 = _regions(word)
+
+    # Step 1
+    stripped = _strip(word, rv, PERFECTIVE_GERUND_1, after_a_ya=True) or _strip(word, rv, PERFECTIVE_GERUND_2)
+    if stripped is not None:
+        word = stripped
+    else:
+        word = _strip(word, rv, REFLEXIVE) or word
+        adjective = _strip(word, rv, ADJECTIVE)
+        if adjective is not None:
+            word = (_strip(adjective, rv, PARTICIPLE_1, after_a_ya=True)
+                    or _strip(adjective, rv, PARTICIPLE_2) or adjective)
+        else:
+            verb = _strip(word, rv, VERB_1, after_a_ya=True) or _strip(word, rv, VERB_2)
+            if verb is not None:
+                word = verb
+            else:
+                word = _strip(word, rv, NOUN) or word
+
+    # Step 2
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Step 3
+    for ending in DERIVATIONAL:
+        if word.endswith(ending) and len(word) - len(ending) >= r2:
+            word = word[:-len(ending)]
+            break
+
+    # Step 4
+    if word.endswith("нн") and len(word) - 2 >= rv:
+        word = word[:-1]
+    else:
+        superlative = _strip(word, rv, SUPERLATIVE)
+        if superlative is not None:
+            word = superlative
+            if word.endswith("нн") and len(word) - 2 >= rv:
+                word = word[:-1]
+        elif word.endswith("ь") and len(word) - 1 >= rv:
+            word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens (article numbers like 12.8 kept whole)"""
+    return WORD_RE.findall(text.lower().replace("ё", "е"))
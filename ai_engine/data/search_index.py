@@ -0,0 +1,161 @@
+"""
+BM25 search index for KoAP articles
+Indexes stemmed titles, full texts and keywords of koap_articles.json and
+descriptions from koap_fines_complete.json. The index is precomputed and
+persisted next to the data; workers load it as JSON and rebuild only when
+the source files change.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .russian_stemmer import stem, tokenize
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+STOPWORDS = frozenset("""
+и в во на за не что я с со по к ко у о об от до из а но как так же ли бы то это мне меня мой
+мою моя его ее их он она они мы вы был была было были при для или если уже еще вот только
+""".split())
+
+# Field weights are applied as term-frequency multipliers
+FIELD_WEIGHTS = {"title": 2, "keywords": 3, "full_text": 1, "description": 2}
+
+
+def analyze(text: str) -> List[str]:
+    """Tokenize, drop stopwords, stem"""
+    return [stem(token) for token in tokenize(text) if token not in STOPWORDS]
+
+
+def fine_key_to_code(key: str) -> str:
+    """'12.8ч.1' -> 'ч.1 ст.12.8 КоАП РФ', '8.23' -> 'ст.8.23 КоАП РФ'"""
+    match = re.fullmatch(r"(\d+\.\d+)ч\.(\d+)", key)
+    if match:
+        return f"ч.{match.group(2)} ст.{match.group(1)} КоАП РФ"
+    return f"ст.{key} КоАП РФ"
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring"""
+
+    def __init__(self, documents: List[Dict], postings: Dict[str, List[List[int]]], lengths: List[int],
+                 fingerprint: str = "", k1: float = 1.2, b: float = 0.75, version: int = INDEX_VERSION):
+        self.documents = documents  # [{"source": "koap"|"fine", "key": ...}]
+        self.postings = postings  # term -> [[doc, weighted tf], ...]
+        self.lengths = lengths
+        self.fingerprint = fingerprint
+        self.k1 = k1
+        self.b = b
+        self.version = version
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0.0
+        count = len(documents)
+        self.idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5)) for term, docs in postings.items()
+        }
+
+    @classmethod
+    def build(cls, fields_per_document: Iterable[Tuple[Dict, Dict[str, str]]], fingerprint: str = "") -> "BM25Index":
+        """fields_per_document: (document ref, {field name: text})"""
+        documents, lengths = [], []
+        postings: Dict[str, List[List[int]]] = defaultdict(list)
+        for doc_id, (ref, fields) in enumerate(fields_per_document):
+            frequencies: Counter = Counter()
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS.get(field, 1)
+                for term in analyze(text):
+                    frequencies[term] += weight
+            documents.append(ref)
+            lengths.append(sum(frequencies.values()))
+            for term, frequency in frequencies.items():
+                postings[term].append([doc_id, frequency])
+        return cls(documents, dict(postings), lengths, fingerprint)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[Dict, float]]:
+        """Documents ranked by BM25 score (ties keep index order)"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(analyze(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for doc_id, frequency in docs:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / self.average_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit:
+            ranked = ranked[:limit]
+        return [(self.documents[doc_id], score) for doc_id, score in ranked]
+
+    # Persistence
+    def save(self, path: Path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.version,
+                "fingerprint": self.fingerprint,
+                "k1": self.k1,
+                "b": self.b,
+                "documents": self.documents,
+                "lengths": self.lengths,
+                "postings": self.postings,
+            }, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+def source_fingerprint(paths: Iterable[Path]) -> str:
+    """Hash of source files (and index format) to detect stale persisted indexes"""
+    digest = hashlib.sha256(str(INDEX_VERSION).encode())
+    for path in paths:
+        try:
+            digest.update(Path(path).read_bytes())
+        except OSError:
+            digest.update(b"missing")
+    return digest.hexdigest()
+
+
+def iter_documents(koap_articles: List[Dict], koap_fines_complete: Dict) -> Iterable[Tuple[Dict, Dict[str, str]]]:
+    """Searchable fields of both article sources"""
+    for article in koap_articles:
+        yield {"source": "koap", "key": article["article"]}, {
+            "title": article.get("title", ""),
+            "full_text": article.get("full_text", ""),
+            "keywords": " ".join(article.get("keywords", [])),
+        }
+    for key, fine in koap_fines_complete.items():
+        yield {"source": "fine", "key": key}, {"description": fine.get("description", "")}
+
+
+def load_or_build_index(index_path: Path, source_paths: List[Path], koap_articles: List[Dict],
+                        koap_fines_complete: Dict) -> BM25Index:
+    """Load persisted index if it matches the sources, otherwise rebuild (and try to persist)"""
+    fingerprint = source_fingerprint(source_paths)
+    try:
+        index = BM25Index.load(index_path)
+        if index.fingerprint == fingerprint and index.version == INDEX_VERSION:
+            return index
+        logger.info("KoAP search index is stale, rebuilding")
+    except FileNotFoundError:
+        logger.info("KoAP search index not found, building")
+    except Exception as e:
+        logger.error(f"Failed to load KoAP search index: {e}")
+
+    index = BM25Index.build(iter_documents(koap_articles, koap_fines_complete), fingerprint)
+    try:
+        index.save(index_path)
+    except OSError as e:
+        logger.warning(f"Could not persist KoAP search index: {e}")
+    return index
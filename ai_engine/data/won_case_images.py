@@ -0,0 +1,151 @@
+"""
+Local mirror of won case court document images
+Originals are stored under their SHA-256 (the same document published under
+two URLs is kept once) and re-fetched with conditional GETs. Each original
+gets a compressed JPEG rendition sized for Telegram. Paths relative to the
+mirror directory are recorded in won_cases.json so sends read from disk.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .koap_snapshot import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+def encode_image_url(img_url: str) -> str:
+    """URL-encode the filename part of an image URL (handle Cyrillic characters)"""
+    parts = img_url.rsplit('/', 1)
+    if len(parts) == 2:
+        base_url, filename = parts
+        return f"{base_url}/{quote(filename)}"
+    return img_url
+
+
+def _write_atomic(path: Path, content: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def render_for_telegram(content: bytes, max_side: int, quality: int) -> bytes:
+    """Downscale to max_side on the longest edge and re-encode as progressive JPEG"""
+    with Image.open(io.BytesIO(content)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+        return output.getvalue()
+
+
+class WonCaseImageMirror:
+    """Content-addressed image store with Telegram renditions"""
+
+    HTTP_CACHE = 'http_cache.json'
+
+    def __init__(self, directory=None, session: requests.Session = None, headers: Dict = None,
+                 max_side: int = None, quality: int = None, timeout: float = 30):
+        self.directory = Path(directory or settings.WON_CASE_IMAGES_DIR)
+        self.session = session or requests.Session()
+        self.headers = headers or {}
+        self.max_side = max_side or settings.WON_CASE_IMAGE_MAX_SIDE
+        self.quality = quality or settings.WON_CASE_IMAGE_QUALITY
+        self.timeout = timeout
+        self.http_cache = self._load_http_cache()
+
+    def path(self, relative: str) -> Path:
+        return self.directory / relative
+
+    def _load_http_cache(self) -> Dict:
+        try:
+            with open(self.directory / self.HTTP_CACHE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_http_cache(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(self.directory / self.HTTP_CACHE, self.http_cache)
+
+    def mirror(self, img_data: Dict) -> Dict:
+        """
+        Mirror one image, return img_data with sha256, local (original) and telegram (rendition) paths
+        A 304 keeps the stored original; on errors img_data is returned unchanged
+        """
+        url = img_data['url']
+        cached = self.http_cache.get(url, {})
+        headers = dict(self.headers)
+        if cached.get('sha256') and self.path(cached.get('local', '')).exists():
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            response = self.session.get(encode_image_url(url), headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                entry = cached
+            else:
+                response.raise_for_status()
+                entry = self._store(response.content)
+                entry.update(etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+            entry['telegram'] = self._rendition(entry)
+        except Exception as e:
+            logger.error(f"Error mirroring image {url}: {e}")
+            return img_data
+
+        self.http_cache[url] = entry
+        return {**img_data, 'sha256': entry['sha256'], 'local': entry['local'], 'telegram': entry['telegram']}
+
+    def mirror_cases(self, cases: List[Dict]) -> List[Dict]:
+        """Mirror the images of all cases in place and persist validators for the next run"""
+        mirrored = 0
+        for case in cases:
+            images = case.get('images') or []
+            case['images'] = [self.mirror(img) if img.get('url') else img for img in images]
+            mirrored += sum(1 for img in case['images'] if img.get('telegram'))
+        self.save_http_cache()
+        logger.info(f"Mirrored {mirrored} won case images to {self.directory}")
+        return cases
+
+    def _store(self, content: bytes) -> Dict:
+        sha256 = hashlib.sha256(content).hexdigest()
+        local = f"originals/{sha256[:2]}/{sha256}.jpg"
+        path = self.path(local)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(path, content)
+        return {'sha256': sha256, 'local': local}
+
+    def _rendition(self, entry: Dict) -> str:
+        """Rendition file name carries the settings, so changing them renders anew"""
+        sha256 = entry['sha256']
+        relative = f"telegram/{sha256[:2]}/{sha256}_{self.max_side}q{self.quality}.jpg"
+        path = self.path(relative)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(path, render_for_telegram(self.path(entry['local']).read_bytes(), self.max_side, self.quality))
+        return relative
+
+
+def local_image_path(img_data: Dict) -> Optional[Path]:
+    """Rendition of a mirrored image on disk, None if it is not mirrored here"""
+    relative = img_data.get('telegram')
+    if not relative:
+        return None
+    path = Path(settings.WON_CASE_IMAGES_DIR) / relative
+    return path if path.exists() else None
@@ -4,8 +4,13 @@ Won Cases Database - Provides access to won cases data
 
 import logging
 import json
+import threading
+import time
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -13,9 +18,14 @@ logger = logging.getLogger(__name__)
 class WonCasesDB:
     """Database for won cases"""
     
+    MAX_RESULTS = 5
+    
     def __init__(self):
         self.data_file = Path(__file__).parent / 'won_cases.json'
+        self._next_check = 0.0
+        self.data_mtime = self._data_mtime()
         self.cases = self._load_cases()
+        self._index = self._build_index(self.cases)
     
     def _load_cases(self) -> List[Dict]:
         """Load cases from JSON file"""
@@ -71,22 +81,55 @@ class WonCasesDB:
             }
         ]
     
+    @staticmethod
+    def _chapter(article: str) -> str:
+        return article.split('.')[0]  # e.g., "12" from "12.8"
+    
+    def _build_index(self, cases: List[Dict]) -> Tuple[Dict[str, List[Dict]], Dict[str, List[Dict]]]:
+        """
+        Article -> top cases and chapter -> top cases
+        Cases with images come first (they can be sent to the client), then more images, then file order
+        """
+        ranked = sorted(cases, key=lambda case: (not case.get('images'), -len(case.get('images') or [])))
+        by_article: Dict[str, List[Dict]] = defaultdict(list)
+        by_chapter: Dict[str, List[Dict]] = defaultdict(list)
+        for case in ranked:
+            article = case.get('article', '')
+            if len(by_article[article]) < self.MAX_RESULTS:
+                by_article[article].append(case)
+            if len(by_chapter[self._chapter(article)]) < self.MAX_RESULTS:
+                by_chapter[self._chapter(article)].append(case)
+        return dict(by_article), dict(by_chapter)
+    
+    def _data_mtime(self) -> Optional[int]:
+        try:
+            return self.data_file.stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    def reload(self):
+        """Re-read cases (e.g. after WonCasesScraper saved new data) and rebuild the indexes"""
+        self.data_mtime = self._data_mtime()
+        cases = self._load_cases()
+        self.cases, self._index = cases, self._build_index(cases)
+    
+    def reload_if_changed(self) -> bool:
+        """Reload when won_cases.json was rewritten (checked at most every KNOWLEDGE_RELOAD_INTERVAL seconds)"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + settings.KNOWLEDGE_RELOAD_INTERVAL
+        if self._data_mtime() == self.data_mtime:
+            return False
+        self.reload()
+        logger.info(f"Reloaded {len(self.cases)} won cases after {self.data_file.name} changed")
+        return True
+    
     def get_by_article(self, article: str) -> List[Dict]:
-        """Get won cases by article number"""
-        matching_cases = [
-            case for case in self.cases 
-            if case.get('article') == article
-        ]
-        
-        if not matching_cases:
-            # Return similar cases if exact match not found
-            article_base = article.split('.')[0]  # e.g., "12" from "12.8"
-            matching_cases = [
-                case for case in self.cases 
-                if case.get('article', '').startswith(article_base)
-            ]
-        
-        return matching_cases[:5]  # Return top 5
+        """Get won cases by article number (cases from the same chapter if none match exactly)"""
+        by_article, by_chapter = self._index
+        matching_cases = by_article.get(article) or by_chapter.get(self._chapter(article), [])
+        return list(matching_cases)  # Top MAX_RESULTS
     
     def get_all(self) -> List[Dict]:
         """Get all won cases"""
@@ -95,13 +138,17 @@ class WonCasesDB:
 
 # Singleton instance
 _won_cases_db = None
+_won_cases_lock = threading.Lock()
 
 
 def get_won_cases_db() -> WonCasesDB:
     """Get won cases database instance"""
     global _won_cases_db
     if _won_cases_db is None:
-        _won_cases_db = WonCasesDB()
+        with _won_cases_lock:
+            if _won_cases_db is None:
+                _won_cases_db = WonCasesDB()
+    _won_cases_db.reload_if_changed()
     return _won_cases_db
 
 
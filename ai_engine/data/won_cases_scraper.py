@@ -1,100 +1,127 @@
 """
 Won Cases Scraper - Scrapes won cases from avtourist.info
+Walks all listing pages and case detail pages concurrently (bounded
+connection pool, per-host rate limit) with conditional GETs. Pages that
+answer 304 reuse the stored cases, and won_cases.json is rewritten
+atomically only when a case was added, changed or removed.
 """
 
 import logging
+import threading
+import time
 import requests
 from bs4 import BeautifulSoup
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import re
 import os
-from urllib.parse import urljoin
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urljoin, urlparse
+
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from telegram_bot.client import TokenBucket
+
+from .koap_snapshot import write_json_atomic
+from .won_case_images import WonCaseImageMirror
 
 logger = logging.getLogger(__name__)
 
+# Image fields added by the local mirror, ignored when deciding whether a case changed
+MIRROR_FIELDS = ('sha256', 'local', 'telegram')
+
+
+class PageFetch(NamedTuple):
+    url: str
+    html: Optional[bytes]  # None when not modified
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+def _comparable(case: Optional[Dict]) -> Optional[Dict]:
+    if case is None:
+        return None
+    images = [{k: v for k, v in img.items() if k not in MIRROR_FIELDS} for img in case.get('images') or []]
+    return dict(case, images=images)
+
 
 class WonCasesScraper:
     """Scraper for won cases from avtourist.info"""
     
-    def __init__(self):
+    MAX_LISTING_PAGES = 100
+    
+    def __init__(self, session: requests.Session = None, concurrency: int = None, rate: float = None,
+                 timeout: float = None):
         self.base_url = "https://avtourist.info/vyigrannye-dela"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         self.data_file = Path(__file__).parent / 'won_cases.json'
-        self.images_dir = Path(__file__).parent / 'won_cases_images'
-        self.images_dir.mkdir(exist_ok=True)
+        self.http_cache_file = Path(__file__).parent / 'won_cases_http_cache.json'
+        self.images_dir = Path(settings.WON_CASE_IMAGES_DIR)
+        self.concurrency = concurrency or settings.WON_CASES_CRAWL_CONCURRENCY
+        self.rate = rate or settings.WON_CASES_CRAWL_RATE
+        self.timeout = timeout or settings.WON_CASES_CRAWL_TIMEOUT
+        self.session = session or self._make_session()
+        # Politeness: at most `rate` requests per second to each host, whatever the concurrency
+        self._host_buckets: Dict[str, TokenBucket] = {}
+        self._host_lock = threading.Lock()
+    
+    def _make_session(self) -> requests.Session:
+        """Keep-alive pool with one connection per crawler thread"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
     
     def scrape_won_cases(self) -> list:
-        """Scrape won cases from the website"""
+        """Crawl listing and detail pages and update won_cases.json with the cases that changed"""
         try:
-            logger.info(f"Scraping won cases from {self.base_url}")
-            
-            response = requests.get(self.base_url, headers=self.headers, timeout=30)
-            response.raise_for_status()
+            logger.info(f"Crawling won cases from {self.base_url}")
+            start = time.perf_counter()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            old_cases = {case.get('url'): case for case in self.load_cases()}
+            http_cache = self._load_http_cache()
             
-            cases = []
+            # Any failed listing page aborts the run: its cases would look removed
+            listings = self._crawl_listings(http_cache.get('listings', {}))
+            stubs = list({stub['url']: stub for entry in listings.values() for stub in entry['cases']}.values())
+            logger.info(f"Found {len(stubs)} cases on {len(listings)} listing pages")
             
-            # First, find all document images from the header section
-            header_images = self._scrape_header_images(soup)
-            logger.info(f"Found {len(header_images)} document images in header")
-            
-            # Find all h3 headers with links (case titles)
-            case_headers = soup.find_all('h3')
-            
-            for header in case_headers:
-                try:
-                    link = header.find('a')
-                    if not link:
-                        continue
-                    
-                    title = link.get_text(strip=True)
-                    url = link.get('href', '')
-                    
-                    # Skip if no title
-                    if not title or len(title) < 10:
-                        continue
-                    
-                    # Extract article from title or URL
-                    article = self._extract_article(title)
-                    
-                    # Find category (next sibling or parent)
-                    category = ""
-                    category_link = header.find_next('a', href=re.compile(r'/category/'))
-                    if category_link:
-                        category = category_link.get_text(strip=True).replace('(Категория - ', '').replace(')', '')
-                    
-                    # Get document images for this article from header images
-                    images = []
-                    if article and article in header_images:
-                        images = header_images[article][:3]  # Take first 3 images
-                    
-                    case = {
-                        'title': title,
-                        'url': url if url.startswith('http') else f"https://avtourist.info{url}",
-                        'article': article,
-                        'category': category,
-                        'result': 'Положительное решение',
-                        'key_arguments': self._extract_arguments_from_title(title),
-                        'description': title,
-                        'images': images,  # List of image URLs
-                        'image_count': len(images)
-                    }
-                    
-                    cases.append(case)
-                    
-                except Exception as e:
-                    logger.error(f"Error parsing case header: {e}")
-                    continue
+            detail_cache = http_cache.get('details', {})
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                results = list(pool.map(
+                    lambda stub: self._crawl_case(stub, old_cases.get(stub['url']), detail_cache), stubs
+                ))
             
-            logger.info(f"Scraped {len(cases)} won cases")
+            cases, details, changed = [], {}, []
+            for stub, (case, validators) in zip(stubs, results):
+                old = old_cases.get(stub['url'])
+                if _comparable(case) == _comparable(old) and self._is_mirrored(old):
+                    case = old  # Keep mirrored image paths
+                else:
+                    # New, changed, or an image whose earlier mirroring failed or was deleted
+                    changed.append(case)
+                cases.append(case)
+                if validators:
+                    details[stub['url']] = validators
+            removed = old_cases.keys() - {case['url'] for case in cases}
             
-            # Save to JSON file
-            self._save_cases(cases)
+            if changed:
+                # Mirror document images so sends read them from disk
+                self.mirror_images(changed)
+            # Validators are stored only with the cases they describe: after a failed
+            # write the next crawl must fetch the pages again instead of getting 304s
+            if not (changed or removed) or self._save_cases(cases):
+                self._save_http_cache({'listings': listings, 'details': details})
             
+            logger.info(
+                f"Crawled {len(cases)} won cases in {time.perf_counter() - start:.1f}s: "
+                f"{len(changed)} new or changed, {len(removed)} removed"
+            )
             return cases
             
         except Exception as e:
@@ -102,6 +129,147 @@ class WonCasesScraper:
             logger.exception("Full traceback:")
             return []
     
+    def _fetch(self, url: str, validators: Dict) -> PageFetch:
+        """Rate-limited conditional GET"""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            bucket = self._host_buckets.get(host)
+            if bucket is None:
+                bucket = self._host_buckets[host] = TokenBucket(self.rate, 1)
+        delay = bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        
+        headers = dict(self.headers)
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return PageFetch(url, None, validators.get('etag'), validators.get('last_modified'))
+        response.raise_for_status()
+        return PageFetch(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    
+    def _crawl_listings(self, listing_cache: Dict) -> Dict[str, Dict]:
+        """Listing pages breadth-first from page 1: url -> validators, case stubs and pagination links"""
+        listings: Dict[str, Dict] = {}
+        frontier = [self.base_url]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while frontier:
+                for url, entry in zip(frontier, pool.map(lambda url: self._crawl_listing(url, listing_cache), frontier)):
+                    listings[url] = entry
+                links = {link for entry in listings.values() for link in entry['pages']}
+                frontier = sorted(links - listings.keys())[:self.MAX_LISTING_PAGES - len(listings)]
+        return listings
+    
+    def _crawl_listing(self, url: str, listing_cache: Dict) -> Dict:
+        cached = listing_cache.get(url, {})
+        fetch = self._fetch(url, cached)
+        if fetch.html is None:
+            return cached
+        soup = BeautifulSoup(fetch.html, 'html.parser')
+        return {
+            'etag': fetch.etag,
+            'last_modified': fetch.last_modified,
+            'cases': self._parse_listing(soup),
+            'pages': self._pagination_links(soup),
+        }
+    
+    def _crawl_case(self, stub: Dict, old: Optional[Dict], detail_cache: Dict) -> Tuple[Dict, Dict]:
+        """(case, detail page validators); a failed detail page keeps the stored case"""
+        # Validators are only trusted while the case they describe is still stored
+        validators = detail_cache.get(stub['url'], {}) if old else {}
+        try:
+            fetch = self._fetch(stub['url'], validators)
+        except Exception as e:
+            logger.error(f"Error fetching case {stub['url']}: {e}")
+            return old or self._case_from_stub(stub), validators
+        if fetch.html is None:
+            return old, validators
+        case = self._parse_detail(BeautifulSoup(fetch.html, 'html.parser'), stub)
+        return case, {'etag': fetch.etag, 'last_modified': fetch.last_modified}
+    
+    def _parse_listing(self, soup) -> List[Dict]:
+        """Case stubs (title, url, article, category, images) of one listing page"""
+        # First, find all document images from the header section
+        header_images = self._scrape_header_images(soup)
+        logger.info(f"Found {len(header_images)} document image groups on listing page")
+        
+        stubs = []
+        # Find all h3 headers with links (case titles)
+        for header in soup.find_all('h3'):
+            try:
+                link = header.find('a')
+                if not link:
+                    continue
+                
+                title = link.get_text(strip=True)
+                url = link.get('href', '')
+                
+                # Skip if no title
+                if not title or len(title) < 10:
+                    continue
+                
+                # Extract article from title or URL
+                article = self._extract_article(title)
+                
+                # Find category (next sibling or parent)
+                category = ""
+                category_link = header.find_next('a', href=re.compile(r'/category/'))
+                if category_link:
+                    category = category_link.get_text(strip=True).replace('(Категория - ', '').replace(')', '')
+                
+                stubs.append({
+                    'title': title,
+                    'url': url if url.startswith('http') else f"https://avtourist.info{url}",
+                    'article': article,
+                    'category': category,
+                    # Document images for this article from header images
+                    'images': header_images.get(article, [])[:3] if article else [],
+                })
+            
+            except Exception as e:
+                logger.error(f"Error parsing case header: {e}")
+                continue
+        
+        return stubs
+    
+    def _pagination_links(self, soup) -> List[str]:
+        """Other listing pages linked from the pagination block (start=0 is page 1)"""
+        pages = set()
+        for link in soup.select('.pagination a[href]'):
+            url = urljoin(self.base_url, link['href'])
+            parsed = urlparse(url)
+            if parsed.path.rstrip('/') != urlparse(self.base_url).path:
+                continue
+            start = parse_qs(parsed.query).get('start', ['0'])[0]
+            pages.add(self.base_url if start == '0' else f"{self.base_url}?start={start}")
+        return sorted(pages)
+    
+    def _parse_detail(self, soup, stub: Dict) -> Dict:
+        """Full case from its detail page, falling back to the listing stub"""
+        body = soup.find(class_='itemFullText') or soup.find(class_='itemIntroText')
+        description = ''
+        if body:
+            description = ' '.join(p.get_text(' ', strip=True) for p in body.find_all('p'))[:500]
+        article = stub['article'] or self._extract_article(description)
+        images = [img for _, img in self._document_images(soup)][:3]
+        return self._case_from_stub(dict(stub, article=article, images=images or stub['images']), description)
+    
+    def _case_from_stub(self, stub: Dict, description: str = '') -> Dict:
+        return {
+            'title': stub['title'],
+            'url': stub['url'],
+            'article': stub['article'],
+            'category': stub['category'],
+            'result': 'Положительное решение',
+            'key_arguments': self._extract_arguments_from_title(stub['title']),
+            'description': description or stub['title'],
+            'images': stub['images'],  # List of image URLs
+            'image_count': len(stub['images'])
+        }
+    
     def _extract_article(self, text: str) -> str:
         """Extract article number from text"""
         # Look for patterns like "12.8", "12.26", "ст. 12.8"
@@ -141,6 +309,15 @@ class WonCasesScraper:
     def _scrape_header_images(self, soup) -> dict:
         """Scrape ALL document images from the page"""
         images_by_article = {}
+        for article, image in self._document_images(soup):
+            if article:
+                images_by_article.setdefault(article, []).append(image)
+        logger.info(f"Organized images into {len(images_by_article)} article groups")
+        return images_by_article
+    
+    def _document_images(self, soup) -> List[Tuple[str, Dict]]:
+        """(article, image) for every court document image on the page"""
+        images = []
         
         # Find ALL images with class "thumbnail" and "magnific-popup"
         # These are the court document images
@@ -168,17 +345,13 @@ class WonCasesScraper:
                         # Try extracting from src
                         article = self._extract_article(img_src)
                     
-                    if article:
-                        if article not in images_by_article:
-                            images_by_article[article] = []
-                        images_by_article[article].append({
-                            'url': full_img_url,
-                            'alt': img_alt,
-                            'filename': os.path.basename(img_src)
-                        })
+                    images.append((article, {
+                        'url': full_img_url,
+                        'alt': img_alt,
+                        'filename': os.path.basename(img_src)
+                    }))
         
-        logger.info(f"Organized images into {len(images_by_article)} article groups")
-        return images_by_article
+        return images
     
     def _find_case_images(self, header_element) -> list:
         """Find document images near the case header"""
@@ -199,21 +372,17 @@ class WonCasesScraper:
         
         return images
     
-    def download_image(self, url: str, filename: str) -> str:
-        """Download image from URL and save to local directory"""
-        try:
-            response = requests.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            
-            filepath = self.images_dir / filename
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-            
-            logger.info(f"Downloaded image: {filename}")
-            return str(filepath)
-        except Exception as e:
-            logger.error(f"Error downloading image {url}: {e}")
-            return ""
+    def _is_mirrored(self, case: Dict) -> bool:
+        """Every image of the case has its Telegram rendition on disk"""
+        return all(
+            img.get('telegram') and (self.images_dir / img['telegram']).exists()
+            for img in case.get('images') or [] if img.get('url')
+        )
+    
+    def mirror_images(self, cases: list) -> list:
+        """Mirror case images into images_dir and record local and Telegram rendition paths"""
+        mirror = WonCaseImageMirror(self.images_dir, headers=self.headers)
+        return mirror.mirror_cases(cases)
     
     def _parse_case_element(self, element) -> dict:
         """Parse a single case element"""
@@ -260,14 +429,22 @@ class WonCasesScraper:
         
         return None
     
-    def _save_cases(self, cases: list):
-        """Save cases to JSON file"""
+    def _save_cases(self, cases: list) -> bool:
+        """Save cases to JSON file, False if it could not be written"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(cases, f, ensure_ascii=False, indent=2)
+            # Atomic replace: workers reloading the file never see it half-written
+            write_json_atomic(self.data_file, cases, indent=2)
             logger.info(f"Saved {len(cases)} cases to {self.data_file}")
         except Exception as e:
             logger.error(f"Error saving cases: {e}")
+            return False
+        
+        try:
+            from .won_cases_db import get_won_cases_db
+            get_won_cases_db().reload()
+        except Exception as e:
+            logger.error(f"Error reloading won cases: {e}")
+        return True
     
     def load_cases(self) -> list:
         """Load cases from JSON file"""
@@ -280,6 +457,17 @@ class WonCasesScraper:
         except Exception as e:
             logger.error(f"Error loading cases: {e}")
         return []
+    
+    # Conditional GET validators of listing and detail pages from the previous crawl
+    def _load_http_cache(self) -> Dict:
+        try:
+            with open(self.http_cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_http_cache(self, http_cache: Dict):
+        write_json_atomic(self.http_cache_file, http_cache)
 
 
 def scrape_and_save_won_cases():
@@ -0,0 +1,22 @@
+"""
+Management command to precompute the persisted KoAP BM25 search index.
+"""
+from django.core.management.base import BaseCommand
+
+from ai_engine.data.knowledge_base import KnowledgeBase
+from ai_engine.data.search_index import BM25Index, iter_documents, source_fingerprint
+
+
+class Command(BaseCommand):
+    help = "Rebuild the persisted KoAP search index for the current fines snapshot"
+
+    def handle(self, *args, **options):
+        kb = KnowledgeBase()
+        index = BM25Index.build(
+            iter_documents(kb.koap_articles, kb.koap_fines_complete), source_fingerprint(kb.search_sources())
+        )
+        path = kb.search_index_path()
+        index.save(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(index.documents)} documents, {len(index.postings)} terms -> {path}"
+        ))
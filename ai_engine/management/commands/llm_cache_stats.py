@@ -0,0 +1,22 @@
+"""
+Management command to report LLM response cache hit rates per agent.
+"""
+from django.core.management.base import BaseCommand
+
+from ai_engine.services.response_cache import LLMResponseCache
+
+
+class Command(BaseCommand):
+    help = "Show LLM response cache hit-rate metrics per agent"
+
+    def handle(self, *args, **options):
+        stats = LLMResponseCache().stats()
+        if not stats:
+            self.stdout.write(self.style.WARNING("No LLM cache statistics recorded yet"))
+            return
+
+        for agent_name, agent_stats in sorted(stats.items()):
+            self.stdout.write(
+                f"{agent_name}: {agent_stats['hits']} hits, {agent_stats['misses']} misses, "
+                f"hit rate {agent_stats['hit_rate']:.1%}"
+            )
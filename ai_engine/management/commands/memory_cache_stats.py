@@ -0,0 +1,22 @@
+"""
+Management command to report the local conversation cache hit rate across all processes.
+"""
+from django.core.management.base import BaseCommand
+
+from ai_engine.services.local_cache import shared_stats
+from ai_engine.services.memory import get_redis_client
+
+
+class Command(BaseCommand):
+    help = "Show local conversation cache hits vs Redis fallbacks, summed over all worker processes"
+
+    def handle(self, *args, **options):
+        stats = shared_stats(get_redis_client())
+        if not stats['hits'] and not stats['redis_fallbacks']:
+            self.stdout.write(self.style.WARNING("No local memory cache statistics recorded yet"))
+            return
+
+        self.stdout.write(
+            f"{stats['hits']} local hits, {stats['redis_fallbacks']} Redis fallbacks "
+            f"({stats['stale']} stale), {stats['evictions']} evictions, hit rate {stats['hit_rate']:.1%}"
+        )
@@ -0,0 +1,19 @@
+"""
+Management command to convert legacy JSON-blob conversation keys into Redis lists.
+"""
+from django.core.management.base import BaseCommand
+
+from ai_engine.services.memory import ConversationMemoryService
+
+
+class Command(BaseCommand):
+    help = "Migrate conversation:{telegram_id} keys from JSON strings to Redis lists"
+
+    def handle(self, *args, **options):
+        memory = ConversationMemoryService()
+        migrated = 0
+        for key in memory.redis_client.scan_iter(match="conversation:*", count=500):
+            telegram_id = key.decode("utf-8").split(":", 1)[1]
+            if memory.migrate_conversation(telegram_id):
+                migrated += 1
+        self.stdout.write(self.style.SUCCESS(f"Migrated {migrated} conversations"))
@@ -0,0 +1,24 @@
+"""
+Management command to mirror won case images locally and render Telegram-sized copies.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_engine.data.won_cases_scraper import WonCasesScraper
+
+
+class Command(BaseCommand):
+    help = "Download won case images (conditional GET), render Telegram JPEGs and record their paths in won_cases.json"
+
+    def handle(self, *args, **options):
+        scraper = WonCasesScraper()
+        cases = scraper.load_cases()
+        if not cases:
+            raise CommandError(f"No cases in {scraper.data_file}")
+
+        scraper.mirror_images(cases)
+        scraper._save_cases(cases)
+
+        images = [img for case in cases for img in case.get('images') or []]
+        missing = sum(1 for img in images if not img.get('telegram'))
+        style = self.style.SUCCESS if not missing else self.style.WARNING
+        self.stdout.write(style(f"Mirrored {len(images) - missing}/{len(images)} images to {scraper.images_dir}"))
@@ -0,0 +1,35 @@
+"""
+Management command to refresh the КоАП fines snapshot from shtrafy-gibdd.ru.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_engine.data.koap_snapshot import KoapSnapshotStore
+from ai_engine.services.koap_refresh import KoapRefresher
+
+
+class Command(BaseCommand):
+    help = "Fetch the shtrafy-gibdd.ru fines table, diff it and publish a new snapshot if anything changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only print the diff')
+        parser.add_argument('--snapshot-dir', default=str(settings.KOAP_SNAPSHOT_DIR), help='Snapshot directory')
+
+    def handle(self, *args, **options):
+        refresher = KoapRefresher(store=KoapSnapshotStore(options['snapshot_dir']))
+        try:
+            result = refresher.run(dry_run=options['dry_run'])
+        except Exception as e:
+            raise CommandError(f"Refresh failed, snapshot left unchanged: {e}")
+
+        for kind, keys in result.diff.items():
+            if keys:
+                self.stdout.write(f"{kind}: {', '.join(keys)}")
+        if not result.changed:
+            self.stdout.write(self.style.SUCCESS(
+                f"No changes (v{result.version}, {result.not_modified} pages not modified)"
+            ))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING("Dry run, snapshot not published"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Published snapshot v{result.version}"))
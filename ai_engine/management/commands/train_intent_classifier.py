@@ -0,0 +1,51 @@
+"""
+Management command to retrain the local intent classifier from stored conversations.
+Only messages routed by their own keywords or labeled by hand are used: rows routed
+by the classifier, the lead stage or the flow would teach the model the router's guesses.
+Keyword routing never picks intake, so intake examples come from messages that matched
+no keyword at all (default or stage routing to intake).
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from ai_engine.agents.intent_classifier import IntentClassifier, split_samples
+from leads.models import Conversation
+
+# Routing reasons whose agent label reflects the message itself
+TRAINING_ROUTE_REASONS = ('keywords', 'manual')
+# Routing reasons of keyword-less messages, used as intake examples
+INTAKE_ROUTE_REASONS = ('default', 'stage')
+
+
+class Command(BaseCommand):
+    help = "Train the orchestrator's char n-gram intent classifier on Conversation rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(settings.INTENT_CLASSIFIER_PATH), help='Model file path')
+        parser.add_argument('--min-samples', type=int, default=50, help='Refuse to train on fewer labelled messages')
+        parser.add_argument('--holdout', type=float, default=0.2, help='Share of samples kept for evaluation')
+
+    def handle(self, *args, **options):
+        samples = [
+            (message, agent)
+            for message, agent in Conversation.objects.exclude(agent='').filter(
+                Q(route_reason__in=TRAINING_ROUTE_REASONS) | Q(route_reason__in=INTAKE_ROUTE_REASONS, agent='intake'),
+            ).values_list('user_message', 'agent')
+            if message and not message.startswith('/')
+        ]
+        if len(samples) < options['min_samples']:
+            raise CommandError(f"Only {len(samples)} labelled messages, need {options['min_samples']}")
+
+        try:
+            train, test = split_samples(samples, options['holdout'])
+            if test:
+                accuracy = IntentClassifier.train(train).accuracy(test)
+                self.stdout.write(f"Holdout accuracy: {accuracy:.1%} on {len(test)} messages")
+            classifier = IntentClassifier.train(samples)
+        except ValueError as e:
+            raise CommandError(str(e))
+        classifier.save(options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained on {classifier.samples} messages ({', '.join(classifier.labels)}) -> {options['output']}"
+        ))
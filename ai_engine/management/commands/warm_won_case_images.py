@@ -0,0 +1,49 @@
+"""
+Management command to pre-upload won case images to Telegram and cache their file_ids.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_engine.data.won_cases_db import get_won_cases_db
+from ai_engine.services.won_cases_sender import image_key, send_won_case_image
+from telegram_bot.file_cache import get_telegram_file_cache
+
+
+class Command(BaseCommand):
+    help = "Upload every image in won_cases.json to the service chat so clients get them by cached file_id"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chat-id', default=settings.TELEGRAM_SERVICE_CHAT_ID,
+                            help='Chat to upload to (default: TELEGRAM_SERVICE_CHAT_ID)')
+        parser.add_argument('--limit', type=int, default=None, help='Upload at most N images')
+        parser.add_argument('--dry-run', action='store_true', help='Only count images without a cached file_id')
+
+    def handle(self, *args, **options):
+        chat_id = options['chat_id']
+        if not chat_id and not options['dry_run']:
+            raise CommandError("Set TELEGRAM_SERVICE_CHAT_ID or pass --chat-id")
+
+        file_cache = get_telegram_file_cache()
+        pending = [
+            (img_data, case.get('title', 'Выигранное дело'))
+            for case in get_won_cases_db().get_all()
+            for img_data in case.get('images') or []
+            if img_data.get('url') and not file_cache.get(image_key(img_data))
+        ]
+        if options['limit'] is not None:
+            pending = pending[:options['limit']]
+        if options['dry_run']:
+            self.stdout.write(f"{len(pending)} images without a cached file_id")
+            return
+
+        uploaded = failed = 0
+        for img_data, title in pending:
+            try:
+                send_won_case_image(chat_id, img_data, title)
+                uploaded += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed to upload {img_data['url']}: {e}")
+
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(f"Uploaded {uploaded} images to {chat_id}, {failed} failed"))
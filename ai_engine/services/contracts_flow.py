@@ -3,11 +3,9 @@ import re
 from datetime import datetime
 from typing import Dict
 
-import requests
-from django.conf import settings
-
 from contract_manager.models import Contract
 from contract_manager.services import ContractGenerationService, SMSVerificationService
+from telegram_bot.client import get_telegram_client
 
 logger = logging.getLogger(__name__)
 
@@ -195,17 +193,13 @@ class ContractFlow:
                 file_path = file_field.path
                 logger.info(f"Contract file path: {file_path}")
                 
-                url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendDocument"
                 with open(file_path, "rb") as file:
-                    files = {"document": file}
-                    data = {
-                        "chat_id": telegram_id,
-                        "caption": f"📄 Договор №{contract.contract_number}\n\nПроверьте данные и введите код из email для подписания.",
-                        "parse_mode": "HTML",
-                    }
                     logger.info(f"Posting to Telegram API...")
-                    response = requests.post(url, data=data, files=files, timeout=30)
-                    response.raise_for_status()
+                    get_telegram_client().send_document(
+                        telegram_id,
+                        file,
+                        caption=f"📄 Договор №{contract.contract_number}\n\nПроверьте данные и введите код из email для подписания.",
+                    )
                     logger.info(f"✅ Contract sent successfully to {telegram_id}")
             else:
                 logger.error(f"❌ No generated file available for contract {contract.contract_number}")
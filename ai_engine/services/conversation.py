@@ -1,7 +1,7 @@
 import logging
 import os
 from decimal import Decimal
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from django.conf import settings
 from django.utils import timezone
@@ -9,21 +9,22 @@ from django.utils import timezone
 from leads.models import Lead, Conversation
 
 from .deepseek import DeepSeekAPIService
-from ai_engine.services.memory import ConversationMemoryService
+from .prompt_builder import PromptBuilder
+from ai_engine.services.memory import ConversationMemoryService, MemoryContext
 from ai_engine.services.contracts_flow import ContractFlow
 from ai_engine.services import analytics
 
 # Multi-agent imports
-from ..agents.orchestrator import AgentOrchestrator
-from ..agents import AGENT_REGISTRY
+from ..agents.orchestrator import AgentOrchestrator, Route
 logger = logging.getLogger(__name__)
 
 
 class AIConversationService:
     """Main service for handling AI conversations"""
 
-    def __init__(self):
-        self.deepseek = DeepSeekAPIService()
+    def __init__(self, stream_handler=None):
+        # stream_handler receives partial LLM text while the reply is generated
+        self.deepseek = DeepSeekAPIService(stream_handler=stream_handler)
         self.memory = ConversationMemoryService()
         self.contract_flow = ContractFlow()
         self.pricing_data = analytics.load_pricing_data()
@@ -36,7 +37,12 @@ class AIConversationService:
         else:
             logger.info("Using legacy single-agent system")
 
-    def process_message(self, lead: Lead, message: str, message_id: str) -> str:
+    def process_message(self, lead: Lead, message: str, message_id: str, raise_errors: bool = False) -> str:
+        """
+        Answer a client message
+        Errors return an apology text, or propagate with raise_errors=True so callers
+        that dedup updates can tell a failure from an answer and retry it
+        """
         try:
             logger.info(f"Processing message from lead {lead.telegram_id}: {message[:100]}...")
             
@@ -46,11 +52,15 @@ class AIConversationService:
                 self.memory.clear_conversation(lead.telegram_id)
                 return self._get_greeting_message(lead)
             
+            # History is loaded once and shared; writes are flushed together below
+            memory = self.memory.context(lead.telegram_id)
+            
             # Route to appropriate processing method
+            route = Route('', '')
             if self.use_multi_agent:
-                ai_response = self._process_with_agents(lead, message)
+                ai_response, route = self._process_with_agents(lead, message, memory)
             else:
-                ai_response = self._process_legacy(lead, message)
+                ai_response = self._process_legacy(lead, message, memory)
             
             processed_response = self._process_response_commands(lead, ai_response, message)
             logger.debug(f"Processed response: {processed_response[:200]}...")
@@ -60,10 +70,13 @@ class AIConversationService:
                 message_id=message_id,
                 user_message=message,
                 ai_response=processed_response,
+                agent=route.agent,
+                route_reason=route.reason,
             )
 
-            self.memory.add_message(lead.telegram_id, message, processed_response)
-            self.memory.set_last_interaction(lead.telegram_id)  # Track in Redis for follow-up
+            memory.add_message(lead.telegram_id, message, processed_response)
+            memory.set_last_interaction(lead.telegram_id)  # Track in Redis for follow-up
+            memory.flush()
             lead.last_interaction = timezone.now()
             lead.save()
             
@@ -82,6 +95,8 @@ class AIConversationService:
             return processed_response
         except Exception as e:
             logger.error(f"AI conversation error: {str(e)}")
+            if raise_errors:
+                raise
             return (
                 "Извините, произошла техническая ошибка. Наш менеджер скоро с вами свяжется."
             )
@@ -111,9 +126,8 @@ class AIConversationService:
                     # Don't return - let the response continue with recommendations
                 elif command == "SEND_WON_CASE_IMAGES":
                     logger.info(f"Sending won case images for article {params}")
-                    # Send won case images
-                    from ai_engine.services.won_cases_sender import send_won_case_images
-                    send_won_case_images(lead.telegram_id, params)
+                    # Send won case images in the background, the reply must not wait for downloads and uploads
+                    self._send_won_case_images(lead.telegram_id, params)
                     # Don't return - let the response continue
                 elif command == "SEND_SMS_CODE":
                     return self.contract_flow.handle_sms_code(lead)
@@ -166,39 +180,52 @@ class AIConversationService:
         clean_response = re.sub(r"\[[A-Z_]+:?[^\]]*\]", "", response).strip()
         return clean_response
     
-    def _process_with_agents(self, lead: Lead, message: str) -> str:
-        """Process message using multi-agent system"""
+    def _send_won_case_images(self, telegram_id: int, article: str):
+        """Queue the won case album, sending inline only if the broker is unavailable"""
+        from ai_engine.tasks import send_won_case_images_task
+        try:
+            send_won_case_images_task.apply_async(args=[telegram_id, article])
+        except Exception as e:
+            logger.error(f"Failed to enqueue won case images, sending inline: {str(e)}")
+            from ai_engine.services.won_cases_sender import send_won_case_images
+            send_won_case_images(telegram_id, article)
+
+    def _process_with_agents(self, lead: Lead, message: str, memory: MemoryContext) -> Tuple[str, Route]:
+        """Process message using multi-agent system, returns (response, routing decision)"""
         logger.info("Using multi-agent system")
         
         # Build context
         context = {
-            'conversation_history': self.memory.get_conversation_history(lead.telegram_id),
+            # Orchestrator only looks at the last reply
+            'conversation_history': memory.get_conversation_history(lead.telegram_id, limit=1),
             'pricing_data': self.pricing_data,
         }
         
         # Route to appropriate agent
-        agent_type = self.orchestrator.route_message(lead, message, context)
-        logger.info(f"Routed to agent: {agent_type}")
+        route = self.orchestrator.route(lead, message, context)
+        agent_type = route.agent
+        logger.info(f"Routed to agent: {agent_type} ({route.reason})")
         
         # Get agent class and instantiate
+        from ..agents import AGENT_REGISTRY  # Imported late: agents import ai_engine.services
         agent_class = AGENT_REGISTRY.get(agent_type)
         if not agent_class:
             logger.error(f"Agent not found: {agent_type}")
-            return "Извините, произошла ошибка маршрутизации."
+            return "Извините, произошла ошибка маршрутизации.", Route('', '')
         
-        agent = agent_class(self.deepseek, self.memory)
+        agent = agent_class(self.deepseek, memory)
         
         # Process message with agent
         response = agent.process(lead, message, context)
         logger.info(f"Agent {agent_type} response: {response[:200]}...")
         
-        return response
+        return response, route
     
-    def _process_legacy(self, lead: Lead, message: str) -> str:
+    def _process_legacy(self, lead: Lead, message: str, memory: MemoryContext) -> str:
         """Process message using legacy single-agent system"""
         logger.info("Using legacy system")
         
-        conversation_history = self.memory.get_conversation_history(lead.telegram_id)
+        conversation_history = memory.get_conversation_history(lead.telegram_id)
         logger.debug(f"Conversation history length: {len(conversation_history)}")
 
         current_stage = prompts.get_current_stage(lead)
@@ -211,11 +238,11 @@ class AIConversationService:
             formatted_pricing=formatted_pricing,
         )
 
-        messages: List[Dict] = [{"role": "system", "content": system_prompt}]
-        for msg in conversation_history[-10:]:
-            messages.append({"role": "user", "content": msg["user"]})
-            messages.append({"role": "assistant", "content": msg["assistant"]})
-        messages.append({"role": "user", "content": message})
+        messages: List[Dict] = PromptBuilder(
+            settings.LLM_PROMPT_TOKEN_BUDGET,
+            max_turns=10,
+            summary_store=memory,
+        ).build(system_prompt, conversation_history, message, conversation_id=lead.telegram_id)
 
         logger.debug(f"Sending {len(messages)} messages to DeepSeek API")
         ai_response = self.deepseek.chat_completion(messages)
@@ -1,39 +1,119 @@
+import json
 import logging
-from typing import Dict, List
+import threading
+from typing import Callable, Dict, List, Optional
 
-import requests
+import httpx
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# Returned instead of a completion when the API call fails
+ERROR_RESPONSE = "Извините, произошла техническая ошибка. Попробуйте позже."
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def build_http_client() -> httpx.Client:
+    """Build pooled HTTP client for DeepSeek API (keep-alive, HTTP/2 when h2 is installed)"""
+    http2 = settings.DEEPSEEK_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("h2 package not installed - DeepSeek client falls back to HTTP/1.1")
+            http2 = False
+
+    return httpx.Client(
+        http2=http2,
+        timeout=httpx.Timeout(
+            settings.DEEPSEEK_READ_TIMEOUT,
+            connect=settings.DEEPSEEK_CONNECT_TIMEOUT,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.DEEPSEEK_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.DEEPSEEK_MAX_KEEPALIVE,
+            keepalive_expiry=settings.DEEPSEEK_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Get process-wide DeepSeek HTTP client, so DNS/TCP/TLS setup is paid once"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = build_http_client()
+    return _http_client
+
 
 class DeepSeekAPIService:
     """Service for interacting with DeepSeek API"""
 
-    def __init__(self):
+    def __init__(self, client: httpx.Client = None, stream_handler: Optional[Callable[[str], None]] = None):
         self.api_key = settings.DEEPSEEK_API_KEY
         self.api_url = settings.DEEPSEEK_API_URL
+        self.client = client or get_http_client()
+        # When set, completions are streamed and handler gets the text generated so far
+        self.stream_handler = stream_handler
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
-    def chat_completion(self, messages: List[Dict], temperature: float = 0.7) -> str:
-        """Send chat completion request to DeepSeek API"""
-        payload = {
+    def _payload(self, messages: List[Dict], temperature: float, stream: bool) -> Dict:
+        return {
             "model": "deepseek-chat",
             "messages": messages,
             "temperature": temperature,
             "max_tokens": 1200,  # Increased for detailed problem analysis and solutions
-            "stream": False,
+            "stream": stream,
         }
+
+    def chat_completion(self, messages: List[Dict], temperature: float = 0.7) -> str:
+        """Send chat completion request to DeepSeek API"""
+        if self.stream_handler:
+            return self.stream_chat_completion(messages, temperature, self.stream_handler)
+
+        payload = self._payload(messages, temperature, stream=False)
         try:
-            response = requests.post(
-                self.api_url, headers=self.headers, json=payload, timeout=60
-            )
+            response = self.client.post(self.api_url, headers=self.headers, json=payload)
             response.raise_for_status()
             result = response.json()
             return result["choices"][0]["message"]["content"]
         except Exception as e:
             logger.error(f"DeepSeek API error: {str(e)}")
-            return "Извините, произошла техническая ошибка. Попробуйте позже."
+            return ERROR_RESPONSE
+
+    def stream_chat_completion(self, messages: List[Dict], temperature: float = 0.7,
+                               on_text: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Stream chat completion (SSE) from DeepSeek API
+        Calls on_text with the accumulated text after every chunk, returns the full text
+        """
+        payload = self._payload(messages, temperature, stream=True)
+        chunks: List[str] = []
+        try:
+            with self.client.stream("POST", self.api_url, headers=self.headers, json=payload) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if not delta:
+                        continue
+                    chunks.append(delta)
+                    if on_text:
+                        try:
+                            on_text("".join(chunks))
+                        except Exception as e:
+                            logger.warning(f"Stream handler error: {str(e)}")
+            return "".join(chunks)
+        except Exception as e:
+            logger.error(f"DeepSeek streaming API error: {str(e)}")
+            return ERROR_RESPONSE
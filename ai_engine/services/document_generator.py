@@ -407,24 +407,13 @@ class DocumentGenerator:
     
     def _send_petition_to_telegram(self, telegram_id: int, file_path: str, petition_type: str):
         """Send petition document to Telegram user"""
-        import requests
-        from django.conf import settings
+        from telegram_bot.client import get_telegram_client
         
         try:
             logger.info(f"Sending petition to Telegram user {telegram_id}")
             
-            url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendDocument"
-            
             with open(file_path, "rb") as file:
-                files = {"document": file}
-                data = {
-                    "chat_id": telegram_id,
-                    "caption": "📄 Ваше ходатайство готово",
-                    "parse_mode": "HTML",
-                }
-                
-                response = requests.post(url, data=data, files=files, timeout=30)
-                response.raise_for_status()
+                get_telegram_client().send_document(telegram_id, file, caption="📄 Ваше ходатайство готово")
                 logger.info(f"✅ Petition sent successfully to {telegram_id}")
                 
         except Exception as e:
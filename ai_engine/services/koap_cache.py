@@ -0,0 +1,141 @@
+"""
+Shared cache of scraped КоАП articles
+Articles scraped from shtrafy-gibdd.ru and their URL slugs are kept in Redis
+so every worker (and restarts) reuse them. Articles the site does not have
+are cached as misses with a short TTL. Stale entries are still served while
+a Celery task refreshes them; scraping never runs in the request path.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from django.conf import settings
+
+from ai_engine.data.article_codes import parse_article_code
+from .memory import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class CachedArticle(NamedTuple):
+    article: Optional[Dict]  # None for a cached miss
+    stale: bool
+
+
+class KoapArticleCache:
+    """Redis store for scraped articles (positive and negative) and URL slugs"""
+
+    ARTICLE_PREFIX = "koap_article"
+    SLUG_PREFIX = "koap_slug"
+    REFRESH_PREFIX = "koap_article_refresh"
+    REFRESH_LOCK_TTL = 300
+
+    def __init__(self, redis_client=None, ttl: int = None, refresh_after: int = None, negative_ttl: int = None):
+        self.redis_client = redis_client or get_redis_client()
+        self.ttl = ttl or settings.KOAP_ARTICLE_CACHE_TTL
+        self.refresh_after = refresh_after or settings.KOAP_ARTICLE_REFRESH_AFTER
+        self.negative_ttl = negative_ttl or settings.KOAP_ARTICLE_NEGATIVE_TTL
+
+    @staticmethod
+    def article_number(article_code: str) -> Optional[str]:
+        """The scraper works per article number, so parts share one entry"""
+        parsed = parse_article_code(article_code)
+        return parsed.number if parsed and parsed.codex == 'КоАП' else None
+
+    def get(self, article_code: str) -> Optional[CachedArticle]:
+        """Cached article (or cached miss); None if nothing is cached"""
+        number = self.article_number(article_code)
+        if not number:
+            return None
+        try:
+            raw = self.redis_client.get(f"{self.ARTICLE_PREFIX}:{number}")
+        except Exception as e:
+            logger.error(f"КоАП cache get error: {e}")
+            return None
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        max_age = self.refresh_after if entry['article'] else self.negative_ttl
+        return CachedArticle(entry['article'], time.time() - entry['fetched_at'] >= max_age)
+
+    def set(self, article_code: str, article: Optional[Dict]):
+        """Store scraped article, or a miss when article is None"""
+        number = self.article_number(article_code)
+        if not number:
+            return
+        entry = json.dumps({'article': article, 'fetched_at': time.time()}, ensure_ascii=False)
+        # Misses expire on their own; hits outlive refresh_after so stale ones can be served
+        ttl = self.ttl if article else self.negative_ttl
+        try:
+            self.redis_client.setex(f"{self.ARTICLE_PREFIX}:{number}", ttl, entry)
+        except Exception as e:
+            logger.error(f"КоАП cache set error: {e}")
+
+    def get_slug(self, article_number: str) -> Optional[str]:
+        try:
+            slug = self.redis_client.get(f"{self.SLUG_PREFIX}:{article_number}")
+        except Exception as e:
+            logger.error(f"КоАП slug get error: {e}")
+            return None
+        return slug.decode('utf-8') if slug is not None else None
+
+    def set_slug(self, article_number: str, slug: str):
+        try:
+            self.redis_client.setex(f"{self.SLUG_PREFIX}:{article_number}", self.ttl, slug)
+        except Exception as e:
+            logger.error(f"КоАП slug set error: {e}")
+
+    def schedule_refresh(self, article_code: str) -> bool:
+        """Queue a background scrape unless one is already queued for this article"""
+        number = self.article_number(article_code)
+        if not number:
+            return False
+        try:
+            if not self.redis_client.set(f"{self.REFRESH_PREFIX}:{number}", 1, nx=True, ex=self.REFRESH_LOCK_TTL):
+                return False
+            from ai_engine.tasks import refresh_koap_article_task
+            refresh_koap_article_task.apply_async(args=[article_code])
+            logger.info(f"Scheduled КоАП article refresh for {number}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to schedule КоАП article refresh for {number}: {e}")
+            return False
+
+    def refresh(self, article_code: str, scraper=None) -> Optional[Dict]:
+        """
+        Scrape article now and store the result (runs in the Celery worker)
+        Only a confirmed "no such article" is cached as a miss; on a network or
+        parse error nothing is written, so the next request schedules a retry.
+        """
+        number = self.article_number(article_code)
+        if not number:
+            return None
+        if scraper is None:
+            from .koap_scraper import get_koap_scraper
+            scraper = get_koap_scraper()
+        try:
+            article = scraper.fetch_article_info(article_code)
+            self.set(article_code, article)
+        finally:
+            try:
+                self.redis_client.delete(f"{self.REFRESH_PREFIX}:{number}")
+            except Exception as e:
+                logger.error(f"КоАП refresh lock release error: {e}")
+        return article
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_koap_article_cache() -> KoapArticleCache:
+    """Get process-wide КоАП article cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = KoapArticleCache()
+    return _cache
@@ -0,0 +1,168 @@
+"""
+КоАП fines refresh pipeline
+Fetches the fines table pages from shtrafy-gibdd.ru concurrently (rate
+limited, with conditional GET), parses them, diffs the result against the
+current snapshot and publishes a new snapshot when something changed.
+Run by Celery beat (refresh_koap_fines_task) or `manage.py refresh_koap_fines`.
+"""
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional
+
+import requests
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+from ai_engine.data.koap_snapshot import KoapSnapshotStore
+from telegram_bot.client import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://shtrafy-gibdd.ru/koap"
+
+ARTICLE_CELL_RE = re.compile(r'(\d+\.\d+(?:\s*ч\.\d+)?)')
+FINE_PATTERNS = [
+    re.compile(r'(\d+)\s*руб', re.IGNORECASE),
+    re.compile(r'(\d+)\s*000\s*руб', re.IGNORECASE),
+    re.compile(r'от\s*(\d+)\s*до\s*(\d+)\s*руб', re.IGNORECASE),
+]
+
+
+def _extract_fine(punishment: str) -> Optional[str]:
+    for pattern in FINE_PATTERNS:
+        match = pattern.search(punishment)
+        if match:
+            if len(match.groups()) >= 2 and match.group(2):
+                return f"{match.group(1)}-{match.group(2)} ₽"
+            return f"{match.group(1)} ₽"
+    return None
+
+
+def parse_fines_table(html: str) -> Dict[str, Dict]:
+    """Fines table rows keyed like koap_fines_complete.json ('12.8ч.1' -> description, punishment, fine)"""
+    articles = {}
+    soup = BeautifulSoup(html, 'html.parser')
+    for row in soup.find_all('tr'):
+        cells = row.find_all('td')
+        if len(cells) < 3:
+            continue
+        match = ARTICLE_CELL_RE.search(cells[0].get_text().strip())
+        if not match:
+            continue
+        punishment = cells[2].get_text().strip()
+        articles[match.group(1).replace(' ', '')] = {
+            'description': cells[1].get_text().strip()[:100],
+            'punishment': punishment[:150],
+            'fine': _extract_fine(punishment),
+        }
+    return articles
+
+
+def diff_articles(old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict[str, List[str]]:
+    """Article keys added, removed and changed between two datasets"""
+    return {
+        'added': sorted(new.keys() - old.keys()),
+        'removed': sorted(old.keys() - new.keys()),
+        'changed': sorted(key for key in new.keys() & old.keys() if new[key] != old[key]),
+    }
+
+
+class PageFetch(NamedTuple):
+    url: str
+    status: int
+    html: Optional[str]  # None when not modified
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class RefreshResult(NamedTuple):
+    version: int  # current snapshot version after the run
+    changed: bool
+    diff: Dict[str, List[str]]
+    not_modified: int  # pages answered with 304
+
+
+class KoapRefresher:
+    """Fetch → parse → diff → publish"""
+
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+    def __init__(self, store: KoapSnapshotStore = None, session=None, pages: int = None,
+                 rate: float = None, concurrency: int = None, timeout: float = 15):
+        self.store = store or KoapSnapshotStore(settings.KOAP_SNAPSHOT_DIR)
+        self.session = session or requests.Session()
+        self.pages = pages or settings.KOAP_REFRESH_PAGES
+        rate = rate or settings.KOAP_REFRESH_RATE
+        # Politeness: at most `rate` requests per second to the site, whatever the concurrency
+        self.bucket = TokenBucket(rate, 1)
+        self.concurrency = concurrency or settings.KOAP_REFRESH_CONCURRENCY
+        self.timeout = timeout
+
+    def page_urls(self) -> List[str]:
+        return [BASE_URL] + [f"{BASE_URL}?page={page}" for page in range(2, self.pages + 1)]
+
+    def fetch(self, url: str, validators: Dict) -> PageFetch:
+        """Conditional GET of one page"""
+        delay = self.bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        headers = {'User-Agent': self.USER_AGENT}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return PageFetch(url, 304, None, validators.get('etag'), validators.get('last_modified'))
+        response.raise_for_status()
+        return PageFetch(url, response.status_code, response.text,
+                         response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    def run(self, dry_run: bool = False) -> RefreshResult:
+        """Refresh the fines snapshot; any failed or unparseable page aborts without publishing"""
+        version, current = self.store.load()
+        old_articles = current.get('articles', {})
+        http_cache = self.store.load_http_cache()
+        # Validators only describe the version they were recorded against
+        page_cache = http_cache.get('pages', {}) if http_cache.get('version') == version else {}
+
+        urls = self.page_urls()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            fetches = list(pool.map(lambda url: self.fetch(url, page_cache.get(url, {})), urls))
+
+        articles: Dict[str, Dict] = {}
+        pages = {}
+        not_modified = 0
+        for fetch in fetches:
+            if fetch.html is None:
+                not_modified += 1
+                rows = {key: old_articles[key] for key in page_cache[fetch.url]['keys'] if key in old_articles}
+            else:
+                rows = parse_fines_table(fetch.html)
+                if not rows:
+                    raise ValueError(f"No fines parsed from {fetch.url}, page layout may have changed")
+            articles.update(rows)
+            pages[fetch.url] = {'etag': fetch.etag, 'last_modified': fetch.last_modified, 'keys': list(rows)}
+
+        diff = diff_articles(old_articles, articles)
+        changed = any(diff.values())
+        logger.info(
+            f"КоАП refresh: {len(articles)} articles, {not_modified}/{len(urls)} pages not modified, "
+            f"+{len(diff['added'])} -{len(diff['removed'])} ~{len(diff['changed'])}"
+        )
+        if dry_run:
+            return RefreshResult(version, changed, diff, not_modified)
+
+        if changed:
+            version = self.store.publish({
+                'source': BASE_URL,
+                'total_articles': len(articles),
+                'scraped_date': date.today().isoformat(),
+                'articles': articles,
+            })
+        self.store.save_http_cache({'version': version, 'pages': pages})
+        return RefreshResult(version, changed, diff, not_modified)
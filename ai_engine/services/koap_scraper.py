@@ -8,6 +8,8 @@ from bs4 import BeautifulSoup
 from typing import Optional, Dict
 import re
 
+from ai_engine.data.article_codes import parse_article_code
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,8 +56,10 @@ class KoapScraper:
         # Works with ANY chapter: 8.x, 12.x, 19.x, etc.
     }
     
-    def __init__(self):
+    def __init__(self, slug_store=None):
         self.session = requests.Session()
+        # Shared store of discovered URL slugs (KoapArticleCache), optional
+        self.slug_store = slug_store
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
@@ -94,46 +98,51 @@ class KoapScraper:
             article_code: Article code like "ч.1 ст.12.8" or "12.8" or "8.23"
             
         Returns:
-            Dict with article info or None if not found
+            Dict with article info or None if not found or the site could not be read
         """
         try:
-            # Extract article number from code
-            article_num = self._extract_article_number(article_code)
-            if not article_num:
-                logger.error(f"Could not extract article number from: {article_code}")
-                return None
-            
-            # Try multiple URL patterns intelligently
-            url_slug = self._find_article_url(article_num)
-            if not url_slug:
-                logger.warning(f"Could not determine URL for article {article_num}")
-                return None
-            
-            # Fetch the page
-            url = f"{self.BASE_URL}{url_slug}"
-            logger.info(f"Fetching КоАП article from: {url}")
-            
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            full_text = soup.get_text()
-            
-            # Parse article content
-            article_data = self._parse_shtrafy_gibdd(full_text, article_num)
-            
-            if article_data:
-                logger.info(f"Successfully scraped article {article_code}")
-                return article_data
-            else:
-                logger.warning(f"Article {article_code} not found on page")
-                return None
-                
+            return self.fetch_article_info(article_code)
         except Exception as e:
             logger.error(f"Error scraping article {article_code}: {e}")
             return None
     
+    def fetch_article_info(self, article_code: str) -> Optional[Dict]:
+        """
+        Same as get_article_info, but network and parse errors raise.
+        None means the site confirmed it has no such article.
+        """
+        # Extract article number from code
+        article_num = self._extract_article_number(article_code)
+        if not article_num:
+            logger.error(f"Could not extract article number from: {article_code}")
+            return None
+        
+        # Try multiple URL patterns intelligently
+        url_slug = self._find_article_url(article_num)
+        if not url_slug:
+            logger.warning(f"Could not determine URL for article {article_num}")
+            return None
+        
+        # Fetch the page
+        url = f"{self.BASE_URL}{url_slug}"
+        logger.info(f"Fetching КоАП article from: {url}")
+        
+        response = self.session.get(url, timeout=10)
+        response.raise_for_status()
+        
+        # Parse HTML
+        soup = BeautifulSoup(response.text, 'html.parser')
+        full_text = soup.get_text()
+        
+        # Parse article content
+        article_data = self._parse_shtrafy_gibdd(full_text, article_num)
+        
+        if article_data:
+            logger.info(f"Successfully scraped article {article_code}")
+            return article_data
+        logger.warning(f"Article {article_code} not found on page")
+        return None
+    
     def _find_article_url(self, article_num: str) -> Optional[str]:
         """
         Intelligently find the URL for an article
@@ -143,6 +152,13 @@ class KoapScraper:
         if article_num in self.ARTICLE_URLS:
             return self.ARTICLE_URLS[article_num]
         
+        # Then slugs discovered earlier by any worker
+        if self.slug_store is not None:
+            slug = self.slug_store.get_slug(article_num)
+            if slug:
+                self.ARTICLE_URLS[article_num] = slug
+                return slug
+        
         # Try common URL patterns
         # Pattern 1: Simple dash (12.8 -> 12-8)
         simple_slug = article_num.replace('.', '-')
@@ -154,35 +170,34 @@ class KoapScraper:
         part2_slug = f"{simple_slug}-2"
         
         # Try each pattern
+        error = None
         for slug in [part1_slug, simple_slug, part2_slug]:
             try:
                 test_url = f"{self.BASE_URL}{slug}"
                 response = self.session.head(test_url, timeout=5)
+                if response.status_code >= 500:
+                    error = f"HTTP {response.status_code} for {slug}"
                 if response.status_code == 200:
                     logger.info(f"Found article {article_num} at: {slug}")
                     # Cache it for next time
                     self.ARTICLE_URLS[article_num] = slug
+                    if self.slug_store is not None:
+                        self.slug_store.set_slug(article_num, slug)
                     return slug
-            except:
+            except Exception as e:
+                error = e
                 continue
         
+        # Only a clean "not found" from every pattern means the article does not exist
+        if error is not None:
+            raise ConnectionError(f"Could not probe URL for article {article_num}: {error}")
         logger.warning(f"Could not find URL pattern for article {article_num}")
         return None
     
     def _extract_article_number(self, article_code: str) -> Optional[str]:
         """Extract article number like '12.8' from various formats"""
-        # Try to match patterns like "ч.1 ст.12.8", "12.8", "ст.12.8"
-        patterns = [
-            r'ст\.(\d+\.\d+)',  # ст.12.8
-            r'(\d+\.\d+)',       # 12.8
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, article_code)
-            if match:
-                return match.group(1)
-        
-        return None
+        parsed = parse_article_code(article_code)
+        return parsed.number if parsed else None
     
     def _parse_shtrafy_gibdd(self, full_text: str, article_num: str) -> Optional[Dict]:
         """
@@ -216,7 +231,7 @@ class KoapScraper:
             
         except Exception as e:
             logger.error(f"Error parsing article {article_num}: {e}")
-            return None
+            raise
     
     def _extract_fine(self, text: str) -> Optional[str]:
         """Extract fine amount from text"""
@@ -313,5 +328,6 @@ def get_koap_scraper() -> KoapScraper:
     """Get global scraper instance (singleton)"""
     global _scraper_instance
     if _scraper_instance is None:
-        _scraper_instance = KoapScraper()
+        from .koap_cache import get_koap_article_cache
+        _scraper_instance = KoapScraper(slug_store=get_koap_article_cache())
     return _scraper_instance
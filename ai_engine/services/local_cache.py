@@ -0,0 +1,153 @@
+"""
+In-process LRU/TTL cache for conversation histories
+Sits in front of Redis inside one worker process. Entries carry the Redis
+version stamp they were read at, so a stale copy is detected by comparing
+one small counter instead of refetching the whole list.
+Hit/fallback counters are logged and added to shared Redis totals once per
+MEMORY_LOCAL_CACHE_STATS_INTERVAL (see `manage.py memory_cache_stats`).
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LocalMemoryCache:
+    """Thread-safe LRU bounded by total payload bytes, with per-entry TTL"""
+
+    STATS_KEY = "memory_local_cache:stats"
+    COUNTERS = ("hits", "misses", "stale", "evictions")
+
+    def __init__(self, max_bytes: int = None, ttl: float = None, stats_interval: float = None):
+        self.max_bytes = max_bytes or settings.MEMORY_LOCAL_CACHE_MAX_BYTES
+        self.ttl = ttl or settings.MEMORY_LOCAL_CACHE_TTL
+        self.stats_interval = settings.MEMORY_LOCAL_CACHE_STATS_INTERVAL if stats_interval is None else stats_interval
+        self._next_publish = time.monotonic() + self.stats_interval
+        self._published = dict.fromkeys(self.COUNTERS, 0)
+        self._entries: "OrderedDict[int, Tuple[int, List[Dict], int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0  # No local copy: served from Redis
+        self.stale = 0  # Local copy outdated: served from Redis
+        self.evictions = 0
+
+    @staticmethod
+    def size_of(history: List[Dict]) -> int:
+        return sum(len(json.dumps(turn, ensure_ascii=False).encode("utf-8")) for turn in history)
+
+    def peek(self, telegram_id: int) -> Optional[Tuple[int, List[Dict]]]:
+        """(version, history) of the live local copy, if any; does not count as a lookup"""
+        with self._lock:
+            entry = self._entries.get(telegram_id)
+            if entry is None:
+                return None
+            if entry[3] <= time.monotonic():
+                self._drop(telegram_id)
+                return None
+            return entry[0], list(entry[1])
+
+    def get(self, telegram_id: int, version: int) -> Optional[List[Dict]]:
+        """Local history if it was stored at `version`; records hit/stale/miss"""
+        with self._lock:
+            entry = self._entries.get(telegram_id)
+            if entry is None or entry[3] <= time.monotonic():
+                if entry is not None:
+                    self._drop(telegram_id)
+                self.misses += 1
+                return None
+            if entry[0] != version:
+                self._drop(telegram_id)
+                self.stale += 1
+                return None
+            self._entries.move_to_end(telegram_id)
+            self.hits += 1
+            return list(entry[1])
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def set(self, telegram_id: int, version: int, history: List[Dict]):
+        size = self.size_of(history)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(telegram_id)
+            self._entries[telegram_id] = (version, list(history), size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, telegram_id: int):
+        with self._lock:
+            self._drop(telegram_id)
+
+    def _drop(self, telegram_id: int):
+        entry = self._entries.pop(telegram_id, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "redis_fallbacks": self.misses + self.stale,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def unpublished(self) -> Optional[Dict[str, int]]:
+        """Counter increments since the previous call, or None until stats_interval has passed"""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_publish:
+                return None
+            self._next_publish = now + self.stats_interval
+            current = {name: getattr(self, name) for name in self.COUNTERS}
+            deltas = {name: current[name] - self._published[name] for name in self.COUNTERS}
+            self._published = current
+            return deltas
+
+
+def shared_stats(redis_client) -> Dict[str, float]:
+    """Counters of all processes together, as published by ConversationMemoryService"""
+    raw = redis_client.hgetall(LocalMemoryCache.STATS_KEY)
+    counts = {name: int(raw.get(name.encode("utf-8"), 0)) for name in LocalMemoryCache.COUNTERS}
+    lookups = counts["hits"] + counts["misses"] + counts["stale"]
+    return {
+        "hits": counts["hits"],
+        "redis_fallbacks": counts["misses"] + counts["stale"],
+        "stale": counts["stale"],
+        "evictions": counts["evictions"],
+        "hit_rate": counts["hits"] / lookups if lookups else 0.0,
+    }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_local_memory_cache() -> Optional[LocalMemoryCache]:
+    """Get process-wide local memory cache, or None when disabled"""
+    global _cache
+    if not settings.MEMORY_LOCAL_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LocalMemoryCache()
+    return _cache
@@ -1,63 +1,248 @@
 import json
 import logging
+import threading
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import redis
 from django.conf import settings
 
+from .local_cache import get_local_memory_cache
+from .prompt_builder import clean_reply
+
 logger = logging.getLogger(__name__)
 
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+def get_redis_client():
+    """Get process-wide Redis client (one connection pool per process)"""
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                _redis_client = redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
 
 class ConversationMemoryService:
-    """Service for managing conversation memory using Redis"""
+    """
+    Service for managing conversation memory using Redis
+    Each conversation is a Redis list of JSON-encoded turns: appends are
+    RPUSH + LTRIM + EXPIRE in one pipeline and reads LRANGE only the tail.
+    Every write bumps `conversation_version:{id}`; a per-process LRU keeps
+    recent histories and is trusted only while that version is unchanged.
+    """
 
-    def __init__(self):
-        self.redis_client = redis.from_url(settings.REDIS_URL)
+    MAX_TURNS = 20
+
+    def __init__(self, redis_client=None, local_cache=None):
+        self.redis_client = redis_client or get_redis_client()
+        self.local_cache = local_cache if local_cache is not None else get_local_memory_cache()
         self.memory_ttl = 3600 * 24  # 24 hours
 
-    def get_conversation_history(self, telegram_id: int) -> List[Dict]:
-        """Get conversation history from Redis"""
-        key = f"conversation:{telegram_id}"
+    def context(self, telegram_id: int) -> "MemoryContext":
+        """Request-scoped view: history loaded once, writes flushed together"""
+        return MemoryContext(self, telegram_id)
+
+    @staticmethod
+    def _key(telegram_id: int) -> str:
+        return f"conversation:{telegram_id}"
+
+    @staticmethod
+    def _version_key(telegram_id: int) -> str:
+        return f"conversation_version:{telegram_id}"
+
+    def get_conversation_history(self, telegram_id: int, limit: Optional[int] = None) -> List[Dict]:
+        """Get conversation history (only the last `limit` turns if given)"""
         try:
-            history_json = self.redis_client.get(key)
-            if history_json:
-                return json.loads(history_json)
+            history, _, _ = self._with_migration(telegram_id, lambda: self._read(telegram_id, limit=limit))
+            return history
         except Exception as e:
             logger.error(f"Redis get error: {str(e)}")
         return []
 
+    def _read(self, telegram_id: int, limit: Optional[int] = None, with_summary: bool = False):
+        """
+        Load (history, summary, version) in one round-trip
+        With a local copy only the version counter is read; the list is
+        fetched again only if that copy turns out to be stale.
+        """
+        key = self._key(telegram_id)
+        cache = self.local_cache
+        local = cache.peek(telegram_id) if cache else None
+        start = -min(limit, self.MAX_TURNS) if limit and not cache else 0
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.get(self._version_key(telegram_id))
+        if with_summary:
+            pipe.get(self._summary_key(telegram_id))
+        if local is None:
+            pipe.lrange(key, start, -1)
+        results = pipe.execute()
+        version = int(results[0] or 0)
+        summary = results[1] if with_summary else None
+
+        history = cache.get(telegram_id, version) if local is not None else None
+        if history is None:
+            if local is None:
+                items = results[-1]
+                if cache:
+                    cache.record_miss()
+            else:
+                items = self.redis_client.lrange(key, 0, -1)
+            history = [json.loads(item) for item in items]
+            if cache:
+                cache.set(telegram_id, version, history)
+        if cache:
+            self._publish_cache_stats()
+        return (history[-limit:] if limit else history), summary, version
+
+    def _publish_cache_stats(self):
+        """Log the local cache hit rate and add its counters to the shared totals, once per interval"""
+        deltas = self.local_cache.unpublished()
+        if deltas is None:
+            return
+        stats = self.local_cache.stats()
+        logger.info(
+            f"Local memory cache: hit rate {stats['hit_rate']:.1%}, {stats['hits']} hits, "
+            f"{stats['redis_fallbacks']} Redis fallbacks ({stats['stale']} stale), "
+            f"{stats['entries']} entries, {stats['bytes']} bytes"
+        )
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for name, delta in deltas.items():
+                if delta:
+                    pipe.hincrby(self.local_cache.STATS_KEY, name, delta)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Local memory cache stats error: {str(e)}")
+
+    def _with_migration(self, telegram_id: int, operation):
+        """Run a Redis operation, converting a legacy JSON-blob key on WRONGTYPE"""
+        try:
+            return operation()
+        except redis.ResponseError as e:
+            if "WRONGTYPE" not in str(e):
+                raise
+            self.migrate_conversation(telegram_id)
+            return operation()
+
     def add_message(self, telegram_id: int, user_message: str, ai_response: str):
         """Add message to conversation history"""
-        key = f"conversation:{telegram_id}"
+        turn = self._encode_turn(user_message, ai_response)
+
+        def append():
+            pipe = self.redis_client.pipeline(transaction=False)
+            self._queue_append(pipe, telegram_id, turn)
+            version_index = self._queue_bump(pipe, telegram_id)
+            return pipe.execute()[version_index]
+
         try:
-            history = self.get_conversation_history(telegram_id)
-            history.append(
-                {
-                    "user": user_message,
-                    "assistant": ai_response,
-                    "timestamp": datetime.now().isoformat(),
-                }
-            )
-            if len(history) > 20:
-                history = history[-20:]
-            self.redis_client.setex(key, self.memory_ttl, json.dumps(history, ensure_ascii=False))
+            version = self._with_migration(telegram_id, append)
+            self._write_through(telegram_id, version, appended=[json.loads(turn)])
         except Exception as e:
             logger.error(f"Redis set error: {str(e)}")
 
+    def _queue_append(self, pipe, telegram_id: int, turn: str):
+        key = self._key(telegram_id)
+        pipe.rpush(key, turn)
+        pipe.ltrim(key, -self.MAX_TURNS, -1)
+        pipe.expire(key, self.memory_ttl)
+
+    def _queue_bump(self, pipe, telegram_id: int) -> int:
+        """Queue a version bump; returns the index of the new version in the pipeline results"""
+        version_key = self._version_key(telegram_id)
+        version_index = len(pipe)
+        # INCR first: EXPIRE on a key that does not exist yet is a no-op
+        pipe.incr(version_key)
+        pipe.expire(version_key, self.memory_ttl)
+        return version_index
+
+    def _write_through(self, telegram_id: int, version: int, appended: List[Dict] = None,
+                       history: Optional[List[Dict]] = None):
+        """Update the local copy after a write, or drop it if another writer got in between"""
+        cache = self.local_cache
+        if not cache:
+            return
+        if history is None:
+            local = cache.peek(telegram_id)
+            if local is None or local[0] != version - 1:
+                cache.invalidate(telegram_id)
+                return
+            history = local[1] + (appended or [])
+        cache.set(telegram_id, version, history[-self.MAX_TURNS:])
+
+    @staticmethod
+    def _encode_turn(user_message: str, ai_response: str) -> str:
+        return json.dumps(
+            {
+                "user": user_message,
+                "assistant": clean_reply(ai_response),  # No HTML/command tags in prompts
+                "timestamp": datetime.now().isoformat(),
+            },
+            ensure_ascii=False,
+        )
+
+    def migrate_conversation(self, telegram_id: int) -> bool:
+        """Convert a legacy JSON-blob history key into a list"""
+        key = self._key(telegram_id)
+        try:
+            if self.redis_client.type(key) != b"string":
+                return False
+            history = json.loads(self.redis_client.get(key) or "[]")[-self.MAX_TURNS:]
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.delete(key)
+            if history:
+                pipe.rpush(key, *[json.dumps(turn, ensure_ascii=False) for turn in history])
+                pipe.expire(key, self.memory_ttl)
+            self._queue_bump(pipe, telegram_id)
+            pipe.execute()
+            if self.local_cache:
+                self.local_cache.invalidate(telegram_id)
+            logger.info(f"Migrated conversation memory for {telegram_id} ({len(history)} turns)")
+            return True
+        except Exception as e:
+            logger.error(f"Redis migrate error: {str(e)}")
+            return False
+
     def clear_conversation(self, telegram_id: int):
         """Clear conversation history"""
-        key = f"conversation:{telegram_id}"
         try:
-            self.redis_client.delete(key)
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.delete(self._key(telegram_id), self._summary_key(telegram_id))
+            version_index = self._queue_bump(pipe, telegram_id)
+            version = pipe.execute()[version_index]
+            self._write_through(telegram_id, version, history=[])
         except Exception as e:
             logger.error(f"Redis delete error: {str(e)}")
     
+    @staticmethod
+    def _summary_key(telegram_id: int) -> str:
+        return f"conversation_summary:{telegram_id}"
+
+    def get_summary(self, telegram_id: int) -> Optional[bytes]:
+        """Get cached rolling summary of older turns (see PromptBuilder)"""
+        try:
+            return self.redis_client.get(self._summary_key(telegram_id))
+        except Exception as e:
+            logger.error(f"Redis get summary error: {str(e)}")
+        return None
+
+    def set_summary(self, telegram_id: int, summary: str):
+        try:
+            self.redis_client.setex(self._summary_key(telegram_id), self.memory_ttl, summary)
+        except Exception as e:
+            logger.error(f"Redis set summary error: {str(e)}")
+
+    LAST_INTERACTION_TTL = 3600 * 2  # 2 hours
+
     def set_last_interaction(self, telegram_id: int):
         """Set last interaction timestamp for follow-up tracking"""
         key = f"last_interaction:{telegram_id}"
         try:
-            self.redis_client.setex(key, 3600 * 2, datetime.now().isoformat())  # 2 hours TTL
+            self.redis_client.setex(key, self.LAST_INTERACTION_TTL, datetime.now().isoformat())
         except Exception as e:
             logger.error(f"Redis set last_interaction error: {str(e)}")
     
@@ -81,3 +266,94 @@ class ConversationMemoryService:
         from datetime import timedelta
         one_hour_ago = datetime.now() - timedelta(hours=1)
         return last_interaction < one_hour_ago
+
+
+class MemoryContext:
+    """
+    Per-message memory for one conversation
+    Same interface as ConversationMemoryService, so the orchestrator and
+    agents can share it: history is read once, writes are queued and sent
+    in a single MULTI by flush().
+    """
+
+    def __init__(self, service: ConversationMemoryService, telegram_id: int):
+        self.service = service
+        self.telegram_id = telegram_id
+        self.redis_client = service.redis_client
+        self._history: Optional[List[Dict]] = None
+        self._summary: Optional[bytes] = None
+        self._version: Optional[int] = None
+        self._appends: List[str] = []
+        self._cleared = False
+        self._summary_write: Optional[str] = None
+        self._last_interaction: Optional[str] = None
+
+    def _load(self):
+        """Read history, summary and version in one round-trip"""
+        self._history = []
+        try:
+            self._history, self._summary, self._version = self.service._with_migration(
+                self.telegram_id, lambda: self.service._read(self.telegram_id, with_summary=True)
+            )
+        except Exception as e:
+            logger.error(f"Redis load error: {str(e)}")
+
+    def get_conversation_history(self, telegram_id: int = None, limit: Optional[int] = None) -> List[Dict]:
+        if self._history is None:
+            self._load()
+        return self._history[-limit:] if limit else list(self._history)
+
+    def get_summary(self, telegram_id: int = None) -> Optional[bytes]:
+        if self._history is None:
+            self._load()
+        return self._summary
+
+    def set_summary(self, telegram_id: int, summary: str):
+        self._summary = self._summary_write = summary
+
+    def add_message(self, telegram_id: int, user_message: str, ai_response: str):
+        turn = self.service._encode_turn(user_message, ai_response)
+        self._appends.append(turn)
+        if self._history is not None:
+            self._history.append(json.loads(turn))
+
+    def set_last_interaction(self, telegram_id: int = None):
+        self._last_interaction = datetime.now().isoformat()
+
+    def clear_conversation(self, telegram_id: int = None):
+        self._cleared = True
+        self._appends = []
+        self._history = []
+        self._summary = self._summary_write = None
+
+    def flush(self):
+        """Send all queued writes in one round-trip"""
+        changed = self._cleared or bool(self._appends)
+        if not changed and self._summary_write is None and self._last_interaction is None:
+            return
+        service = self.service
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            if self._cleared:
+                pipe.delete(service._key(self.telegram_id), service._summary_key(self.telegram_id))
+            for turn in self._appends:
+                service._queue_append(pipe, self.telegram_id, turn)
+            if self._summary_write is not None:
+                pipe.setex(service._summary_key(self.telegram_id), service.memory_ttl, self._summary_write)
+            if self._last_interaction is not None:
+                pipe.setex(f"last_interaction:{self.telegram_id}", service.LAST_INTERACTION_TTL, self._last_interaction)
+            version_index = service._queue_bump(pipe, self.telegram_id) if changed else None
+            results = pipe.execute()
+            if changed:
+                version = results[version_index]
+                if self._history is not None and self._version is not None and version == self._version + 1:
+                    service._write_through(self.telegram_id, version, history=self._history)
+                elif service.local_cache:
+                    service.local_cache.invalidate(self.telegram_id)
+        except Exception as e:
+            logger.error(f"Redis flush error: {str(e)}")
+        finally:
+            self._appends = []
+            self._cleared = False
+            self._summary_write = None
+            self._last_interaction = None
@@ -0,0 +1,166 @@
+"""
+Token-budgeted prompt assembly
+Keeps the system prompt and current message, then fills the remaining
+budget with the newest conversation turns. Turns that don't fit are
+compacted into a short rolling summary cached by the memory service.
+"""
+
+import json
+import logging
+import re
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+COMMAND_TAG_RE = re.compile(r"\[[A-Z_]+:?[^\]]*\]")
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+BLANK_LINES_RE = re.compile(r"\n{3,}")
+CYRILLIC_RE = re.compile(r"[а-яА-ЯёЁ]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate token count without a tokenizer
+    Cyrillic text averages ~2.5 chars per token, Latin/digits ~4
+    """
+    if not text:
+        return 0
+    cyrillic = len(CYRILLIC_RE.findall(text))
+    return int(cyrillic / 2.5 + (len(text) - cyrillic) / 4) + 1
+
+
+def clean_reply(text: str) -> str:
+    """Strip HTML and command tags from an assistant reply before it is stored or re-sent"""
+    text = COMMAND_TAG_RE.sub("", text or "")
+    text = HTML_TAG_RE.sub("", text)
+    return BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut text to roughly `tokens` tokens, keeping the beginning"""
+    if estimate_tokens(text) <= tokens:
+        return text
+    # Binary search on length: estimate is monotonic in length
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + "…"
+
+
+class PromptBuilder:
+    """Build DeepSeek message lists that fit a token budget"""
+
+    SUMMARY_SHARE = 0.15  # Part of the history budget reserved for the summary
+    SUMMARY_SNIPPET_CHARS = 160
+
+    def __init__(self, token_budget: int, max_turns: int = 5, summary_store=None):
+        # summary_store: object with get_summary(id) / set_summary(id, value), e.g. memory service
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.summary_store = summary_store
+
+    def build(self, system_prompt: str, history: List[Dict], message: str,
+              conversation_id=None) -> List[Dict]:
+        """Assemble [system, summary?, history..., user] within the token budget"""
+        used = (estimate_tokens(system_prompt) + estimate_tokens(message)
+                + 2 * MESSAGE_OVERHEAD_TOKENS)
+        available = max(0, self.token_budget - used)
+        summary_budget = int(available * self.SUMMARY_SHARE)
+        history_budget = available - summary_budget
+
+        # Newest turns first, until budget or turn limit is reached
+        kept: List[Dict] = []
+        for turn in reversed(history[-self.max_turns:] if self.max_turns else []):
+            user_text = turn.get("user", "")
+            assistant_text = clean_reply(turn.get("assistant", ""))
+            cost = estimate_tokens(user_text) + estimate_tokens(assistant_text) + 2 * MESSAGE_OVERHEAD_TOKENS
+            if cost > history_budget:
+                if not kept and history_budget > 2 * MESSAGE_OVERHEAD_TOKENS:
+                    # Always keep the latest exchange, shortened to fit
+                    room = history_budget - 2 * MESSAGE_OVERHEAD_TOKENS
+                    user_text = truncate_to_tokens(user_text, room // 3)
+                    assistant_text = truncate_to_tokens(assistant_text, room - estimate_tokens(user_text))
+                    kept.append({"user": user_text, "assistant": assistant_text})
+                break
+            kept.append({"user": user_text, "assistant": assistant_text})
+            history_budget -= cost
+        kept.reverse()
+
+        messages = [{"role": "system", "content": system_prompt}]
+
+        older = history[:len(history) - len(kept)]
+        if older and summary_budget > MESSAGE_OVERHEAD_TOKENS:
+            summary = self._summary(older, summary_budget - MESSAGE_OVERHEAD_TOKENS, conversation_id)
+            if summary:
+                messages.append({"role": "system", "content": f"Краткое содержание предыдущего разговора:\n{summary}"})
+
+        for turn in kept:
+            messages.append({"role": "user", "content": turn["user"]})
+            messages.append({"role": "assistant", "content": turn["assistant"]})
+        messages.append({"role": "user", "content": message})
+
+        logger.debug(f"Prompt built: {len(messages)} messages, ~{self.count_tokens(messages)} tokens "
+                     f"(budget {self.token_budget}, {len(older)} turns summarized)")
+        return messages
+
+    @staticmethod
+    def count_tokens(messages: List[Dict]) -> int:
+        return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+    def _summary(self, turns: List[Dict], token_budget: int, conversation_id=None) -> str:
+        """Rolling summary of turns that fell out of the window, cached per conversation"""
+        marker = turns[-1].get("timestamp") or str(len(turns))
+        store = self.summary_store if conversation_id is not None else None
+
+        if store is not None:
+            try:
+                cached = store.get_summary(conversation_id)
+                if cached:
+                    data = json.loads(cached)
+                    if data.get("marker") == marker and data.get("budget") == token_budget:
+                        return data["summary"]
+            except Exception as e:
+                logger.error(f"Summary cache get error: {str(e)}")
+
+        summary = self._summarize(turns, token_budget)
+
+        if store is not None:
+            try:
+                store.set_summary(conversation_id, json.dumps(
+                    {"marker": marker, "budget": token_budget, "summary": summary}, ensure_ascii=False
+                ))
+            except Exception as e:
+                logger.error(f"Summary cache set error: {str(e)}")
+        return summary
+
+    def _summarize(self, turns: List[Dict], token_budget: int) -> str:
+        """Extractive summary: what the client said, newest first, within budget"""
+        lines: List[str] = []
+        used = 0
+        for turn in reversed(turns):
+            snippet = " ".join(turn.get("user", "").split())[:self.SUMMARY_SNIPPET_CHARS]
+            if not snippet:
+                continue
+            line = f"• Клиент: {snippet}"
+            cost = estimate_tokens(line)
+            if used + cost > token_budget:
+                break
+            lines.append(line)
+            used += cost
+        lines.reverse()
+        return "\n".join(lines)
+
+
+def build_prompt(system_prompt: str, history: List[Dict], message: str, token_budget: int,
+                 max_turns: int = 5, summary_store=None, conversation_id=None) -> List[Dict]:
+    """Shortcut for one-off prompt assembly"""
+    return PromptBuilder(token_budget, max_turns, summary_store).build(
+        system_prompt, history, message, conversation_id
+    )
@@ -0,0 +1,112 @@
+"""
+Response cache for LLM calls
+Keyed by a hash of (agent, temperature, normalized messages) and stored in
+Redis with TTL. Size is bounded with LRU eviction tracked in a sorted set.
+Opt-in globally (LLM_RESPONSE_CACHE_ENABLED) and per agent (response_cache_ttl).
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from .memory import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """Redis-backed LRU/TTL cache for LLM completions"""
+
+    KEY_PREFIX = "llm_cache"
+    LRU_KEY = "llm_cache:lru"
+    STATS_KEY = "llm_cache:stats"
+
+    def __init__(self, redis_client=None, max_entries: int = None):
+        self.redis_client = redis_client or get_redis_client()
+        self.max_entries = max_entries or settings.LLM_RESPONSE_CACHE_MAX_ENTRIES
+
+    @staticmethod
+    def normalize_messages(messages: List[Dict]) -> List[List[str]]:
+        """Collapse whitespace and case so near-identical prompts share a key"""
+        return [
+            [message.get("role", ""), " ".join(str(message.get("content", "")).split()).lower()]
+            for message in messages
+        ]
+
+    def make_key(self, agent_name: str, temperature: float, messages: List[Dict]) -> str:
+        raw = json.dumps(
+            [agent_name, round(float(temperature), 2), self.normalize_messages(messages)],
+            ensure_ascii=False,
+        )
+        return f"{self.KEY_PREFIX}:{agent_name}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, agent_name: str, key: str) -> Optional[str]:
+        """Get cached response and record hit/miss"""
+        try:
+            cached = self.redis_client.get(key)
+            pipe = self.redis_client.pipeline(transaction=False)
+            if cached is not None:
+                pipe.zadd(self.LRU_KEY, {key: time.time()})
+                pipe.hincrby(self.STATS_KEY, f"{agent_name}:hits", 1)
+            else:
+                pipe.hincrby(self.STATS_KEY, f"{agent_name}:misses", 1)
+            pipe.execute()
+            if cached is not None:
+                logger.info(f"LLM cache hit for {agent_name}")
+                return cached.decode("utf-8")
+        except Exception as e:
+            logger.error(f"LLM cache get error: {str(e)}")
+        return None
+
+    def set(self, key: str, response: str, ttl: int):
+        """Store response, evicting least recently used entries over the size bound"""
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.setex(key, ttl, response)
+            pipe.zadd(self.LRU_KEY, {key: time.time()})
+            pipe.zcard(self.LRU_KEY)
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                evicted = [member for member, _ in self.redis_client.zpopmin(self.LRU_KEY, size - self.max_entries)]
+                if evicted:
+                    self.redis_client.delete(*evicted)
+                    logger.debug(f"LLM cache evicted {len(evicted)} entries")
+        except Exception as e:
+            logger.error(f"LLM cache set error: {str(e)}")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Hit-rate metrics per agent"""
+        stats: Dict[str, Dict[str, float]] = {}
+        try:
+            raw = self.redis_client.hgetall(self.STATS_KEY)
+        except Exception as e:
+            logger.error(f"LLM cache stats error: {str(e)}")
+            return stats
+        for field, value in raw.items():
+            agent_name, kind = field.decode("utf-8").rsplit(":", 1)
+            stats.setdefault(agent_name, {"hits": 0, "misses": 0})[kind] = int(value)
+        for agent_stats in stats.values():
+            total = agent_stats["hits"] + agent_stats["misses"]
+            agent_stats["hit_rate"] = agent_stats["hits"] / total if total else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """Get process-wide response cache, or None when caching is disabled"""
+    global _cache
+    if not settings.LLM_RESPONSE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache()
+    return _cache
@@ -3,12 +3,65 @@ Won Cases Sender - Sends court document images to clients
 """
 
 import logging
+
 import requests
 from django.conf import settings
+
+from ai_engine.data.won_case_images import encode_image_url, local_image_path
 from ai_engine.data.won_cases_db import get_won_cases_by_article
+from telegram_bot.client import get_telegram_client
+from telegram_bot.file_cache import CachedFile, get_telegram_file_cache
 
 logger = logging.getLogger(__name__)
 
+CAPTION = "📄 {title}\n\n💡 Нажмите на файл для просмотра в полном размере"
+MAX_IMAGES = 3
+
+
+def download_image(img_url: str) -> bytes:
+    """Download image bytes, raise on a non-200 response"""
+    url = encode_image_url(img_url)
+    logger.info(f"Downloading image from {url}")
+    response = requests.get(url, timeout=30)
+    if response.status_code != 200:
+        raise IOError(f"Failed to download image {url}: {response.status_code}")
+    return response.content
+
+
+def load_image(img_data: dict) -> bytes:
+    """Telegram rendition from the local mirror, the remote original if it is not mirrored"""
+    path = local_image_path(img_data)
+    if path is not None:
+        return path.read_bytes()
+    return download_image(img_data['url'])
+
+
+def image_key(img_data: dict) -> str:
+    """file_id cache key: the content-addressed rendition path, or the URL of an unmirrored image"""
+    return img_data.get('telegram') or img_data['url']
+
+
+def cached_image(img_data: dict) -> CachedFile:
+    return CachedFile(image_key(img_data), lambda: load_image(img_data),
+                      img_data.get('filename', 'document.jpg'), 'image/jpeg')
+
+
+def send_won_case_image(telegram_id, img_data: dict, title: str):
+    """
+    Send one image as a document (better quality and zoom)
+    After the first upload Telegram's file_id is reused, so the image is not read or uploaded again
+    """
+    image = cached_image(img_data)
+    return get_telegram_file_cache().send_document(
+        get_telegram_client(),
+        telegram_id,
+        image.key,
+        image.load,
+        caption=CAPTION.format(title=title),
+        filename=image.filename,
+        mime_type=image.mime_type,
+    )
+
 
 def send_won_case_images(telegram_id: int, article: str):
     """
@@ -34,68 +87,25 @@ def send_won_case_images(telegram_id: int, article: str):
             logger.warning(f"No won cases found for article {article}")
             return
         
-        # Get bot token
-        bot_token = settings.TELEGRAM_BOT_TOKEN
+        # Send images from first case with images as one album
+        case = next((c for c in won_cases if any(img.get('url') for img in c.get('images') or [])), None)
+        if case is None:
+            logger.warning(f"No images found for article {article}")
+            return
         
-        # Send images from first case with images
-        images_sent = 0
-        for case in won_cases:
-            if case.get('images') and len(case['images']) > 0:
-                # Send up to 3 images
-                for img_data in case['images'][:3]:
-                    img_url = img_data.get('url')
-                    if img_url:
-                        try:
-                            # URL-encode the image URL (handle Cyrillic characters)
-                            from urllib.parse import quote
-                            # Split URL into base and filename
-                            parts = img_url.rsplit('/', 1)
-                            if len(parts) == 2:
-                                base_url, filename = parts
-                                # Encode only the filename part
-                                encoded_filename = quote(filename)
-                                img_url = f"{base_url}/{encoded_filename}"
-                            
-                            # Download image first
-                            logger.info(f"Downloading image from {img_url}")
-                            img_response = requests.get(img_url, timeout=30)
-                            
-                            if img_response.status_code != 200:
-                                logger.error(f"Failed to download image: {img_response.status_code}")
-                                continue
-                            
-                            # Send as document for better quality and zoom
-                            url = f"https://api.telegram.org/bot{bot_token}/sendDocument"
-                            caption = f"📄 {case.get('title', 'Выигранное дело')}\n\n💡 Нажмите на файл для просмотра в полном размере"
-                            
-                            files = {
-                                'document': (img_data.get('filename', 'document.jpg'), img_response.content, 'image/jpeg')
-                            }
-                            data = {
-                                'chat_id': telegram_id,
-                                'caption': caption,
-                                'parse_mode': 'HTML'
-                            }
-                            
-                            response = requests.post(url, files=files, data=data, timeout=30)
-                            
-                            if response.status_code == 200:
-                                images_sent += 1
-                                logger.info(f"Sent won case image to {telegram_id}: {img_url}")
-                            else:
-                                logger.error(f"Failed to send image: {response.text}")
-                        
-                        except Exception as e:
-                            logger.error(f"Error sending image {img_url}: {e}")
-                
-                # Stop after sending images from first case
-                if images_sent > 0:
-                    break
+        files = [cached_image(img_data) for img_data in case['images'] if img_data.get('url')][:MAX_IMAGES]
+        messages = get_telegram_file_cache().send_media_group(
+            get_telegram_client(),
+            telegram_id,
+            files,
+            caption=CAPTION.format(title=case.get('title', 'Выигранное дело')),
+            max_workers=settings.WON_CASE_DOWNLOAD_CONCURRENCY,
+        )
         
-        if images_sent > 0:
-            logger.info(f"Successfully sent {images_sent} won case images to {telegram_id}")
+        if messages:
+            logger.info(f"Successfully sent {len(messages)} won case images to {telegram_id}")
         else:
-            logger.warning(f"No images found for article {article}")
+            logger.warning(f"Failed to send won case images for article {article}")
     
     except Exception as e:
         logger.error(f"Error in send_won_case_images: {e}")
@@ -0,0 +1,57 @@
+"""
+Celery tasks for ai_engine app
+"""
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def refresh_koap_article_task(article_code: str):
+    """
+    Scrape a КоАП article from shtrafy-gibdd.ru into the shared article cache
+
+    Args:
+        article_code: Article code in any supported format
+    """
+    from ai_engine.services.koap_cache import get_koap_article_cache
+
+    logger.info(f"=== КоАП ARTICLE REFRESH STARTED === {article_code}")
+    try:
+        article = get_koap_article_cache().refresh(article_code)
+        logger.info(f"КоАП article {article_code} {'cached' if article else 'not found, cached as miss'}")
+    except Exception as e:
+        logger.error(f"Error refreshing КоАП article {article_code}: {e}")
+        logger.exception("Full traceback:")
+
+
+@shared_task(ignore_result=True)
+def refresh_koap_fines_task():
+    """
+    Refresh the КоАП fines snapshot from the shtrafy-gibdd.ru table (scheduled by Celery beat)
+    """
+    from ai_engine.services.koap_refresh import KoapRefresher
+
+    logger.info("=== КоАП FINES REFRESH STARTED ===")
+    try:
+        result = KoapRefresher().run()
+        logger.info(f"КоАП fines snapshot v{result.version} ({'updated' if result.changed else 'unchanged'})")
+    except Exception as e:
+        logger.error(f"Error refreshing КоАП fines: {e}")
+        logger.exception("Full traceback:")
+
+
+@shared_task(ignore_result=True)
+def send_won_case_images_task(telegram_id: int, article: str):
+    """
+    Send won case court documents as one album, off the conversation path
+
+    Args:
+        telegram_id: Telegram user ID
+        article: Article as given in the SEND_WON_CASE_IMAGES command
+    """
+    from ai_engine.services.won_cases_sender import send_won_case_images
+
+    logger.info(f"=== WON CASE IMAGES TASK STARTED === {telegram_id} {article}")
+    send_won_case_images(telegram_id, article)
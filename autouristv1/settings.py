@@ -190,10 +190,80 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Telegram Bot Settings
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_WEBHOOK_URL = os.getenv('TELEGRAM_WEBHOOK_URL')
+# Acknowledge webhook updates immediately and process them on the Celery worker pool
+TELEGRAM_ASYNC_WEBHOOK = os.getenv('TELEGRAM_ASYNC_WEBHOOK', 'False') == 'True'
+TELEGRAM_UPDATES_QUEUE = os.getenv('TELEGRAM_UPDATES_QUEUE', 'telegram_updates')
+# Updates are sharded by chat onto N lanes (queues), each consumed by one worker
+TELEGRAM_WORKER_LANES = int(os.getenv('TELEGRAM_WORKER_LANES', 4))
+# How long processed update_ids and responses are remembered for dedup (seconds)
+TELEGRAM_DEDUP_TTL = int(os.getenv('TELEGRAM_DEDUP_TTL', 3600 * 24))
+# Bot API client: connection pool, timeouts and Telegram rate limits (msg/s)
+TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', 10))
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', 5))
+TELEGRAM_READ_TIMEOUT = float(os.getenv('TELEGRAM_READ_TIMEOUT', 30))
+TELEGRAM_MAX_RETRIES = int(os.getenv('TELEGRAM_MAX_RETRIES', 3))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+TELEGRAM_CHAT_BURST = float(os.getenv('TELEGRAM_CHAT_BURST', 1))
+# Enforce the limits above across all processes (gunicorn, lane and Celery workers) through
+# Redis; with False or while Redis is unreachable each process gets the full budget itself
+TELEGRAM_SHARED_RATE_LIMIT = os.getenv('TELEGRAM_SHARED_RATE_LIMIT', 'True') == 'True'
+# Stream LLM replies into a placeholder message via throttled editMessageText
+TELEGRAM_STREAM_RESPONSES = os.getenv('TELEGRAM_STREAM_RESPONSES', 'False') == 'True'
+TELEGRAM_STREAM_EDIT_INTERVAL = float(os.getenv('TELEGRAM_STREAM_EDIT_INTERVAL', 1.0))
+TELEGRAM_STREAM_MIN_CHARS = int(os.getenv('TELEGRAM_STREAM_MIN_CHARS', 20))
+# Private chat/channel that warm_won_case_images uploads to, so file_ids are cached before clients ask
+TELEGRAM_SERVICE_CHAT_ID = os.getenv('TELEGRAM_SERVICE_CHAT_ID')
+# Won case images missing from the file_id cache are downloaded in parallel before the album upload
+WON_CASE_DOWNLOAD_CONCURRENCY = int(os.getenv('WON_CASE_DOWNLOAD_CONCURRENCY', 3))
+# Local mirror of won case images with JPEG renditions sized for Telegram (longest side, JPEG quality)
+WON_CASE_IMAGES_DIR = os.getenv('WON_CASE_IMAGES_DIR', str(BASE_DIR / 'ai_engine' / 'data' / 'won_cases_images'))
+WON_CASE_IMAGE_MAX_SIDE = int(os.getenv('WON_CASE_IMAGE_MAX_SIDE', 2048))
+WON_CASE_IMAGE_QUALITY = int(os.getenv('WON_CASE_IMAGE_QUALITY', 85))
+# Won cases crawler: threads (= pooled connections), requests per second per host, request timeout
+WON_CASES_CRAWL_CONCURRENCY = int(os.getenv('WON_CASES_CRAWL_CONCURRENCY', 4))
+WON_CASES_CRAWL_RATE = float(os.getenv('WON_CASES_CRAWL_RATE', 2))
+WON_CASES_CRAWL_TIMEOUT = float(os.getenv('WON_CASES_CRAWL_TIMEOUT', 15))
 
 # DeepSeek AI Configuration
 DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
 DEEPSEEK_API_URL = 'https://api.deepseek.com/v1/chat/completions'
+# Pooled HTTP client for DeepSeek (shared by all requests in a process)
+DEEPSEEK_HTTP2 = os.getenv('DEEPSEEK_HTTP2', 'True') == 'True'
+DEEPSEEK_CONNECT_TIMEOUT = float(os.getenv('DEEPSEEK_CONNECT_TIMEOUT', 5))
+DEEPSEEK_READ_TIMEOUT = float(os.getenv('DEEPSEEK_READ_TIMEOUT', 60))
+DEEPSEEK_MAX_CONNECTIONS = int(os.getenv('DEEPSEEK_MAX_CONNECTIONS', 20))
+DEEPSEEK_MAX_KEEPALIVE = int(os.getenv('DEEPSEEK_MAX_KEEPALIVE', 10))
+DEEPSEEK_KEEPALIVE_EXPIRY = float(os.getenv('DEEPSEEK_KEEPALIVE_EXPIRY', 120))
+# Opt-in Redis cache for repeated LLM prompts (TTL is set per agent)
+LLM_RESPONSE_CACHE_ENABLED = os.getenv('LLM_RESPONSE_CACHE_ENABLED', 'False') == 'True'
+LLM_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('LLM_RESPONSE_CACHE_MAX_ENTRIES', 5000))
+# Per-process LRU of conversation histories in front of Redis (TTL must stay well below 24h memory TTL)
+MEMORY_LOCAL_CACHE_ENABLED = os.getenv('MEMORY_LOCAL_CACHE_ENABLED', 'True') == 'True'
+MEMORY_LOCAL_CACHE_MAX_BYTES = int(os.getenv('MEMORY_LOCAL_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+MEMORY_LOCAL_CACHE_TTL = int(os.getenv('MEMORY_LOCAL_CACHE_TTL', 300))
+# Seconds between hit-rate log lines / shared totals (`manage.py memory_cache_stats`) per process
+MEMORY_LOCAL_CACHE_STATS_INTERVAL = float(os.getenv('MEMORY_LOCAL_CACHE_STATS_INTERVAL', 60))
+# Local intent classifier (train with `manage.py train_intent_classifier`)
+INTENT_CLASSIFIER_PATH = os.getenv('INTENT_CLASSIFIER_PATH', str(BASE_DIR / 'ai_engine' / 'data' / 'intent_classifier.json'))
+INTENT_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv('INTENT_CLASSIFIER_MIN_CONFIDENCE', 0.8))
+# Shared Redis cache of articles scraped from shtrafy-gibdd.ru (seconds); misses use the negative TTL
+KOAP_ARTICLE_CACHE_TTL = int(os.getenv('KOAP_ARTICLE_CACHE_TTL', 30 * 24 * 3600))
+KOAP_ARTICLE_REFRESH_AFTER = int(os.getenv('KOAP_ARTICLE_REFRESH_AFTER', 24 * 3600))
+KOAP_ARTICLE_NEGATIVE_TTL = int(os.getenv('KOAP_ARTICLE_NEGATIVE_TTL', 3600))
+# КоАП fines refresh pipeline (Celery beat / manage.py refresh_koap_fines); snapshots must be on shared storage
+KOAP_SNAPSHOT_DIR = os.getenv('KOAP_SNAPSHOT_DIR', str(MEDIA_ROOT / 'koap_snapshots'))
+KOAP_SNAPSHOT_CHECK_INTERVAL = float(os.getenv('KOAP_SNAPSHOT_CHECK_INTERVAL', 30))
+KOAP_REFRESH_INTERVAL = int(os.getenv('KOAP_REFRESH_INTERVAL', 24 * 3600))
+KOAP_REFRESH_PAGES = int(os.getenv('KOAP_REFRESH_PAGES', 4))
+KOAP_REFRESH_RATE = float(os.getenv('KOAP_REFRESH_RATE', 1))
+KOAP_REFRESH_CONCURRENCY = int(os.getenv('KOAP_REFRESH_CONCURRENCY', 2))
+# Seconds between checks of the knowledge base and won cases JSON files for edits
+KNOWLEDGE_RELOAD_INTERVAL = float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL', 30))
+# Build the knowledge base when wsgi is imported (in the master with gunicorn --preload)
+PRELOAD_KNOWLEDGE_BASE = os.getenv('PRELOAD_KNOWLEDGE_BASE', 'True') == 'True'
+# Default prompt size (system + history + message) in estimated tokens
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv('LLM_PROMPT_TOKEN_BUDGET', 8000))
 
 # OCR Configuration
 OCR_API_KEY = os.getenv('OCR_API_KEY', 'K88601651988957')
@@ -216,6 +286,12 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+CELERY_BEAT_SCHEDULE = {
+    'refresh-koap-fines': {
+        'task': 'ai_engine.tasks.refresh_koap_fines_task',
+        'schedule': KOAP_REFRESH_INTERVAL,
+    },
+}
 
 # Contract Templates Directory
 CONTRACTS_DIR = BASE_DIR / 'contracts'
@@ -7,10 +7,19 @@ For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
 
+import gc
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'autouristv1.settings')
 
 application = get_wsgi_application()
+
+if settings.PRELOAD_KNOWLEDGE_BASE:
+    from ai_engine.data.knowledge_base import preload_knowledge
+
+    preload_knowledge()
+    # Keep preloaded objects out of GC passes so forked workers share their pages copy-on-write
+    gc.freeze()
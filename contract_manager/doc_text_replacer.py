@@ -1,6 +1,7 @@
 """
 Fill DOC/DOCX templates using LibreOffice conversion + python-docx.
 """
+import io
 import logging
 import subprocess
 import tempfile
@@ -9,7 +10,8 @@ import shutil
 from pathlib import Path
 from typing import Dict
 from datetime import datetime
-from docx import Document
+
+from contract_manager.template_cache import get_template_cache
 
 logger = logging.getLogger(__name__)
 
@@ -46,35 +48,18 @@ class DOCTextReplacer:
         3. Fill the DOCX with python-docx
         4. Save filled DOCX
         """
-        template_path_obj = Path(template_path)
         output_path_obj = Path(output_path)
         
-        # Determine if we need conversion
-        docx_to_fill = None
-        needs_conversion = False
-        
+        # Parsed (and, for real .doc files, converted) once per process;
+        # each fill edits its own copy of the cached document
         try:
-            # Try opening as DOCX first
-            doc = Document(template_path)
-            logger.info("Template is already DOCX-compatible, filling directly...")
-            docx_to_fill = template_path
-            
+            doc = get_template_cache().document(template_path, convert=self._convert_doc_to_docx)
         except Exception as e:
-            logger.info(f"Template is old .doc format: {e}")
-            logger.info("Converting .doc to .docx using LibreOffice...")
-            needs_conversion = True
-            
-            # Convert using LibreOffice
-            try:
-                docx_to_fill = self._convert_doc_to_docx(template_path)
-                logger.info(f"Converted to: {docx_to_fill}")
-            except Exception as conv_error:
-                logger.error(f"LibreOffice conversion failed: {conv_error}")
-                raise
+            logger.error(f"Failed to open template {template_path}: {e}")
+            raise
         
-        # Now fill the DOCX file
+        # Now fill the DOCX document
         try:
-            doc = Document(docx_to_fill)
             replacements = self._build_replacements(data)
             
             logger.info(f"Filling document with {len(replacements)} field mappings...")
@@ -134,34 +119,27 @@ class DOCTextReplacer:
             
             logger.info(f"✓ Replaced {replaced_count} field occurrences")
             
-            # Save filled document as DOCX
+            # Save filled document as DOCX once in memory, then write the same bytes to disk
             output_docx = str(output_path_obj).replace('.doc', '.docx')
-            doc.save(output_docx)
-            
-            # Read and return bytes
-            with open(output_docx, 'rb') as f:
-                content = f.read()
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            content = buffer.getvalue()
+            with open(output_docx, 'wb') as f:
+                f.write(content)
             
             logger.info(f"✓ Filled document saved: {output_docx} ({len(content)} bytes)")
             self._log_contract_data(data)
             
-            # Clean up temporary converted file if needed
-            if needs_conversion and docx_to_fill and os.path.exists(docx_to_fill):
-                try:
-                    os.remove(docx_to_fill)
-                except:
-                    pass
-            
             return content
             
         except Exception as e:
             logger.error(f"Failed to fill document: {e}")
             raise
     
-    def _convert_doc_to_docx(self, doc_path: str) -> str:
-        """Convert .doc to .docx using LibreOffice."""
+    def _convert_doc_to_docx(self, doc_path: str, output_dir: str = None) -> str:
+        """Convert .doc to .docx using LibreOffice (into output_dir, default: next to the .doc)."""
         doc_path_obj = Path(doc_path)
-        output_dir = doc_path_obj.parent
+        output_dir = Path(output_dir) if output_dir else doc_path_obj.parent
         
         # Run LibreOffice conversion
         # Pre-check availability when using PATH reference
@@ -197,7 +175,7 @@ class DOCTextReplacer:
             raise Exception(f"LibreOffice conversion failed: {result.stderr}")
         
         # Find the converted file
-        docx_path = doc_path_obj.with_suffix('.docx')
+        docx_path = output_dir / doc_path_obj.with_suffix('.docx').name
         if not docx_path.exists():
             raise Exception(f"Converted file not found: {docx_path}")
         
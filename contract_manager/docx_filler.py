@@ -2,13 +2,15 @@
 DOCX-based contract filler - searches for placeholder text and replaces with actual data.
 Much simpler and more reliable than PDF manipulation.
 """
+import io
 import logging
 from pathlib import Path
 from typing import Dict
 from datetime import datetime
-from docx import Document
 from docx.shared import RGBColor, Pt
 
+from contract_manager.template_cache import get_template_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,9 +39,10 @@ class DOCXFiller:
         # Normalize data
         data = self._normalize_data(data)
         
-        # For .doc files, try to open them directly (they might be DOCX with wrong extension)
+        # For .doc files, try to open them directly (they might be DOCX with wrong extension).
+        # The template is parsed once per process; each fill edits its own copy.
         try:
-            doc = Document(template_path)
+            doc = get_template_cache().document(template_path)
         except Exception as e:
             logger.error(f"Failed to open template: {e}")
             # If it fails, just copy the template and return it
@@ -84,12 +87,12 @@ class DOCXFiller:
         
         logger.info(f"Total paragraphs/cells modified: {replacements_made}")
         
-        # Save filled document
-        doc.save(output_path)
-        
-        # Read and return bytes
-        with open(output_path, 'rb') as f:
-            docx_bytes = f.read()
+        # Save filled document once in memory, then write the same bytes to disk
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        docx_bytes = buffer.getvalue()
+        with open(output_path, 'wb') as f:
+            f.write(docx_bytes)
         
         logger.info(f"Filled DOCX saved to: {output_path} ({len(docx_bytes)} bytes)")
         return docx_bytes
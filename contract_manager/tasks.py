@@ -77,8 +77,7 @@ def send_follow_up_message_task(telegram_id: int, lead_id: int):
         lead_id: Lead ID
     """
     from leads.models import Lead
-    from ai_engine.services.conversation import ConversationService
-    import requests
+    from telegram_bot.client import get_telegram_client, TelegramAPIError
     
     logger.info(f"=== FOLLOW-UP TASK STARTED ===")
     logger.info(f"Telegram ID: {telegram_id}, Lead ID: {lead_id}")
@@ -154,24 +153,18 @@ def send_follow_up_message_task(telegram_id: int, lead_id: int):
         
         message = follow_up_messages.get(lead.status, follow_up_messages['NEW'])
         
-        # Send message via Telegram
-        bot_token = settings.TELEGRAM_BOT_TOKEN
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        # Send message via Telegram (shared client respects rate limits during bursts)
+        try:
+            get_telegram_client().send_message(telegram_id, message)
+        except TelegramAPIError as e:
+            logger.error(f"❌ Failed to send follow-up: {e}")
+            return
         
-        response = requests.post(url, json={
-            'chat_id': telegram_id,
-            'text': message,
-            'parse_mode': 'HTML'
-        })
+        logger.info(f"✅ Follow-up message sent to {telegram_id}")
         
-        if response.status_code == 200:
-            logger.info(f"✅ Follow-up message sent to {telegram_id}")
-            
-            # Update lead's last_contact
-            lead.last_contact = timezone.now()
-            lead.save()
-        else:
-            logger.error(f"❌ Failed to send follow-up: {response.text}")
+        # Update lead's last_contact
+        lead.last_contact = timezone.now()
+        lead.save()
             
     except Lead.DoesNotExist:
         logger.error(f"Lead {lead_id} not found")
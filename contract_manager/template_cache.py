@@ -0,0 +1,85 @@
+"""
+Process-level cache of parsed contract templates.
+A template is read, unzipped and parsed once per (path, mtime, size); every fill
+then starts from a deep copy of the cached document tree instead of the disk.
+Old binary .doc templates are converted with LibreOffice once, into a temporary
+directory, and the converted document is cached the same way.
+"""
+import copy
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+from docx import Document
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateCache:
+    """LRU of pristine python-docx Documents keyed by template path and stat"""
+
+    MAX_TEMPLATES = 32
+
+    def __init__(self, max_templates: int = None):
+        self.max_templates = max_templates or self.MAX_TEMPLATES
+        self._documents: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def document(self, template_path, convert: Optional[Callable[[str, str], str]] = None):
+        """
+        Fresh, independently editable Document for the template
+        convert(doc_path, output_dir) -> docx_path is used when the file is not a DOCX package
+        """
+        path = str(Path(template_path).resolve())
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._documents.get(path)
+            if cached is not None and cached[0] == version:
+                self._documents.move_to_end(path)
+                # Deep copy under the lock: python-docx fills lazy attributes on first access
+                return copy.deepcopy(cached[1])
+
+        document = self._parse(path, convert)
+        with self._lock:
+            self._documents[path] = (version, document)
+            self._documents.move_to_end(path)
+            while len(self._documents) > self.max_templates:
+                self._documents.popitem(last=False)
+            return copy.deepcopy(document)
+
+    def _parse(self, path: str, convert: Optional[Callable[[str, str], str]]):
+        try:
+            document = Document(path)
+            logger.info(f"Parsed contract template {Path(path).name}")
+            return document
+        except Exception as e:
+            if convert is None:
+                raise
+            logger.info(f"Template {Path(path).name} is not DOCX ({e}), converting once")
+        with tempfile.TemporaryDirectory() as output_dir:
+            document = Document(convert(path, output_dir))
+        logger.info(f"Converted and parsed contract template {Path(path).name}")
+        return document
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+
+_template_cache = None
+_template_cache_lock = threading.Lock()
+
+
+def get_template_cache() -> TemplateCache:
+    """Get process-wide TemplateCache"""
+    global _template_cache
+    if _template_cache is None:
+        with _template_cache_lock:
+            if _template_cache is None:
+                _template_cache = TemplateCache()
+    return _template_cache
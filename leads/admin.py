@@ -31,10 +31,16 @@ class LeadAdmin(admin.ModelAdmin):
 
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
-    list_display = ['lead', 'message_type', 'created_at']
-    list_filter = ['message_type', 'created_at']
+    list_display = ['lead', 'message_type', 'agent', 'route_reason', 'created_at']
+    list_filter = ['message_type', 'agent', 'route_reason', 'created_at']
     search_fields = ['lead__telegram_id', 'user_message', 'ai_response']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'route_reason']
+    
+    def save_model(self, request, obj, form, change):
+        # A hand-corrected agent becomes a training label for the intent classifier
+        if 'agent' in form.changed_data:
+            obj.route_reason = 'manual'
+        super().save_model(request, obj, form, change)
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('lead')
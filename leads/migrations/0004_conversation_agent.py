@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0003_add_case_document_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='agent',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0004_conversation_agent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='route_reason',
+            field=models.CharField(blank=True, choices=[('keywords', 'Message keywords'), ('classifier', 'Intent classifier'), ('history', 'Continued flow'), ('stage', 'Lead stage'), ('verification', 'Verification code'), ('default', 'Default'), ('manual', 'Manually labeled')], default='', max_length=20),
+        ),
+    ]
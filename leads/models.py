@@ -67,11 +67,23 @@ class Lead(models.Model):
 class Conversation(models.Model):
     """Store AI conversation history for each lead"""
     
+    ROUTE_REASON_CHOICES = [
+        ('keywords', 'Message keywords'),
+        ('classifier', 'Intent classifier'),
+        ('history', 'Continued flow'),
+        ('stage', 'Lead stage'),
+        ('verification', 'Verification code'),
+        ('default', 'Default'),
+        ('manual', 'Manually labeled'),
+    ]
+    
     lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='conversations')
     message_id = models.CharField(max_length=100)
     user_message = models.TextField()
     ai_response = models.TextField()
     message_type = models.CharField(max_length=50, default='text')  # text, photo, document
+    agent = models.CharField(max_length=50, blank=True, default='')  # Agent that answered (intent classifier labels)
+    route_reason = models.CharField(max_length=20, choices=ROUTE_REASON_CHOICES, blank=True, default='')  # Why that agent
     created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
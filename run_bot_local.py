@@ -8,7 +8,6 @@ import sys
 import django
 import logging
 import time
-import requests
 import json
 
 # Setup Django
@@ -19,6 +18,10 @@ from django.conf import settings
 from ai_engine.services import AIConversationService
 from ai_engine.ocr_service import OCRService
 from leads.models import Lead
+from telegram_bot.dedup import UpdateDeduplicator
+from telegram_bot.client import get_telegram_client
+from telegram_bot.lanes import ChatLaneExecutor
+from telegram_bot.streaming import TelegramStreamRenderer
 
 # Setup logging
 logging.basicConfig(
@@ -30,14 +33,10 @@ logger = logging.getLogger(__name__)
 
 def get_file_url(file_id):
     """Get file URL from Telegram"""
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/getFile"
-    response = requests.get(url, params={'file_id': file_id})
-    
-    if response.status_code == 200:
-        file_info = response.json()
-        if file_info.get('ok'):
-            file_path = file_info['result']['file_path']
-            return f"https://api.telegram.org/file/bot{settings.TELEGRAM_BOT_TOKEN}/{file_path}"
+    try:
+        return get_telegram_client().get_file_url(file_id)
+    except Exception as e:
+        logger.error(f"Failed to get file: {str(e)}")
     return None
 
 
@@ -107,10 +106,17 @@ def handle_document_message(message):
 
 def handle_message(message_data):
     """Handle incoming messages"""
+    renderer = None
     try:
         message = message_data.get('message')
         if not message:
             return
+        
+        # Skip updates that were already processed (e.g. after a restart)
+        dedup = UpdateDeduplicator()
+        if not dedup.claim_update(message_data.get('update_id')):
+            logger.info(f"Duplicate update {message_data.get('update_id')} - skipping")
+            return
             
         telegram_id = message['from']['id']
         username = message['from'].get('username', '')
@@ -154,9 +160,22 @@ def handle_message(message_data):
             lead.last_name = last_name
             lead.save()
         
+        # Replay response if this message was already answered
+        response = dedup.get_cached_response(telegram_id, message_id)
+        if response is not None:
+            send_telegram_message(telegram_id, response)
+            logger.info(f"Replayed cached response to {telegram_id}")
+            return
+        
+        # Stream mode: show the reply while it is generated
+        if settings.TELEGRAM_STREAM_RESPONSES:
+            renderer = TelegramStreamRenderer(telegram_id)
+            renderer.start()
+        
         # Process message through AI
-        ai_service = AIConversationService()
-        response = ai_service.process_message(lead, message_text, str(message_id))
+        ai_service = AIConversationService(stream_handler=renderer.update if renderer else None)
+        response = ai_service.process_message(lead, message_text, str(message_id), raise_errors=True)
+        dedup.cache_response(telegram_id, message_id, response)
         
         # Save conversation with message type
         from leads.models import Conversation
@@ -168,42 +187,44 @@ def handle_message(message_data):
             message_type=message_type
         )
         
-        # Send response back
-        send_telegram_message(telegram_id, response)
+        # Send response back; petitions go out as .docx instead of the streamed message
+        if renderer and not is_petition(response):
+            renderer.finish(response)
+        else:
+            if renderer:
+                renderer.discard()
+            send_telegram_message(telegram_id, response)
         
         logger.info(f"Response sent to {telegram_id}")
         
     except Exception as e:
         logger.error(f"Error handling message: {str(e)}")
+        UpdateDeduplicator().release_update(message_data.get('update_id'))
+        if renderer:
+            renderer.discard()
         send_telegram_message(telegram_id, "Извините, произошла техническая ошибка. Попробуйте позже.")
 
 
-def send_telegram_message(chat_id, text):
-    """Send message via Telegram API"""
-    # Check if response is a petition document (not just mentions it)
+def is_petition(text):
+    """Check if response is a petition document (not just mentions it)"""
     # Must have: ХОДАТАЙСТВО as title + court address + signature line
-    is_petition = (
+    return (
         'ХОДАТАЙСТВО' in text.upper() and 
         len(text) > 300 and
         ('В ' in text and 'суд' in text.lower()) and  # Court address
         ('Подпись:' in text or 'подпись' in text.lower())  # Signature line
     )
-    
-    if is_petition:
+
+
+def send_telegram_message(chat_id, text):
+    """Send message via Telegram API"""
+    if is_petition(text):
         # This is a petition document - send as .docx
         send_petition_as_document(chat_id, text)
     else:
         # Regular message
-        url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {
-            'chat_id': chat_id,
-            'text': text,
-            'parse_mode': 'HTML'
-        }
-        
         try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
+            get_telegram_client().send_message(chat_id, text)
         except Exception as e:
             logger.error(f"Failed to send message: {str(e)}")
 
@@ -218,17 +239,13 @@ def send_petition_as_document(chat_id, petition_text):
         filepath = doc_gen.generate_petition_docx(petition_text)
         
         # Send document via Telegram
-        url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendDocument"
-        
         with open(filepath, 'rb') as doc_file:
-            files = {'document': doc_file}
-            data = {
-                'chat_id': chat_id,
-                'caption': '📄 Ходатайство готово!\n\n✅ Скачайте документ, распечатайте и подайте в суд.\n\n💡 Также можете отредактировать в Word при необходимости.'
-            }
-            
-            response = requests.post(url, files=files, data=data)
-            response.raise_for_status()
+            get_telegram_client().send_document(
+                chat_id,
+                doc_file,
+                caption='📄 Ходатайство готово!\n\n✅ Скачайте документ, распечатайте и подайте в суд.\n\n💡 Также можете отредактировать в Word при необходимости.',
+                parse_mode=None,
+            )
         
         logger.info(f"Petition document sent to {chat_id}")
         
@@ -239,26 +256,16 @@ def send_petition_as_document(chat_id, petition_text):
     except Exception as e:
         logger.error(f"Failed to send petition as document: {str(e)}")
         # Fallback to text message
-        url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {
-            'chat_id': chat_id,
-            'text': petition_text,
-            'parse_mode': 'HTML'
-        }
-        requests.post(url, json=payload)
+        try:
+            get_telegram_client().send_message(chat_id, petition_text)
+        except Exception as e:
+            logger.error(f"Failed to send petition as text: {str(e)}")
 
 
 def get_updates(offset=None):
     """Get updates from Telegram"""
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/getUpdates"
-    params = {'timeout': 30}
-    if offset:
-        params['offset'] = offset
-    
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return {'ok': True, 'result': get_telegram_client().get_updates(offset, timeout=30)}
     except Exception as e:
         logger.error(f"Failed to get updates: {str(e)}")
         return None
@@ -269,6 +276,8 @@ def main():
     logger.info("Starting bot in polling mode...")
     
     offset = None
+    # Chats are processed in parallel, messages of one chat in order
+    lanes = ChatLaneExecutor()
     
     while True:
         try:
@@ -277,8 +286,9 @@ def main():
             
             if updates and updates.get('ok'):
                 for update in updates.get('result', []):
-                    # Process each update
-                    handle_message(update)
+                    # Process each update on its chat lane
+                    chat = (update.get('message') or {}).get('from', {}).get('id', 0)
+                    lanes.submit(chat, handle_message, update)
                     
                     # Update offset
                     offset = update['update_id'] + 1
@@ -287,6 +297,7 @@ def main():
             
         except KeyboardInterrupt:
             logger.info("Bot stopped by user")
+            lanes.shutdown(wait=False)
             break
         except Exception as e:
             logger.error(f"Bot error: {str(e)}")
@@ -0,0 +1,372 @@
+"""
+Telegram Bot API client shared by all senders
+Keep-alive connection pool, token-bucket rate limiting
+(30 msg/s global, 1 msg/s per chat, shared by all processes through Redis)
+and automatic 429 retry_after handling.
+Sync front-end for Django/Celery code, asyncio front-end for async callers.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+API_BASE = "https://api.telegram.org"
+
+# Methods that deliver something to a chat and count against rate limits
+SEND_METHODS = {
+    'sendMessage', 'sendDocument', 'sendPhoto', 'sendMediaGroup',
+    'editMessageText', 'sendChatAction',
+}
+
+
+class TelegramAPIError(Exception):
+    """Telegram returned a non-ok response"""
+
+    def __init__(self, method: str, status_code: int, description: str):
+        super().__init__(f"Telegram {method} failed ({status_code}): {description}")
+        self.method = method
+        self.status_code = status_code
+        self.description = description
+
+
+class TokenBucket:
+    """Thread-safe token bucket; reserve() returns how long the caller must wait"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Tokens may go negative: a reservation paid back by waiting
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def idle(self) -> bool:
+        """Bucket is full again and can be dropped"""
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    """Global and per-chat token buckets"""
+
+    MAX_CHAT_BUCKETS = 10000
+
+    def __init__(self, global_rate: float = None, chat_rate: float = None, chat_burst: float = None):
+        global_rate = global_rate or settings.TELEGRAM_GLOBAL_RATE
+        self.chat_rate = chat_rate or settings.TELEGRAM_CHAT_RATE
+        self.chat_burst = chat_burst or settings.TELEGRAM_CHAT_BURST
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_buckets: Dict[Any, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, chat_id=None) -> float:
+        """Reserve a send slot, return delay in seconds before sending"""
+        delay = self.global_bucket.reserve()
+        if chat_id is not None:
+            with self._lock:
+                bucket = self.chat_buckets.get(chat_id)
+                if bucket is None:
+                    if len(self.chat_buckets) >= self.MAX_CHAT_BUCKETS:
+                        self._prune()
+                    bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            delay = max(delay, bucket.reserve())
+        return delay
+
+    def _prune(self):
+        for chat_id in [c for c, b in self.chat_buckets.items() if b.idle()]:
+            del self.chat_buckets[chat_id]
+
+    def wait(self, chat_id=None):
+        delay = self.reserve(chat_id)
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Global and optional per-chat bucket reserved atomically, timed by the Redis clock.
+# Same semantics as TokenBucket: tokens may go negative and the caller waits them off.
+RESERVE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local delay = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local capacity = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate) - 1
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', key, math.ceil((capacity - tokens) / rate) + 1)
+    if tokens < 0 then
+        delay = math.max(delay, -tokens / rate)
+    end
+end
+return tostring(delay)
+"""
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    Global and per-chat token buckets kept in Redis, so the limits hold for all
+    processes together. Falls back to the in-process buckets while Redis fails.
+    """
+
+    GLOBAL_KEY = 'telegram_rate:global'
+    CHAT_KEY = 'telegram_rate:chat:{}'
+    RETRY_REDIS_AFTER = 30
+
+    def __init__(self, global_rate: float = None, chat_rate: float = None, chat_burst: float = None,
+                 redis_client=None):
+        super().__init__(global_rate, chat_rate, chat_burst)
+        if redis_client is None:
+            from ai_engine.services.memory import get_redis_client
+            redis_client = get_redis_client()
+        self._script = redis_client.register_script(RESERVE_SCRIPT)
+        self._redis_down_until = 0.0
+
+    def reserve(self, chat_id=None) -> float:
+        if time.monotonic() < self._redis_down_until:
+            return super().reserve(chat_id)
+        keys = [self.GLOBAL_KEY]
+        args = [self.global_bucket.rate, self.global_bucket.capacity]
+        if chat_id is not None:
+            keys.append(self.CHAT_KEY.format(chat_id))
+            args += [self.chat_rate, self.chat_burst]
+        try:
+            return float(self._script(keys=keys, args=args))
+        except Exception as e:
+            logger.error(f"Shared Telegram rate limit unavailable, limiting per process: {str(e)}")
+            self._redis_down_until = time.monotonic() + self.RETRY_REDIS_AFTER
+            return super().reserve(chat_id)
+
+
+def default_rate_limiter() -> RateLimiter:
+    """Redis-backed limiter unless TELEGRAM_SHARED_RATE_LIMIT is off"""
+    if settings.TELEGRAM_SHARED_RATE_LIMIT:
+        return SharedRateLimiter()
+    return RateLimiter()
+
+
+def _retry_after(response) -> Optional[float]:
+    """Extract retry_after from a 429 response"""
+    if response.status_code != 429:
+        return None
+    try:
+        return float(response.json().get('parameters', {}).get('retry_after', 1))
+    except ValueError:
+        return 1.0
+
+
+def _rewind_files(files):
+    """Rewind file objects so a retried upload sends the full content"""
+    for value in (files or {}).values():
+        fileobj = value[1] if isinstance(value, tuple) else value
+        if hasattr(fileobj, 'seek'):
+            fileobj.seek(0)
+
+
+class TelegramClient:
+    """Sync Telegram Bot API client with a keep-alive connection pool"""
+
+    def __init__(self, token: str = None, limiter: RateLimiter = None, session: requests.Session = None):
+        self.token = token or settings.TELEGRAM_BOT_TOKEN
+        self.limiter = limiter or default_rate_limiter()
+        self.max_retries = settings.TELEGRAM_MAX_RETRIES
+        self.timeout = (settings.TELEGRAM_CONNECT_TIMEOUT, settings.TELEGRAM_READ_TIMEOUT)
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.TELEGRAM_POOL_SIZE)
+        self.session.mount(API_BASE, adapter)
+
+    def method_url(self, method: str) -> str:
+        return f"{API_BASE}/bot{self.token}/{method}"
+
+    def file_url(self, file_path: str) -> str:
+        return f"{API_BASE}/file/bot{self.token}/{file_path}"
+
+    def call(self, method: str, chat_id=None, data: Dict = None, files: Dict = None,
+             timeout: float = None) -> Any:
+        """
+        Call Bot API method and return its `result`
+        Waits for rate limiter slots and retries on 429 using retry_after
+        """
+        payload = dict(data or {})
+        if chat_id is not None:
+            payload['chat_id'] = chat_id
+        timeout = timeout or self.timeout
+
+        for attempt in range(self.max_retries + 1):
+            if method in SEND_METHODS:
+                self.limiter.wait(chat_id)
+            if files:
+                _rewind_files(files)
+                response = self.session.post(self.method_url(method), data=payload, files=files, timeout=timeout)
+            else:
+                response = self.session.post(self.method_url(method), json=payload, timeout=timeout)
+
+            retry_after = _retry_after(response)
+            if retry_after is not None and attempt < self.max_retries:
+                logger.warning(f"Telegram {method} throttled, retrying after {retry_after}s")
+                time.sleep(retry_after)
+                continue
+            return self._result(method, response)
+
+    def _result(self, method: str, response) -> Any:
+        try:
+            body = response.json()
+        except ValueError:
+            body = {'ok': False, 'description': response.text}
+        if response.status_code != 200 or not body.get('ok'):
+            raise TelegramAPIError(method, response.status_code, body.get('description', ''))
+        return body.get('result')
+
+    def send_message(self, chat_id, text: str, parse_mode: str = 'HTML', **params) -> Dict:
+        data = {'text': text, **params}
+        if parse_mode:
+            data['parse_mode'] = parse_mode
+        return self.call('sendMessage', chat_id, data)
+
+    def send_document(self, chat_id, document, caption: str = None, parse_mode: str = 'HTML',
+                      filename: str = None, mime_type: str = None) -> Dict:
+        """Send document from a file object, bytes or an existing file_id"""
+        data = {}
+        if caption:
+            data['caption'] = caption
+            if parse_mode:
+                data['parse_mode'] = parse_mode
+        if isinstance(document, str):
+            data['document'] = document
+            return self.call('sendDocument', chat_id, data)
+        file_value = (filename, document, mime_type) if filename else document
+        return self.call('sendDocument', chat_id, data, files={'document': file_value})
+
+    def send_media_group(self, chat_id, media: List[Dict], files: Dict = None) -> List[Dict]:
+        """Send 2-10 media items as one album; uploads are referenced in media as attach://<name>"""
+        if files:
+            return self.call('sendMediaGroup', chat_id, {'media': json.dumps(media, ensure_ascii=False)}, files=files)
+        return self.call('sendMediaGroup', chat_id, {'media': media})
+
+    def edit_message_text(self, chat_id, message_id: int, text: str, parse_mode: str = 'HTML') -> Dict:
+        data = {'message_id': message_id, 'text': text}
+        if parse_mode:
+            data['parse_mode'] = parse_mode
+        return self.call('editMessageText', chat_id, data)
+
+    def delete_message(self, chat_id, message_id: int) -> bool:
+        return self.call('deleteMessage', chat_id, {'message_id': message_id})
+
+    def get_file_url(self, file_id: str) -> Optional[str]:
+        result = self.call('getFile', data={'file_id': file_id})
+        return self.file_url(result['file_path']) if result else None
+
+    def get_updates(self, offset: int = None, timeout: int = 30):
+        data = {'timeout': timeout}
+        if offset:
+            data['offset'] = offset
+        # Long polling: read timeout must outlast the server-side wait
+        return self.call('getUpdates', data=data, timeout=(self.timeout[0], timeout + 10))
+
+
+class AsyncTelegramClient:
+    """Asyncio Telegram Bot API client on top of a pooled httpx.AsyncClient"""
+
+    def __init__(self, token: str = None, limiter: RateLimiter = None, client=None):
+        import httpx
+
+        self.token = token or settings.TELEGRAM_BOT_TOKEN
+        self.limiter = limiter or default_rate_limiter()
+        self.max_retries = settings.TELEGRAM_MAX_RETRIES
+        self.client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.TELEGRAM_READ_TIMEOUT, connect=settings.TELEGRAM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=settings.TELEGRAM_POOL_SIZE,
+                                max_keepalive_connections=settings.TELEGRAM_POOL_SIZE),
+        )
+
+    def method_url(self, method: str) -> str:
+        return f"{API_BASE}/bot{self.token}/{method}"
+
+    async def call(self, method: str, chat_id=None, data: Dict = None, files: Dict = None) -> Any:
+        payload = dict(data or {})
+        if chat_id is not None:
+            payload['chat_id'] = chat_id
+
+        for attempt in range(self.max_retries + 1):
+            if method in SEND_METHODS:
+                delay = self.limiter.reserve(chat_id)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if files:
+                _rewind_files(files)
+                response = await self.client.post(self.method_url(method), data=payload, files=files)
+            else:
+                response = await self.client.post(self.method_url(method), json=payload)
+
+            retry_after = _retry_after(response)
+            if retry_after is not None and attempt < self.max_retries:
+                logger.warning(f"Telegram {method} throttled, retrying after {retry_after}s")
+                await asyncio.sleep(retry_after)
+                continue
+            try:
+                body = response.json()
+            except ValueError:
+                body = {'ok': False, 'description': response.text}
+            if response.status_code != 200 or not body.get('ok'):
+                raise TelegramAPIError(method, response.status_code, body.get('description', ''))
+            return body.get('result')
+
+    async def send_message(self, chat_id, text: str, parse_mode: str = 'HTML', **params) -> Dict:
+        data = {'text': text, **params}
+        if parse_mode:
+            data['parse_mode'] = parse_mode
+        return await self.call('sendMessage', chat_id, data)
+
+    async def send_document(self, chat_id, document, caption: str = None, parse_mode: str = 'HTML',
+                            filename: str = None, mime_type: str = None) -> Dict:
+        data = {}
+        if caption:
+            data['caption'] = caption
+            if parse_mode:
+                data['parse_mode'] = parse_mode
+        if isinstance(document, str):
+            data['document'] = document
+            return await self.call('sendDocument', chat_id, data)
+        file_value = (filename, document, mime_type) if filename else document
+        return await self.call('sendDocument', chat_id, data, files={'document': file_value})
+
+    async def send_media_group(self, chat_id, media: List[Dict], files: Dict = None) -> List[Dict]:
+        if files:
+            return await self.call('sendMediaGroup', chat_id, {'media': json.dumps(media, ensure_ascii=False)},
+                                   files=files)
+        return await self.call('sendMediaGroup', chat_id, {'media': media})
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_telegram_client() -> TelegramClient:
+    """Get process-wide TelegramClient (shared pool and rate limiter)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TelegramClient()
+    return _client
@@ -0,0 +1,67 @@
+"""
+Idempotent Telegram update processing
+Telegram redelivers updates when the webhook answers slowly; a redelivery
+must not trigger a second LLM completion, Conversation row or follow-up task.
+"""
+
+import logging
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """Redis-backed dedup layer keyed on update_id and (chat_id, message_id)"""
+
+    def __init__(self, redis_client=None):
+        if redis_client is None:
+            # Built per request: reuse the process-wide connection pool
+            from ai_engine.services.memory import get_redis_client
+            redis_client = get_redis_client()
+        self.redis_client = redis_client
+        self.ttl = settings.TELEGRAM_DEDUP_TTL
+
+    def claim_update(self, update_id) -> bool:
+        """
+        Mark update as being processed (SET NX with TTL)
+        Returns False if the update was already claimed - a redelivery
+        """
+        if update_id is None:
+            return True
+        key = f"telegram_update:{update_id}"
+        try:
+            return bool(self.redis_client.set(key, "1", nx=True, ex=self.ttl))
+        except Exception as e:
+            # Fail open: processing twice is better than dropping a message
+            logger.error(f"Redis dedup claim error: {str(e)}")
+            return True
+
+    def release_update(self, update_id):
+        """Drop the claim after failed processing so a redelivery is processed again"""
+        if update_id is None:
+            return
+        try:
+            self.redis_client.delete(f"telegram_update:{update_id}")
+        except Exception as e:
+            logger.error(f"Redis dedup release error: {str(e)}")
+
+    def get_cached_response(self, chat_id, message_id) -> Optional[str]:
+        """Get response already produced for this message, if any"""
+        key = f"telegram_response:{chat_id}:{message_id}"
+        try:
+            cached = self.redis_client.get(key)
+            if cached is not None:
+                return cached.decode('utf-8')
+        except Exception as e:
+            logger.error(f"Redis dedup get error: {str(e)}")
+        return None
+
+    def cache_response(self, chat_id, message_id, response: str):
+        """Store produced response so a repeated message can be replayed"""
+        key = f"telegram_response:{chat_id}:{message_id}"
+        try:
+            self.redis_client.setex(key, self.ttl, response)
+        except Exception as e:
+            logger.error(f"Redis dedup set error: {str(e)}")
@@ -0,0 +1,185 @@
+"""
+Telegram file_id cache
+After the first upload Telegram returns a file_id that can be sent again to
+any chat without re-uploading. The key -> file_id map lives in a Redis hash
+shared by all workers, with a process-local dict in front of it.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from telegram_bot.client import TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+FILE_IDS_KEY = "telegram_file_ids"
+
+# Message fields that carry an uploaded file
+FILE_FIELDS = ('document', 'photo', 'video', 'animation', 'audio', 'voice')
+
+
+class CachedFile(NamedTuple):
+    """File to send: cache key and a loader called only when there is no cached file_id"""
+    key: str
+    load: Callable[[], bytes]
+    filename: Optional[str] = None
+    mime_type: Optional[str] = None
+
+
+def _rejected_file_id(error: TelegramAPIError) -> bool:
+    return error.status_code == 400 and 'file' in error.description.lower()
+
+
+def extract_file_id(message: Optional[Dict]) -> Optional[str]:
+    """file_id of the file attached to a sent message"""
+    for field in FILE_FIELDS:
+        value = (message or {}).get(field)
+        if isinstance(value, list) and value:
+            value = value[-1]  # Photo sizes: the largest one is last
+        if isinstance(value, dict) and value.get('file_id'):
+            return value['file_id']
+    return None
+
+
+class TelegramFileCache:
+    """Map of stable keys (image URL, document path + hash) to Telegram file_ids"""
+
+    def __init__(self, redis_client=None):
+        if redis_client is None:
+            from ai_engine.services.memory import get_redis_client
+            redis_client = get_redis_client()
+        self.redis_client = redis_client
+        self._local: Dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        file_id = self._local.get(key)
+        if file_id is not None:
+            return file_id
+        try:
+            value = self.redis_client.hget(FILE_IDS_KEY, key)
+        except Exception as e:
+            logger.error(f"Redis file_id get error: {str(e)}")
+            return None
+        if value is None:
+            return None
+        file_id = value.decode('utf-8') if isinstance(value, bytes) else value
+        self._local[key] = file_id
+        return file_id
+
+    def set(self, key: str, file_id: str):
+        self._local[key] = file_id
+        try:
+            self.redis_client.hset(FILE_IDS_KEY, key, file_id)
+        except Exception as e:
+            logger.error(f"Redis file_id set error: {str(e)}")
+
+    def forget(self, key: str):
+        self._local.pop(key, None)
+        try:
+            self.redis_client.hdel(FILE_IDS_KEY, key)
+        except Exception as e:
+            logger.error(f"Redis file_id delete error: {str(e)}")
+
+    def send_document(self, client, chat_id, key: str, load: Callable[[], bytes], caption: str = None,
+                      filename: str = None, mime_type: str = None) -> Dict:
+        """
+        Send document by cached file_id, uploading load() only on the first send
+        A file_id Telegram no longer accepts is dropped and the file uploaded again
+        """
+        file_id = self.get(key)
+        if file_id:
+            try:
+                return client.send_document(chat_id, file_id, caption=caption)
+            except TelegramAPIError as e:
+                if not _rejected_file_id(e):
+                    raise
+                logger.warning(f"Cached file_id for {key} rejected ({e.description}), uploading again")
+                self.forget(key)
+
+        message = client.send_document(chat_id, load(), caption=caption, filename=filename, mime_type=mime_type)
+        file_id = extract_file_id(message)
+        if file_id:
+            self.set(key, file_id)
+        else:
+            logger.warning(f"No file_id in sendDocument result for {key}")
+        return message
+
+    def send_media_group(self, client, chat_id, files: List[CachedFile], caption: str = None,
+                         max_workers: int = 4) -> List[Dict]:
+        """
+        Send files as one document album (sendMediaGroup)
+        Only files without a cached file_id are loaded, concurrently on up to max_workers
+        threads; files that fail to load are left out of the album
+        """
+        file_ids = [self.get(f.key) for f in files]
+        try:
+            messages = self._send_album(client, chat_id, files, file_ids, caption, max_workers)
+        except TelegramAPIError as e:
+            if not any(file_ids) or not _rejected_file_id(e):
+                raise
+            logger.warning(f"Cached file_id rejected in album ({e.description}), uploading all files again")
+            for f, file_id in zip(files, file_ids):
+                if file_id:
+                    self.forget(f.key)
+            file_ids = [None] * len(files)
+            messages = self._send_album(client, chat_id, files, file_ids, caption, max_workers)
+        return messages
+
+    def _send_album(self, client, chat_id, files, file_ids, caption, max_workers) -> List[Dict]:
+        missing = [i for i, file_id in enumerate(file_ids) if not file_id]
+        contents = {}
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+                contents = dict(zip(missing, pool.map(lambda i: self._load(files[i]), missing)))
+        items = [i for i in range(len(files)) if file_ids[i] or contents.get(i) is not None]
+        if not items:
+            return []
+
+        if len(items) == 1:  # An album needs at least two items
+            f, file_id = files[items[0]], file_ids[items[0]]
+            message = client.send_document(chat_id, file_id or contents[items[0]], caption=caption,
+                                           filename=f.filename, mime_type=f.mime_type)
+            sent = [message]
+        else:
+            media, uploads = [], {}
+            for i in items:
+                f = files[i]
+                if file_ids[i]:
+                    media.append({'type': 'document', 'media': file_ids[i]})
+                else:
+                    media.append({'type': 'document', 'media': f"attach://file{i}"})
+                    uploads[f"file{i}"] = (f.filename or f"file{i}", contents[i], f.mime_type)
+            if caption:
+                # Telegram shows the caption of the last document under the album
+                media[-1].update(caption=caption, parse_mode='HTML')
+            sent = client.send_media_group(chat_id, media, files=uploads or None) or []
+
+        for i, message in zip(items, sent):
+            file_id = extract_file_id(message)
+            if file_id and file_id != file_ids[i]:
+                self.set(files[i].key, file_id)
+        return sent
+
+    @staticmethod
+    def _load(f: CachedFile) -> Optional[bytes]:
+        try:
+            return f.load()
+        except Exception as e:
+            logger.error(f"Failed to load {f.key}: {e}")
+            return None
+
+
+_file_cache = None
+_file_cache_lock = threading.Lock()
+
+
+def get_telegram_file_cache() -> TelegramFileCache:
+    """Get process-wide TelegramFileCache"""
+    global _file_cache
+    if _file_cache is None:
+        with _file_cache_lock:
+            if _file_cache is None:
+                _file_cache = TelegramFileCache()
+    return _file_cache
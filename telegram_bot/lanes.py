@@ -0,0 +1,59 @@
+"""
+Per-chat ordered work lanes
+Messages from one chat must be processed in order (conversation memory is
+read-modify-write), while different chats run fully in parallel.
+Each chat is pinned to one of N lanes by hashing its telegram_id; every lane
+is consumed by exactly one worker.
+"""
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def lane_for_chat(telegram_id: int, lanes: int) -> int:
+    """
+    Map chat to a lane with jump consistent hashing
+    Changing the number of lanes only moves ~1/N of the chats
+    """
+    key = int(telegram_id) & 0xFFFFFFFFFFFFFFFF
+    bucket, jump = -1, 0
+    while jump < lanes:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+
+def lane_queue_name(lane: int) -> str:
+    """Celery queue name for a lane"""
+    return f"{settings.TELEGRAM_UPDATES_QUEUE}.lane{lane}"
+
+
+def queue_for_chat(telegram_id: int) -> str:
+    """Celery queue that processes updates of this chat"""
+    return lane_queue_name(lane_for_chat(telegram_id, settings.TELEGRAM_WORKER_LANES))
+
+
+class ChatLaneExecutor:
+    """In-process lanes: one single-threaded executor per lane"""
+
+    def __init__(self, lanes: int = None):
+        self.lanes = lanes or settings.TELEGRAM_WORKER_LANES
+        self._executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"chat-lane-{i}")
+            for i in range(self.lanes)
+        ]
+        logger.info(f"ChatLaneExecutor started with {self.lanes} lanes")
+
+    def submit(self, telegram_id: int, fn, *args, **kwargs) -> Future:
+        """Run fn on the lane of this chat, after earlier work of the same chat"""
+        lane = lane_for_chat(telegram_id, self.lanes)
+        return self._executors[lane].submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True):
+        for executor in self._executors:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,63 @@
+"""
+Management command to run one Celery worker per Telegram update lane.
+Each lane queue gets exactly one single-concurrency consumer, which keeps
+messages of a chat in order while chats on different lanes run in parallel.
+"""
+import signal
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from telegram_bot.lanes import lane_queue_name
+
+
+class Command(BaseCommand):
+    help = "Run a single-concurrency Celery worker for every Telegram update lane"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lanes",
+            type=int,
+            default=None,
+            help="Number of lanes (default: TELEGRAM_WORKER_LANES)"
+        )
+        parser.add_argument(
+            "--loglevel",
+            type=str,
+            default="info",
+            help="Celery log level (default: info)"
+        )
+
+    def handle(self, *args, **options):
+        lanes = options.get("lanes") or settings.TELEGRAM_WORKER_LANES
+        if lanes != settings.TELEGRAM_WORKER_LANES:
+            self.stdout.write(self.style.WARNING(
+                f"--lanes={lanes} differs from TELEGRAM_WORKER_LANES={settings.TELEGRAM_WORKER_LANES}; "
+                f"the webhook must use the same value"
+            ))
+
+        processes = []
+        for lane in range(lanes):
+            queue = lane_queue_name(lane)
+            command = [
+                sys.executable, "-m", "celery", "-A", "autouristv1", "worker",
+                "-Q", queue,
+                "-n", f"lane{lane}@%h",
+                "--concurrency=1",
+                "--prefetch-multiplier=1",
+                f"--loglevel={options['loglevel']}",
+            ]
+            self.stdout.write(f"Starting worker for {queue}")
+            processes.append(subprocess.Popen(command))
+
+        def stop(signum, frame):
+            for process in processes:
+                process.send_signal(signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        exit_codes = [process.wait() for process in processes]
+        self.stdout.write(self.style.SUCCESS(f"Lane workers stopped: {exit_codes}"))
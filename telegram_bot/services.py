@@ -0,0 +1,107 @@
+"""
+Telegram update processing pipeline
+Shared by the webhook view (inline mode) and the Celery worker (async mode)
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+from ai_engine.services import AIConversationService
+from leads.models import Lead
+from telegram_bot.client import get_telegram_client
+from telegram_bot.dedup import UpdateDeduplicator
+from telegram_bot.streaming import TelegramStreamRenderer
+
+logger = logging.getLogger(__name__)
+
+
+def extract_message(update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the message part of an update if it can be processed"""
+    message = update.get('message')
+    if not message or 'from' not in message or 'message_id' not in message:
+        return None
+    return message
+
+
+def handle_update(update: Dict[str, Any]):
+    """
+    Run the full pipeline for a single Telegram update:
+    Lead upsert, AI processing and sending the response back
+    """
+    message = extract_message(update)
+    if not message:
+        logger.warning("No message in update data")
+        return
+
+    telegram_id = message['from']['id']
+    username = message['from'].get('username', '')
+    first_name = message['from'].get('first_name', '')
+    last_name = message['from'].get('last_name', '')
+    message_text = message.get('text', '')
+    message_id = message['message_id']
+
+    logger.info(f"Message from {telegram_id} (@{username}): {message_text[:100]}")
+
+    # Get or create lead
+    lead, created = Lead.objects.get_or_create(
+        telegram_id=telegram_id,
+        defaults={
+            'username': username,
+            'first_name': first_name,
+            'last_name': last_name,
+        }
+    )
+
+    if created:
+        logger.info(f"New lead created: {telegram_id} - {first_name} {last_name}")
+
+    # Update lead info if not created
+    if not created:
+        lead.username = username
+        lead.first_name = first_name
+        lead.last_name = last_name
+        lead.save()
+
+    # Replay response if this message was already answered
+    dedup = UpdateDeduplicator()
+    response = dedup.get_cached_response(telegram_id, message_id)
+    if response is not None:
+        logger.info(f"Replaying cached response for message {message_id} from {telegram_id}")
+        send_telegram_message(telegram_id, response)
+        return
+
+    # Stream mode: show the reply while it is generated
+    renderer = None
+    if settings.TELEGRAM_STREAM_RESPONSES:
+        renderer = TelegramStreamRenderer(telegram_id)
+        renderer.start()
+
+    # Process message through AI
+    logger.info(f"Processing message through AI for lead {telegram_id}")
+    ai_service = AIConversationService(stream_handler=renderer.update if renderer else None)
+    try:
+        # A failure propagates: it must not be cached as this message's answer
+        response = ai_service.process_message(lead, message_text, message_id, raise_errors=True)
+    except Exception:
+        if renderer:
+            renderer.discard()
+        raise
+    dedup.cache_response(telegram_id, message_id, response)
+
+    # Send response back to Telegram
+    logger.info(f"Sending response to Telegram: {response[:100]}...")
+    if renderer:
+        renderer.finish(response)
+    else:
+        send_telegram_message(telegram_id, response)
+
+
+def send_telegram_message(telegram_id, message):
+    """Send message back to Telegram user"""
+    try:
+        get_telegram_client().send_message(telegram_id, message)
+        logger.info(f"Message sent to {telegram_id}")
+    except Exception as e:
+        logger.error(f"Failed to send message: {str(e)}")
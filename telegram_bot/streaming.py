@@ -0,0 +1,110 @@
+"""
+Progressive delivery of streamed LLM replies to Telegram
+Sends a placeholder, then edits it with throttled editMessageText calls
+while the reply is generated. The final edit carries the processed
+response (command tags handled, HTML formatting).
+"""
+
+import logging
+import re
+import time
+
+from django.conf import settings
+
+from telegram_bot.client import TelegramAPIError, get_telegram_client
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER = "✍️ Печатаю ответ..."
+
+# Complete command tags like [GENERATE_CONTRACT:...] and a tag still being generated
+COMMAND_TAG_RE = re.compile(r"\[[A-Z_]+:?[^\]]*\]")
+PARTIAL_COMMAND_RE = re.compile(r"\[[A-Z_]*(:[^\]]*)?$")
+# Intermediate edits are sent as plain text: half-generated HTML would be rejected
+HTML_TAG_RE = re.compile(r"<[^>]*>|<[^>]*$")
+
+
+def visible_text(text: str) -> str:
+    """Text safe to show while the reply is still streaming"""
+    text = COMMAND_TAG_RE.sub("", text)
+    text = PARTIAL_COMMAND_RE.sub("", text)
+    return HTML_TAG_RE.sub("", text).strip()
+
+
+class TelegramStreamRenderer:
+    """Render a streaming reply into a single Telegram message"""
+
+    def __init__(self, chat_id, client=None, min_interval: float = None, min_chars: int = None):
+        self.chat_id = chat_id
+        self.client = client or get_telegram_client()
+        self.min_interval = min_interval if min_interval is not None else settings.TELEGRAM_STREAM_EDIT_INTERVAL
+        self.min_chars = min_chars if min_chars is not None else settings.TELEGRAM_STREAM_MIN_CHARS
+        self.message_id = None
+        self.last_edit = 0.0
+        self.last_text = ""
+
+    def start(self):
+        """Send placeholder message that will be edited as the reply streams"""
+        try:
+            result = self.client.send_message(self.chat_id, PLACEHOLDER, parse_mode=None)
+            self.message_id = result['message_id']
+            self.last_edit = time.monotonic()
+        except Exception as e:
+            logger.error(f"Failed to send stream placeholder: {str(e)}")
+
+    def update(self, text: str):
+        """Stream handler: called with the text generated so far"""
+        if self.message_id is None:
+            return
+        visible = visible_text(text)
+        now = time.monotonic()
+        if (not visible or now - self.last_edit < self.min_interval
+                or len(visible) - len(self.last_text) < self.min_chars):
+            return
+        self._edit(visible, parse_mode=None)
+        self.last_edit = now
+
+    def finish(self, text: str):
+        """Replace placeholder with the final processed response"""
+        if not text.strip():
+            # Nothing to deliver (e.g. the reply was only command tags): Telegram rejects empty text
+            logger.warning(f"Empty response for {self.chat_id}, nothing to send")
+            self.discard()
+            return
+        if self.message_id is not None:
+            if self._edit(text, parse_mode='HTML'):
+                return
+            # Markup Telegram rejects: keep the reply in place as plain text
+            plain = HTML_TAG_RE.sub("", text).strip()
+            if plain and self._edit(plain, parse_mode=None):
+                return
+            # Still rejected (e.g. too long): do not leave a half-streamed placeholder behind
+            self.discard()
+        try:
+            self.client.send_message(self.chat_id, text)
+            logger.info(f"Message sent to {self.chat_id}")
+        except Exception as e:
+            logger.error(f"Failed to send message: {str(e)}")
+
+    def discard(self):
+        """Delete the placeholder, e.g. when the reply is delivered another way"""
+        if self.message_id is None:
+            return
+        try:
+            self.client.delete_message(self.chat_id, self.message_id)
+        except Exception as e:
+            logger.warning(f"Failed to delete stream placeholder: {str(e)}")
+        self.message_id = None
+
+    def _edit(self, text: str, parse_mode) -> bool:
+        try:
+            self.client.edit_message_text(self.chat_id, self.message_id, text, parse_mode=parse_mode)
+            self.last_text = text
+            return True
+        except TelegramAPIError as e:
+            if 'message is not modified' in e.description:
+                return True
+            logger.warning(f"Failed to edit streamed message: {str(e)}")
+        except Exception as e:
+            logger.warning(f"Failed to edit streamed message: {str(e)}")
+        return False
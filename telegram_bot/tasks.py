@@ -0,0 +1,46 @@
+"""
+Celery tasks for telegram_bot app
+"""
+import logging
+
+import httpx
+from celery import shared_task
+from django.db import InterfaceError, OperationalError
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Failures worth another attempt; anything else is a bug and fails the task at once
+TRANSIENT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    httpx.TransportError,
+    RedisConnectionError,
+    RedisTimeoutError,
+    OperationalError,
+    InterfaceError,
+)
+
+
+@shared_task(
+    ignore_result=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    autoretry_for=TRANSIENT_ERRORS,
+    max_retries=3,
+    retry_backoff=True,
+    retry_backoff_max=60,
+)
+def process_telegram_update_task(update: dict):
+    """
+    Process a raw Telegram update off the request thread
+    Acked only after it ran, so a killed worker hands the update to another one;
+    a retry replays the cached answer instead of sending a second reply
+
+    Args:
+        update: Update payload exactly as received by the webhook
+    """
+    from telegram_bot.services import handle_update
+
+    logger.info(f"=== TELEGRAM UPDATE TASK STARTED === update_id={update.get('update_id')}")
+    handle_update(update)
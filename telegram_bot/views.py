@@ -5,9 +5,11 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
-from ai_engine.services import AIConversationService
-from leads.models import Lead, Conversation
-from contract_manager.models import Contract, SMSVerification
+from django.conf import settings
+from telegram_bot.dedup import UpdateDeduplicator
+from telegram_bot.lanes import queue_for_chat
+from telegram_bot.services import extract_message, handle_update
+from telegram_bot.tasks import process_telegram_update_task
 
 logger = logging.getLogger(__name__)
 
@@ -23,49 +25,34 @@ class TelegramWebhookView(View):
             logger.info(f"=== TELEGRAM WEBHOOK RECEIVED ===")
             logger.debug(f"Full webhook data: {json.dumps(data, indent=2, ensure_ascii=False)}")
             
-            # Extract message info
-            message = data.get('message')
-            if not message:
+            if not extract_message(data):
                 logger.warning("No message in webhook data")
                 return JsonResponse({'status': 'ok'})
             
-            telegram_id = message['from']['id']
-            username = message['from'].get('username', '')
-            first_name = message['from'].get('first_name', '')
-            last_name = message['from'].get('last_name', '')
-            message_text = message.get('text', '')
-            message_id = message['message_id']
+            # Telegram redelivers slow updates - process each update_id once
+            dedup = UpdateDeduplicator()
+            if not dedup.claim_update(data.get('update_id')):
+                logger.info(f"Duplicate update {data.get('update_id')} - skipping")
+                return JsonResponse({'status': 'duplicate'})
             
-            logger.info(f"Message from {telegram_id} (@{username}): {message_text[:100]}")
+            # Async mode: acknowledge immediately, worker pool does AI and sending
+            if settings.TELEGRAM_ASYNC_WEBHOOK:
+                try:
+                    # Same chat -> same lane, so per-chat order is kept
+                    telegram_id = data['message']['from']['id']
+                    process_telegram_update_task.apply_async(args=[data], queue=queue_for_chat(telegram_id))
+                    logger.info(f"Update {data.get('update_id')} queued for processing")
+                    return JsonResponse({'status': 'queued'})
+                except Exception as e:
+                    logger.error(f"Failed to enqueue update, processing inline: {str(e)}")
             
-            # Get or create lead
-            lead, created = Lead.objects.get_or_create(
-                telegram_id=telegram_id,
-                defaults={
-                    'username': username,
-                    'first_name': first_name,
-                    'last_name': last_name,
-                }
-            )
-            
-            if created:
-                logger.info(f"New lead created: {telegram_id} - {first_name} {last_name}")
-            
-            # Update lead info if not created
-            if not created:
-                lead.username = username
-                lead.first_name = first_name  
-                lead.last_name = last_name
-                lead.save()
-            
-            # Process message through AI
-            logger.info(f"Processing message through AI for lead {telegram_id}")
-            ai_service = AIConversationService()
-            response = ai_service.process_message(lead, message_text, message_id)
-            
-            # Send response back to Telegram
-            logger.info(f"Sending response to Telegram: {response[:100]}...")
-            self._send_telegram_message(telegram_id, response)
+            try:
+                handle_update(data)
+            except Exception as e:
+                # Release the claim and answer non-2xx so Telegram redelivers the update
+                dedup.release_update(data.get('update_id'))
+                logger.exception(f"Update {data.get('update_id')} failed: {str(e)}")
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
             
             logger.info(f"=== WEBHOOK PROCESSED SUCCESSFULLY ===")
             return JsonResponse({'status': 'ok'})
@@ -73,25 +60,6 @@ class TelegramWebhookView(View):
         except Exception as e:
             logger.exception(f"Webhook error: {str(e)}")
             return JsonResponse({'status': 'error', 'message': str(e)})
-    
-    def _send_telegram_message(self, telegram_id, message):
-        """Send message back to Telegram user"""
-        import requests
-        from django.conf import settings
-        
-        url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {
-            'chat_id': telegram_id,
-            'text': message,
-            'parse_mode': 'HTML'
-        }
-        
-        try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-            logger.info(f"Message sent to {telegram_id}")
-        except Exception as e:
-            logger.error(f"Failed to send message: {str(e)}")
 
 
 @csrf_exempt
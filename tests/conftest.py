@@ -0,0 +1,262 @@
+"""
+Shared test fixtures
+"""
+
+import time
+
+import pytest
+import redis
+
+
+class FakeRedis:
+    """
+    Minimal in-memory stand-in for redis.Redis
+    Implements only the commands used by the services under test
+    and counts round-trips (a pipeline execute is one round-trip) and
+    payload bytes sent/received.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.round_trips = 0
+        self.bytes_moved = 0
+
+    # Helpers
+    def _alive(self, key):
+        expires = self.expiry.get(key)
+        if expires is not None and expires <= time.time():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.data
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode('utf-8')
+
+    @classmethod
+    def _size(cls, value):
+        if value is None or isinstance(value, bool):
+            return 0
+        if isinstance(value, (bytes, str, int, float)):
+            return len(cls._encode(value))
+        if isinstance(value, dict):
+            return sum(cls._size(k) + cls._size(v) for k, v in value.items())
+        if isinstance(value, (list, tuple)):
+            return sum(cls._size(v) for v in value)
+        return 0
+
+    def _list(self, key):
+        if not self._alive(key):
+            return None
+        if not isinstance(self.data[key], list):
+            raise redis.ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return self.data[key]
+
+    def _run(self, name, args, kwargs):
+        self.bytes_moved += self._size(args) + self._size(kwargs)
+        result = getattr(self, f"_{name}")(*args, **kwargs)
+        self.bytes_moved += self._size(result)
+        return result
+
+    def _call(self, name, *args, **kwargs):
+        self.round_trips += 1
+        return self._run(name, args, kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not hasattr(type(self), f"_{name}"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    # Strings
+    def _get(self, key):
+        return self.data.get(key) if self._alive(key) else None
+
+    def _mget(self, keys):
+        return [self._get(key) for key in keys]
+
+    def _set(self, key, value, nx=False, ex=None):
+        if nx and self._alive(key):
+            return None
+        self.data[key] = self._encode(value)
+        self.expiry.pop(key, None)
+        if ex:
+            self.expiry[key] = time.time() + ex
+        return True
+
+    def _setex(self, key, ttl, value):
+        return self._set(key, value, ex=ttl)
+
+    def _incr(self, key):
+        value = int(self._get(key) or 0) + 1
+        self.data[key] = self._encode(value)
+        return value
+
+    def _delete(self, *keys):
+        removed = 0
+        for key in keys:
+            key = key.decode('utf-8') if isinstance(key, bytes) else key
+            if self._alive(key):
+                removed += 1
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return removed
+
+    def _exists(self, key):
+        return int(self._alive(key))
+
+    def _expire(self, key, ttl):
+        if not self._alive(key):
+            return False
+        self.expiry[key] = time.time() + ttl
+        return True
+
+    def _type(self, key):
+        if not self._alive(key):
+            return b'none'
+        value = self.data[key]
+        if isinstance(value, list):
+            return b'list'
+        if isinstance(value, dict):
+            return b'zset' if getattr(value, 'zset', False) else b'hash'
+        return b'string'
+
+    # Lists
+    def _rpush(self, key, *values):
+        items = self._list(key)
+        if items is None:
+            items = self.data[key] = []
+        items.extend(self._encode(v) for v in values)
+        return len(items)
+
+    def _ltrim(self, key, start, end):
+        items = self._list(key)
+        if items is not None:
+            end = len(items) + end if end < 0 else end
+            start = max(0, len(items) + start) if start < 0 else start
+            self.data[key] = items[start:end + 1]
+        return True
+
+    def _lrange(self, key, start, end):
+        items = self._list(key)
+        if items is None:
+            return []
+        end = len(items) + end if end < 0 else end
+        start = max(0, len(items) + start) if start < 0 else start
+        return items[start:end + 1]
+
+    def _llen(self, key):
+        items = self._list(key)
+        return len(items) if items is not None else 0
+
+    # Hashes
+    def _hincrby(self, key, field, amount=1):
+        if not self._alive(key):
+            self.data[key] = {}
+        hash_ = self.data[key]
+        field = self._encode(field)
+        hash_[field] = self._encode(int(hash_.get(field, 0)) + amount)
+        return int(hash_[field])
+
+    def _hset(self, key, field=None, value=None, mapping=None):
+        if not self._alive(key):
+            self.data[key] = {}
+        hash_ = self.data[key]
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        for f, v in items.items():
+            hash_[self._encode(f)] = self._encode(v)
+        return len(items)
+
+    def _hget(self, key, field):
+        return self.data[key].get(self._encode(field)) if self._alive(key) else None
+
+    def _hgetall(self, key):
+        return dict(self.data[key]) if self._alive(key) else {}
+
+    def _hdel(self, key, *fields):
+        hash_ = self.data[key] if self._alive(key) else {}
+        return sum(hash_.pop(self._encode(f), None) is not None for f in fields)
+
+    # Sorted sets
+    def _zadd(self, key, mapping):
+        zset = self.data.get(key) if self._alive(key) else None
+        if zset is None:
+            zset = self.data[key] = ZSet()
+        for member, score in mapping.items():
+            zset[self._encode(member)] = score
+        return len(mapping)
+
+    def _zcard(self, key):
+        return len(self.data[key]) if self._alive(key) else 0
+
+    def _zpopmin(self, key, count=1):
+        if not self._alive(key):
+            return []
+        zset = self.data[key]
+        popped = sorted(zset.items(), key=lambda item: item[1])[:count]
+        for member, _ in popped:
+            del zset[member]
+        return popped
+
+    def _zrem(self, key, *members):
+        if not self._alive(key):
+            return 0
+        zset = self.data[key]
+        return sum(zset.pop(self._encode(m), None) is not None for m in members)
+
+
+class ZSet(dict):
+    zset = True
+
+
+class FakePipeline:
+    """Queues commands and runs them as one round-trip"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        if not hasattr(FakeRedis, f"_{name}"):
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def __len__(self):
+        return len(self.commands)
+
+    def execute(self):
+        self.redis.round_trips += 1
+        results = []
+        for name, args, kwargs in self.commands:
+            try:
+                results.append(self.redis._run(name, args, kwargs))
+            except redis.ResponseError as e:
+                results.append(e)
+        self.commands = []
+        for result in results:
+            if isinstance(result, redis.ResponseError):
+                raise result
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def fake_redis():
+    """In-memory Redis with round-trip counting"""
+    return FakeRedis()
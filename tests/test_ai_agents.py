@@ -3,6 +3,7 @@ Comprehensive Tests for Multi-Agent AI System
 Tests AI selling skills, content generation, and agent routing
 """
 
+import re
 import pytest
 from decimal import Decimal
 from unittest.mock import Mock, patch, MagicMock
@@ -92,6 +93,34 @@ class TestAgentOrchestrator:
         assert orchestrator.route_message(test_lead, "Помогите", {}) == 'intake'
 
 
+class TestIntentMatcher:
+    """Compiled keyword matcher must agree with plain substring checks"""
+    
+    def test_matches_same_labels_as_substring_scan(self):
+        from ai_engine.agents.intent_matcher import IntentMatcher
+        
+        tables = {**AgentOrchestrator.INTENT_KEYWORDS, **AgentOrchestrator.STAGE_KEYWORDS}
+        matcher = IntentMatcher(tables)
+        messages = [
+            "хочу ходатайство и договор", "сколько стоит", "подготовьте документы",
+            "перенести суд на неделю", "мой код 123456", "просто привет", "что дальше?",
+            "спасибо за ходатайство, что дальше", "номер 1234567", "сколько стоит договор",
+        ]
+        for message in messages:
+            # Reference: every keyword of every table checked on its own
+            expected = {
+                label for label, keywords in tables.items()
+                if any(re.search(k, message) if k.startswith('\\b') else k in message for k in keywords)
+            }
+            assert matcher.match(message) == expected, message
+    
+    def test_overlapping_keywords_all_match(self):
+        from ai_engine.agents.intent_matcher import IntentMatcher
+        
+        matcher = IntentMatcher({'short': ['подготов'], 'long': ['подготовлю ходатайство']})
+        assert matcher.match("подготовлю ходатайство") == {'short', 'long'}
+
+
 class TestIntakeAgent:
     """Test intake agent - article identification"""
     
@@ -402,19 +431,70 @@ class TestAIContentQuality:
 class TestPerformance:
     """Test system performance"""
     
+    ROUTING_CORPUS = [
+        "Оформите договор",
+        "Какие шансы выиграть?",
+        "Нужно ходатайство о переносе, суд завтра",
+        "Сколько стоит ваша помощь?",
+        "Лишили прав за пьянку",
+        "Меня остановили на трассе, инспектор составил протокол. " * 20,
+        "Меня остановили на трассе, инспектор составил протокол. " * 20 + " что дальше",
+    ]
+    
     def test_orchestrator_routing_speed(self, test_lead):
-        """Test that routing is fast (< 10ms)"""
+        """Benchmark routing over a mixed corpus: median < 0.5ms, p99 < 2ms"""
+        import statistics
         import time
         
         orchestrator = AgentOrchestrator()
-        
-        start = time.time()
-        for _ in range(100):
-            orchestrator.route_message(test_lead, "Оформите договор", {})
-        end = time.time()
-        
-        avg_time = (end - start) / 100
-        assert avg_time < 0.01  # Less than 10ms per routing
+        history_context = {'conversation_history': [
+            {'user': 'да', 'assistant': 'Для ходатайства нужно: ФИО полностью, адрес регистрации. ' + self.ROUTING_CORPUS[-1]}
+        ]}
+        corpus = [(message, {}) for message in self.ROUTING_CORPUS]
+        corpus.append(("Иванов Иван Иванович, Москва", history_context))
+        
+        for message, context in corpus:  # Warm-up
+            orchestrator.route_message(test_lead, message, context)
+        
+        timings = []
+        for _ in range(200):
+            for message, context in corpus:
+                start = time.perf_counter()
+                orchestrator.route_message(test_lead, message, context)
+                timings.append(time.perf_counter() - start)
+        
+        timings.sort()
+        median = statistics.median(timings)
+        p99 = timings[int(len(timings) * 0.99)]
+        print(f"\nRouting: median {median * 1e6:.1f}µs, p99 {p99 * 1e6:.1f}µs")
+        assert median < 0.0005
+        assert p99 < 0.002
+    
+    def test_intent_matcher_speed(self):
+        """Compiled matcher: one pass per message, < 100µs per call on the routing corpus"""
+        import time
+        from ai_engine.agents.intent_matcher import IntentMatcher
+        
+        tables = {**AgentOrchestrator.INTENT_KEYWORDS, **AgentOrchestrator.STAGE_KEYWORDS}
+        matcher = IntentMatcher(tables)
+        messages = [message.lower() for message in self.ROUTING_CORPUS]
+        
+        for text in messages:
+            assert matcher.match(text) == {
+                label for label, keywords in tables.items()
+                if any(re.search(k, text) if k.startswith('\\b') else k in text for k in keywords)
+            }
+        
+        best = float('inf')
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(300):
+                for text in messages:
+                    matcher.match(text)
+            best = min(best, time.perf_counter() - start)
+        per_call = best / (300 * len(messages))
+        print(f"\nKeyword match: {per_call * 1e6:.1f}µs per message")
+        assert per_call < 0.0001
     
     def test_knowledge_base_search_speed(self):
         """Test that knowledge base search is fast"""
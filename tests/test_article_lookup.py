@@ -0,0 +1,82 @@
+"""
+Tests for canonical article keys and O(1) KnowledgeBase lookups
+"""
+
+import time
+
+import pytest
+
+from ai_engine.data.article_codes import canonical_article_key
+from ai_engine.data.knowledge_base import KnowledgeBase
+
+
+@pytest.fixture(scope="module")
+def kb():
+    return KnowledgeBase()
+
+
+class TestCanonicalArticleKey:
+    """All formats used in the project map to one key"""
+
+    @pytest.mark.parametrize("code", [
+        "ч.1 ст.12.8 КоАП РФ", "ч. 1 ст. 12.8", "ст.12.8 ч.1", "12.8ч.1", "часть 1 статьи 12.8",
+    ])
+    def test_part_formats(self, code):
+        assert canonical_article_key(code) == "12.8ч.1"
+
+    @pytest.mark.parametrize("code", ["ст.8.23 КоАП РФ", "ст. 8.23", "8.23"])
+    def test_article_formats(self, code):
+        assert canonical_article_key(code) == "8.23"
+
+    def test_criminal_code_does_not_collide(self):
+        assert canonical_article_key("ст.264.1 УК РФ") == "УК:264.1"
+        assert canonical_article_key("ст.264.1 КоАП РФ") == "264.1"
+
+    def test_no_article_number(self):
+        assert canonical_article_key("просто текст") is None
+
+
+class TestKnowledgeBaseLookup:
+    """get_article_by_code / get_fine_from_complete_db through the key indexes"""
+
+    @pytest.mark.parametrize("code", ["ч.1 ст.12.8 КоАП РФ", "ст. 12.8 ч. 1", "12.8ч.1"])
+    def test_curated_article_in_any_format(self, kb, code):
+        assert kb.get_article_by_code(code) is kb.koap_articles[0]
+
+    def test_criminal_article(self, kb):
+        assert kb.get_article_by_code("ст.264.1 УК РФ")['article'] == "ст.264.1 УК РФ"
+        assert kb.get_fine_from_complete_db("ст.264.1 УК РФ") is None
+
+    @pytest.mark.parametrize("code", ["ч.2 ст.12.9 КоАП РФ", "ст. 12.9 ч. 2", "12.9ч.2"])
+    def test_complete_db_in_any_format(self, kb, code):
+        fine = kb.get_fine_from_complete_db(code)
+        assert fine['article'] == code
+        assert fine['title'] == kb.koap_fines_complete["12.9ч.2"]['description']
+
+    def test_article_without_part(self, kb):
+        assert kb.get_fine_from_complete_db("ст.8.23 КоАП РФ")['title'] == kb.koap_fines_complete["8.23"]['description']
+        assert kb.get_fine_from_complete_db("8.23") is not None
+
+    def test_every_fine_key_resolves(self, kb):
+        for key in kb.koap_fines_complete:
+            assert kb.get_fine_from_complete_db(key) is not None
+
+    def test_lookup_is_flat_in_table_size(self):
+        kb = KnowledgeBase()
+        code = "ч.1 ст.12.26 КоАП РФ"
+
+        def timed():
+            start = time.perf_counter()
+            for _ in range(2000):
+                kb.get_article_by_code(code)
+            return time.perf_counter() - start
+
+        small = min(timed() for _ in range(3))
+        for i in range(2000):
+            kb._index_article({'article': f'ч.1 ст.{i}.99 КоАП РФ', 'title': '', 'keywords': []})
+        large = min(timed() for _ in range(3))
+        assert large < small * 3
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,90 @@
+"""
+Benchmark for per-chat ordered work lanes
+Throughput must scale with lanes for many-chat workloads while
+messages of each chat stay in order.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+from django.test import override_settings
+
+from telegram_bot.lanes import ChatLaneExecutor, lane_for_chat, queue_for_chat
+
+
+CHATS = 128
+MESSAGES_PER_CHAT = 2
+WORK_SECONDS = 0.005  # Simulated AI processing per message
+
+
+def run_workload(lanes: int):
+    """Process all messages on `lanes` lanes, return (throughput, processed order per chat)"""
+    executor = ChatLaneExecutor(lanes)
+    processed = defaultdict(list)
+    lock = threading.Lock()
+
+    def work(chat_id, seq):
+        time.sleep(WORK_SECONDS)
+        with lock:
+            processed[chat_id].append(seq)
+
+    start = time.perf_counter()
+    # Interleave chats like real traffic
+    for seq in range(MESSAGES_PER_CHAT):
+        for chat_id in range(CHATS):
+            executor.submit(10_000_000 + chat_id, work, chat_id, seq)
+    executor.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+
+    return CHATS * MESSAGES_PER_CHAT / elapsed, processed
+
+
+class TestLaneHashing:
+    """Test chat to lane mapping"""
+
+    def test_lane_is_stable_and_in_range(self):
+        for chat_id in (1, 123456789, -1001234567890):
+            lane = lane_for_chat(chat_id, 8)
+            assert 0 <= lane < 8
+            assert lane_for_chat(chat_id, 8) == lane
+
+    def test_lanes_are_balanced(self):
+        counts = defaultdict(int)
+        for chat_id in range(10_000):
+            counts[lane_for_chat(chat_id, 8)] += 1
+        assert min(counts.values()) > 10_000 / 8 * 0.8
+
+    def test_adding_lane_moves_few_chats(self):
+        moved = sum(lane_for_chat(c, 8) != lane_for_chat(c, 9) for c in range(10_000))
+        assert moved < 10_000 * 0.2  # ~1/9 expected
+
+    @override_settings(TELEGRAM_UPDATES_QUEUE='telegram_updates', TELEGRAM_WORKER_LANES=4)
+    def test_queue_name(self):
+        assert queue_for_chat(42) == f"telegram_updates.lane{lane_for_chat(42, 4)}"
+
+
+class TestLaneThroughput:
+    """Throughput scales with lanes, per-chat order kept"""
+
+    def test_per_chat_order_is_kept(self):
+        _, processed = run_workload(lanes=8)
+        assert len(processed) == CHATS
+        for seqs in processed.values():
+            assert seqs == list(range(MESSAGES_PER_CHAT))
+
+    def test_throughput_scales_with_lanes(self):
+        # Best of three runs to filter scheduler noise on small machines
+        best = lambda lanes: max(run_workload(lanes=lanes)[0] for _ in range(3))
+        baseline = best(1)
+        for lanes in (2, 4, 8):
+            throughput = best(lanes)
+            speedup = throughput / baseline
+            print(f"lanes={lanes}: {throughput:.0f} msg/s, speedup {speedup:.2f}x")
+            # Near-linear: allow for hash imbalance and thread overhead
+            assert speedup >= lanes * 0.6, (lanes, speedup)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short', '-s'])
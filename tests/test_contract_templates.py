@@ -0,0 +1,173 @@
+"""
+Tests and throughput benchmark for the parsed contract template cache
+Every instance/region/POA combination is filled from disk and from the cache
+"""
+
+import io
+import os
+import shutil
+import time
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from docx import Document
+
+from contract_manager import template_cache
+from contract_manager.doc_text_replacer import DOCTextReplacer
+from contract_manager.docx_filler import DOCXFiller
+from contract_manager.services import ContractTemplateService
+from contract_manager.template_cache import TemplateCache
+
+
+COMBOS = [
+    (representation, instance, region)
+    for representation in ('WITHOUT_POA', 'WITH_POA')
+    for instance in ('1', '2', '3', '4')
+    for region in ('REGIONS', 'MOSCOW')
+]
+ITERATIONS = 3
+
+CONTRACT_DATA = {
+    'contract_number': 'АЮ-2026-0042',
+    'contract_date': '17.10.2026',
+    'client_full_name': 'Иванов Иван Иванович',
+    'client_passport_series': '4510',
+    'client_passport_number': '123456',
+    'client_address': 'г. Москва, ул. Ленина, д. 1',
+    'client_phone': '+79990000000',
+    'birth_date': '01.01.1980',
+    'birth_place': 'г. Москва',
+    'email': 'client@example.com',
+    'case_article': 'ч.1 ст.12.8 КоАП РФ',
+    'case_description': 'Лишение права управления',
+    'total_amount': 40000,
+    'prepayment': 20000,
+    'success_fee': 15000,
+    'docs_prep_fee': 5000,
+    'payment_terms_description': '50% предоплата, 38% после положительного решения',
+}
+
+
+def fill(template_path: str, output_path: Path) -> bytes:
+    """Fill the template the way ContractGenerationService picks the filler"""
+    if template_path.lower().endswith('.doc'):
+        return DOCTextReplacer().fill_doc(template_path, dict(CONTRACT_DATA), str(output_path))
+    return DOCXFiller().fill_docx(template_path, dict(CONTRACT_DATA), str(output_path))
+
+
+def document_text(content: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(content)) as package:
+        return package.read('word/document.xml').decode('utf-8')
+
+
+@pytest.fixture(scope='module')
+def templates():
+    service = ContractTemplateService()
+    paths = {
+        (representation, instance, region): service.select_template(
+            case_type='', instance=instance, representation_type=representation, region=region)
+        for representation, instance, region in COMBOS
+    }
+    assert all(paths.values()), paths
+    if shutil.which('soffice') is None:
+        # Binary Word 97 templates need LibreOffice, as in ContractGenerationService
+        paths = {combo: path for combo, path in paths.items() if Path(path).read_bytes()[:2] == b'PK'}
+    return paths
+
+
+class TestTemplateCache:
+    """Parse once, clone per fill, invalidate on change"""
+
+    def test_clones_are_independent(self, templates):
+        cache = TemplateCache()
+        path = templates[('WITH_POA', '1', 'REGIONS')]
+        first = cache.document(path)
+        first.paragraphs[0].text = 'изменено'
+        second = cache.document(path)
+        assert second.paragraphs[0].text != 'изменено'
+
+    def test_changed_template_is_reparsed(self, templates, tmp_path):
+        template = tmp_path / 'template.docx'
+        template.write_bytes(Path(templates[('WITH_POA', '1', 'REGIONS')]).read_bytes())
+        cache = TemplateCache()
+        assert cache.document(template).paragraphs
+
+        document = Document()
+        document.add_paragraph('Новая редакция договора')
+        document.save(template)
+        os.utime(template, ns=(time.time_ns(), time.time_ns() + 10**9))
+
+        assert cache.document(template).paragraphs[0].text == 'Новая редакция договора'
+
+    def test_lru_bound(self, templates):
+        cache = TemplateCache(max_templates=2)
+        for combo in COMBOS[:4]:
+            cache.document(templates[combo])
+        assert len(cache._documents) == 2
+
+    def test_conversion_does_not_touch_template_dir(self, tmp_path):
+        template = tmp_path / 'old.doc'
+        template.write_bytes(b'\xd0\xcf\x11\xe0 not a zip')
+        sibling = tmp_path / 'old.docx'
+        sibling.write_bytes(b'hand-made docx')
+
+        def convert(doc_path, output_dir):
+            assert Path(output_dir) != tmp_path
+            converted = Path(output_dir) / 'old.docx'
+            Document().save(converted)
+            return str(converted)
+
+        assert TemplateCache().document(template, convert=convert) is not None
+        assert sibling.read_bytes() == b'hand-made docx'
+
+
+class TestContractThroughput:
+    """Contracts/s for all 16 combinations (DOCX-only without LibreOffice), uncached vs cached"""
+
+    def test_cached_fill_matches_and_skips_parsing(self, templates, tmp_path, monkeypatch):
+        cache = TemplateCache()
+        results = {}
+        for mode in ('disk', 'cached'):
+            if mode == 'disk':
+                # Fresh cache per call: every fill reads and parses the template
+                monkeypatch.setattr(template_cache, 'get_template_cache', TemplateCache)
+            else:
+                monkeypatch.setattr(template_cache, 'get_template_cache', lambda: cache)
+                for path in templates.values():
+                    cache.document(path)  # Warm-up, as after the first contract in a worker
+            for module in ('contract_manager.docx_filler', 'contract_manager.doc_text_replacer'):
+                monkeypatch.setattr(f'{module}.get_template_cache', template_cache.get_template_cache)
+
+            rates, outputs = {}, {}
+            with patch('contract_manager.template_cache.Document', wraps=Document) as parse:
+                for combo, path in templates.items():
+                    best = float('inf')
+                    for _ in range(ITERATIONS):
+                        start = time.perf_counter()
+                        outputs[combo] = fill(path, tmp_path / f"{mode}_{'_'.join(combo)}.docx")
+                        best = min(best, time.perf_counter() - start)
+                    rates[combo] = 1 / best
+            results[mode] = (rates, outputs, parse.call_count)
+
+        disk_rates, disk_outputs, disk_parses = results['disk']
+        cached_rates, cached_outputs, cached_parses = results['cached']
+        print(f"\nContracts/s, best of {ITERATIONS} ({len(templates)}/{len(COMBOS)} combos):")
+        for combo in COMBOS:
+            if combo in templates:
+                print(f"  {' '.join(combo):<22} disk {disk_rates[combo]:6.1f}  cached {cached_rates[combo]:6.1f}  "
+                      f"({cached_rates[combo] / disk_rates[combo]:.2f}x)")
+            else:
+                print(f"  {' '.join(combo):<22} skipped: binary .doc needs LibreOffice")
+
+        for combo in templates:
+            assert document_text(cached_outputs[combo]) == document_text(disk_outputs[combo]), combo
+            assert 'Иванов Иван Иванович' in document_text(cached_outputs[combo]) or \
+                '4510' in document_text(cached_outputs[combo]), combo
+        # Timings are reported, not asserted: the saved parse is the deterministic part
+        assert disk_parses == len(templates) * ITERATIONS
+        assert cached_parses == 0
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
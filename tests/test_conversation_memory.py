@@ -0,0 +1,196 @@
+"""
+Tests for list-based conversation memory
+"""
+
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from ai_engine.services.local_cache import LocalMemoryCache
+from ai_engine.services.memory import ConversationMemoryService
+from ai_engine.agents.intake_agent import IntakeAgent
+
+
+REPLY = "Понял вашу ситуацию. " * 30
+
+
+@pytest.fixture
+def memory(fake_redis):
+    return ConversationMemoryService(redis_client=fake_redis, local_cache=LocalMemoryCache(1024 * 1024, 60))
+
+
+def legacy_add_message(redis_client, telegram_id, user_message, ai_response):
+    """Previous JSON-blob implementation, kept for the benchmark"""
+    key = f"conversation:legacy:{telegram_id}"
+    history_json = redis_client.get(key)
+    history = json.loads(history_json) if history_json else []
+    history.append({"user": user_message, "assistant": ai_response, "timestamp": "2026-01-01T10:00:00"})
+    redis_client.setex(key, 3600, json.dumps(history[-20:], ensure_ascii=False))
+
+
+class TestListMemory:
+    """Append, trim and tail reads"""
+
+    def test_append_is_one_round_trip(self, memory, fake_redis):
+        memory.add_message(1, "Привет", "<b>Здравствуйте</b>")
+
+        assert fake_redis.round_trips == 1
+        history = memory.get_conversation_history(1)
+        assert history[0]["user"] == "Привет" and history[0]["assistant"] == "Здравствуйте"
+        assert "conversation:1" in fake_redis.expiry
+
+    def test_version_key_expires_from_first_write(self, memory, fake_redis):
+        memory.add_message(1, "Привет", "Здравствуйте")
+        assert "conversation_version:1" in fake_redis.expiry
+
+        memory.clear_conversation(2)
+        assert "conversation_version:2" in fake_redis.expiry
+
+    def test_history_is_trimmed(self, memory):
+        for i in range(30):
+            memory.add_message(1, f"сообщение {i}", "ответ")
+
+        history = memory.get_conversation_history(1)
+        assert len(history) == ConversationMemoryService.MAX_TURNS
+        assert history[-1]["user"] == "сообщение 29"
+
+    def test_tail_read(self, memory):
+        for i in range(10):
+            memory.add_message(1, f"сообщение {i}", "ответ")
+
+        assert [turn["user"] for turn in memory.get_conversation_history(1, limit=2)] == ["сообщение 8", "сообщение 9"]
+
+
+class TestMemoryContext:
+    """Request-scoped history and batched writes"""
+
+    def test_message_costs_two_round_trips(self, memory, fake_redis):
+        for i in range(8):
+            memory.add_message(1, f"сообщение {i}", "ответ")
+        fake_redis.round_trips = 0
+
+        context = memory.context(1)
+        assert len(context.get_conversation_history(1, limit=1)) == 1  # Orchestrator
+        agent = IntakeAgent(Mock(), context)
+        lead = Mock(telegram_id=1)
+        messages = agent.build_messages(lead, "новое", {})
+        context.add_message(1, "новое", "ответ")
+        context.set_last_interaction(1)
+        context.flush()
+
+        assert fake_redis.round_trips == 2  # One LRANGE, one MULTI
+        assert messages[-1]["content"] == "новое"
+        assert len(memory.get_conversation_history(1)) == 9
+        assert fake_redis.get("last_interaction:1") is not None
+
+    def test_flush_without_writes_is_free(self, memory, fake_redis):
+        memory.context(1).flush()
+        assert fake_redis.round_trips == 0
+
+
+class TestLocalCache:
+    """In-process LRU in front of Redis"""
+
+    def test_hot_history_is_served_locally(self, memory, fake_redis):
+        for i in range(5):
+            memory.add_message(1, f"сообщение {i}", REPLY)
+        memory.get_conversation_history(1)  # Warm the local copy
+        memory.add_message(1, "сообщение 5", REPLY)  # Write-through keeps it current
+        uncached = ConversationMemoryService(redis_client=fake_redis, local_cache=False)
+        fake_redis.bytes_moved = 0
+        uncached.get_conversation_history(1)
+        redis_bytes = fake_redis.bytes_moved
+
+        fake_redis.bytes_moved = 0
+        for _ in range(10):
+            assert len(memory.get_conversation_history(1)) == 6
+
+        assert memory.local_cache.stats()["hits"] == 10
+        assert fake_redis.bytes_moved < redis_bytes  # Ten version checks cost less than one list read
+
+    def test_write_from_other_worker_is_detected(self, memory, fake_redis):
+        other_worker = ConversationMemoryService(redis_client=fake_redis, local_cache=LocalMemoryCache(1024 * 1024, 60))
+        memory.add_message(1, "первое", "ответ")
+        memory.get_conversation_history(1)
+
+        other_worker.add_message(1, "второе", "ответ")
+
+        assert [turn["user"] for turn in memory.get_conversation_history(1)] == ["первое", "второе"]
+        stats = memory.local_cache.stats()
+        assert stats["stale"] == 1 and stats["redis_fallbacks"] >= 1
+
+    def test_eviction_by_bytes(self):
+        cache = LocalMemoryCache(max_bytes=2000, ttl=60)
+        history = [{"user": "x" * 300, "assistant": "y" * 300}]
+        for telegram_id in range(5):
+            cache.set(telegram_id, 1, history)
+
+        stats = cache.stats()
+        assert stats["bytes"] <= 2000
+        assert stats["evictions"] == 2
+        assert cache.peek(0) is None and cache.peek(4) is not None
+
+    def test_stats_are_published(self, fake_redis, capsys):
+        from unittest.mock import patch
+        from django.core.management import call_command
+
+        memory = ConversationMemoryService(redis_client=fake_redis, local_cache=LocalMemoryCache(1024 * 1024, 60, 0))
+        memory.add_message(1, "первое", "ответ")
+        for _ in range(4):
+            memory.get_conversation_history(1)
+        memory.get_conversation_history(2)
+
+        with patch('ai_engine.management.commands.memory_cache_stats.get_redis_client', return_value=fake_redis):
+            call_command('memory_cache_stats')
+        # First read of each chat falls back to Redis, repeated reads are local
+        assert "3 local hits, 2 Redis fallbacks (0 stale)" in capsys.readouterr().out
+
+    def test_clear_resets_local_copy(self, memory):
+        memory.add_message(1, "первое", "ответ")
+        memory.clear_conversation(1)
+
+        assert memory.get_conversation_history(1) == []
+
+
+class TestMigration:
+    """Legacy JSON-blob keys are converted on first access"""
+
+    def test_read_migrates_legacy_key(self, memory, fake_redis):
+        legacy = [{"user": "старое", "assistant": "ответ", "timestamp": "2026-01-01T10:00:00"}]
+        fake_redis.set("conversation:7", json.dumps(legacy, ensure_ascii=False))
+
+        assert memory.get_conversation_history(7) == legacy
+        assert fake_redis.type("conversation:7") == b"list"
+
+    def test_append_migrates_legacy_key(self, memory, fake_redis):
+        legacy = [{"user": "старое", "assistant": "ответ", "timestamp": "2026-01-01T10:00:00"}]
+        fake_redis.set("conversation:7", json.dumps(legacy, ensure_ascii=False))
+
+        memory.add_message(7, "новое", "ответ")
+
+        assert [turn["user"] for turn in memory.get_conversation_history(7)] == ["старое", "новое"]
+
+
+class TestBytesPerTurn:
+    """Benchmark: payload bytes moved per appended turn at a full 20-turn history"""
+
+    def test_list_backend_moves_constant_bytes(self, memory, fake_redis):
+        for i in range(20):
+            memory.add_message(1, f"сообщение {i}", REPLY)
+            legacy_add_message(fake_redis, 1, f"сообщение {i}", REPLY)
+
+        fake_redis.bytes_moved = 0
+        memory.add_message(1, "ещё сообщение", REPLY)
+        list_bytes = fake_redis.bytes_moved
+
+        fake_redis.bytes_moved = 0
+        legacy_add_message(fake_redis, 1, "ещё сообщение", REPLY)
+        legacy_bytes = fake_redis.bytes_moved
+
+        print(f"\nBytes per turn: list={list_bytes}, json blob={legacy_bytes}")
+        assert list_bytes * 10 < legacy_bytes
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
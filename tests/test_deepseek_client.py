@@ -0,0 +1,109 @@
+"""
+Microbenchmark for DeepSeek HTTP connection reuse
+Runs against a local stub server: per-call overhead of a fresh
+connection per request (old requests.post) vs the pooled client.
+"""
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from django.test import override_settings
+
+from ai_engine.services.deepseek import DeepSeekAPIService, build_http_client
+
+
+CALLS = 200
+
+COMPLETION = json.dumps({
+    "choices": [{"message": {"role": "assistant", "content": "Ответ юриста"}}],
+}, ensure_ascii=False).encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal /chat/completions stub with keep-alive"""
+
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        # Like real servers: no Nagle delay between headers and body writes
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with StubHandler.lock:
+            StubHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(COMPLETION)))
+        self.end_headers()
+        self.wfile.write(COMPLETION)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubHandler.connections = 0
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    server.shutdown()
+    server.server_close()
+
+
+MESSAGES = [{"role": "user", "content": "лишили прав за пьянку"}]
+
+
+class TestDeepSeekConnectionReuse:
+    """Pooled client vs fresh connection per call"""
+
+    def test_pooled_client_reuses_connection(self, stub_url):
+        with override_settings(DEEPSEEK_API_URL=stub_url):
+            service = DeepSeekAPIService(client=build_http_client())
+            for _ in range(20):
+                assert service.chat_completion(MESSAGES) == "Ответ юриста"
+            service.client.close()
+
+        assert StubHandler.connections == 1
+
+    def test_per_call_overhead(self, stub_url):
+        payload = {"model": "deepseek-chat", "messages": MESSAGES, "stream": False}
+
+        # Before: module-level requests.post opens a new connection every call
+        StubHandler.connections = 0
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            requests.post(stub_url, json=payload, timeout=60).json()
+        before = (time.perf_counter() - start) / CALLS
+        before_connections = StubHandler.connections
+
+        # After: process-wide pooled client
+        StubHandler.connections = 0
+        with override_settings(DEEPSEEK_API_URL=stub_url):
+            service = DeepSeekAPIService(client=build_http_client())
+            start = time.perf_counter()
+            for _ in range(CALLS):
+                service.chat_completion(MESSAGES)
+            after = (time.perf_counter() - start) / CALLS
+            service.client.close()
+        after_connections = StubHandler.connections
+
+        print(f"\nper call: before {before * 1000:.3f} ms ({before_connections} connections), "
+              f"after {after * 1000:.3f} ms ({after_connections} connections)")
+
+        assert before_connections == CALLS
+        assert after_connections == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short', '-s'])
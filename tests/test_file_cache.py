@@ -0,0 +1,117 @@
+"""
+Tests for the Telegram file_id cache and won case image sending
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+from django.core.management import call_command
+
+from telegram_bot.client import TelegramAPIError
+from telegram_bot.file_cache import TelegramFileCache, extract_file_id
+
+IMAGE_URL = 'https://avtourist.info/images/Решение суда.jpg'
+
+
+def sent(file_id):
+    return {'message_id': 1, 'document': {'file_id': file_id, 'file_unique_id': 'u'}}
+
+
+@pytest.fixture
+def file_cache(fake_redis):
+    return TelegramFileCache(redis_client=fake_redis)
+
+
+@pytest.fixture
+def client():
+    client = Mock()
+    client.send_document.return_value = sent('FILE_1')
+    return client
+
+
+class TestTelegramFileCache:
+    """Upload once, then send by file_id"""
+
+    def test_extract_file_id(self):
+        assert extract_file_id(sent('A')) == 'A'
+        assert extract_file_id({'photo': [{'file_id': 'small'}, {'file_id': 'large'}]}) == 'large'
+        assert extract_file_id({'text': 'no file'}) is None
+        assert extract_file_id(None) is None
+
+    def test_second_send_skips_load_and_upload(self, file_cache, client):
+        load = Mock(return_value=b'jpeg')
+
+        file_cache.send_document(client, 42, IMAGE_URL, load, caption='Дело', filename='a.jpg', mime_type='image/jpeg')
+        file_cache.send_document(client, 43, IMAGE_URL, load, caption='Дело')
+
+        load.assert_called_once()
+        assert client.send_document.call_args_list[0].args == (42, b'jpeg')
+        assert client.send_document.call_args_list[1].args == (43, 'FILE_1')
+
+    def test_file_ids_are_shared_across_processes(self, file_cache, client, fake_redis):
+        file_cache.send_document(client, 42, IMAGE_URL, lambda: b'jpeg')
+        other = TelegramFileCache(redis_client=fake_redis)
+        assert other.get(IMAGE_URL) == 'FILE_1'
+        assert other.get('https://example.com/other.jpg') is None
+
+    def test_rejected_file_id_is_uploaded_again(self, file_cache, client):
+        file_cache.set(IMAGE_URL, 'EXPIRED')
+        client.send_document.side_effect = [
+            TelegramAPIError('sendDocument', 400, 'Bad Request: wrong file identifier/HTTP URL specified'),
+            sent('FILE_2'),
+        ]
+
+        file_cache.send_document(client, 42, IMAGE_URL, lambda: b'jpeg')
+
+        assert client.send_document.call_args_list[1].args == (42, b'jpeg')
+        assert file_cache.get(IMAGE_URL) == 'FILE_2'
+
+    def test_other_errors_keep_file_id(self, file_cache, client):
+        file_cache.set(IMAGE_URL, 'FILE_1')
+        client.send_document.side_effect = TelegramAPIError('sendDocument', 403, 'Forbidden: bot was blocked by the user')
+        with pytest.raises(TelegramAPIError):
+            file_cache.send_document(client, 42, IMAGE_URL, lambda: b'jpeg')
+        assert file_cache.get(IMAGE_URL) == 'FILE_1'
+
+
+class TestWonCaseImages:
+    """Sender and warm-up command go through the cache"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, file_cache, client):
+        cases = [{'title': 'Дело', 'article': '12.8', 'images': [{'url': IMAGE_URL}, {'url': IMAGE_URL + '?2'}]}]
+        response = Mock(status_code=200, content=b'jpeg')
+        with patch('ai_engine.services.won_cases_sender.get_telegram_file_cache', return_value=file_cache), \
+                patch('ai_engine.services.won_cases_sender.get_telegram_client', return_value=client), \
+                patch('ai_engine.services.won_cases_sender.get_won_cases_by_article', return_value=cases), \
+                patch('ai_engine.management.commands.warm_won_case_images.get_telegram_file_cache', return_value=file_cache), \
+                patch('ai_engine.management.commands.warm_won_case_images.get_won_cases_db') as get_db, \
+                patch('ai_engine.services.won_cases_sender.requests.get', return_value=response) as download:
+            get_db.return_value.get_all.return_value = cases
+            self.download = download
+            yield
+
+    def test_warm_up_then_send_without_download(self, file_cache, client):
+        client.send_document.side_effect = [sent('FILE_1'), sent('FILE_2')]
+        call_command('warm_won_case_images', chat_id='-100500')
+        assert self.download.call_count == 2
+        assert self.download.call_args_list[0].args[0] == 'https://avtourist.info/images/%D0%A0%D0%B5%D1%88%D0%B5%D0%BD%D0%B8%D0%B5%20%D1%81%D1%83%D0%B4%D0%B0.jpg'
+
+        from ai_engine.services.won_cases_sender import send_won_case_images
+        client.send_media_group.return_value = [sent('FILE_1'), sent('FILE_2')]
+        send_won_case_images(42, 'Статья: 12.8 КоАП')
+
+        assert self.download.call_count == 2
+        media = client.send_media_group.call_args.args[1]
+        assert [item['media'] for item in media] == ['FILE_1', 'FILE_2']
+        assert client.send_media_group.call_args.kwargs['files'] is None
+
+    def test_warm_up_skips_cached_images(self, file_cache, capsys):
+        file_cache.set(IMAGE_URL, 'FILE_1')
+        call_command('warm_won_case_images', dry_run=True)
+        assert '1 images without a cached file_id' in capsys.readouterr().out
+        self.download.assert_not_called()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,170 @@
+"""
+Tests for the local intent classifier routing tier
+"""
+
+import time
+from unittest.mock import Mock
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+
+from ai_engine.agents.intent_classifier import IntentClassifier, get_intent_classifier
+from ai_engine.agents.orchestrator import AgentOrchestrator
+from leads.models import Conversation, Lead
+
+
+SAMPLES = [
+    ("сколько будет стоить защита в суде", "pricing"),
+    ("во что мне обойдутся ваши услуги", "pricing"),
+    ("какой ценник на представительство", "pricing"),
+    ("по деньгам сколько выйдет", "pricing"),
+    ("какая стоимость работы юриста", "pricing"),
+    ("во сколько обойдется апелляция", "pricing"),
+    ("готов заключить соглашение", "contract"),
+    ("давайте заключим соглашение на защиту", "contract"),
+    ("хочу подписать бумаги с вами", "contract"),
+    ("присылайте соглашение, я согласен", "contract"),
+    ("как заключить с вами соглашение", "contract"),
+    ("оформляем, я готов работать", "contract"),
+    ("меня остановили гаишники и составили протокол", "intake"),
+    ("лишили прав за пьянку вчера", "intake"),
+    ("выехал на встречку, что будет", "intake"),
+    ("инспектор остановил на трассе ночью", "intake"),
+    ("отказался от медосвидетельствования", "intake"),
+    ("попал в аварию на перекрестке", "intake"),
+]
+
+# Typical first messages; the router labels them by keywords or sends them to intake
+PRODUCTION_MESSAGES = [
+    "сколько стоит защита", "какая цена за суд", "хочу подписать договор", "оформить договор на защиту",
+    "нужно ходатайство о переносе", "заявление в суд подготовить", "какие шансы вернуть права",
+    "оцените вероятность выиграть", "вернуть права досрочно", "тариф на апелляцию",
+    "здравствуйте", "добрый вечер", "привет, нужна помощь", "меня остановили инспекторы ночью",
+    "лишили прав в прошлом месяце", "выпил пива и поехал", "составили протокол за встречку",
+    "гаишники остановили на трассе",
+]
+
+
+@pytest.fixture
+def classifier():
+    return IntentClassifier.train(SAMPLES)
+
+
+@pytest.fixture
+def model_path(tmp_path, classifier):
+    path = tmp_path / "intent_classifier.json"
+    classifier.save(str(path))
+    with override_settings(INTENT_CLASSIFIER_PATH=str(path), INTENT_CLASSIFIER_MIN_CONFIDENCE=0.6):
+        yield path
+
+
+class TestIntentClassifier:
+    """Training, inference and serialization"""
+
+    def test_paraphrases_are_classified(self, classifier):
+        assert classifier.predict("а по цене во сколько обойдется")[0] == "pricing"
+        assert classifier.predict("давайте соглашение заключим")[0] == "contract"
+        assert classifier.predict("остановили на трассе и составили протокол")[0] == "intake"
+
+    def test_candidates_restrict_labels(self, classifier):
+        probabilities = classifier.predict_proba("сколько стоит договор", candidates=["contract", "pricing"])
+        assert set(probabilities) == {"contract", "pricing"}
+        assert sum(probabilities.values()) == pytest.approx(1.0)
+
+    def test_inference_is_sub_millisecond(self, classifier):
+        message = "Добрый день, меня вчера остановили, хочу понять сколько будет стоить ваша помощь"
+        start = time.perf_counter()
+        for _ in range(200):
+            classifier.predict(message)
+        assert (time.perf_counter() - start) / 200 < 0.001
+
+    def test_save_and_load(self, classifier, model_path):
+        loaded = get_intent_classifier()
+        assert loaded.labels == classifier.labels
+        assert loaded.predict("какой ценник") == classifier.predict("какой ценник")
+
+    def test_needs_two_labels(self):
+        with pytest.raises(ValueError):
+            IntentClassifier.train([("привет", "intake")])
+
+
+class TestOrchestratorTier:
+    """Classifier is consulted only when keywords do not decide"""
+
+    def test_paraphrase_without_keywords(self, model_path):
+        lead = Mock(case_type=None, estimated_cost=None)
+        route = AgentOrchestrator().route(lead, "во что мне обойдутся ваши услуги", {})
+        assert route == ('pricing', 'classifier')
+    
+    def test_contract_needs_explicit_request(self, model_path):
+        lead = Mock(case_type=None, estimated_cost=None)
+        assert AgentOrchestrator().route(lead, "давайте заключим соглашение", {}) == ('intake', 'default')
+    
+    def test_stage_rules_run_before_classifier(self, model_path):
+        lead = Mock(case_type='DUI', estimated_cost=None)
+        assert AgentOrchestrator().route(lead, "во что мне обойдутся ваши услуги", {}) == ('intake', 'stage')
+
+    def test_single_keyword_intent_wins(self, model_path):
+        lead = Mock(case_type=None, estimated_cost=None)
+        assert AgentOrchestrator().route_message(lead, "какие шансы", {}) == 'case_analysis'
+
+    def test_no_model_falls_back_to_keywords(self, tmp_path):
+        lead = Mock(case_type=None, estimated_cost=None)
+        with override_settings(INTENT_CLASSIFIER_PATH=str(tmp_path / "missing.json")):
+            assert AgentOrchestrator().route_message(lead, "давайте заключим соглашение", {}) == 'intake'
+
+
+@pytest.mark.django_db
+class TestTrainCommand:
+    """manage.py train_intent_classifier"""
+
+    def test_trains_from_conversations(self, tmp_path):
+        lead = Lead.objects.create(telegram_id=555, first_name="Иван")
+        for i, (message, agent) in enumerate(SAMPLES * 3):
+            Conversation.objects.create(lead=lead, message_id=str(i), user_message=message, ai_response="ok",
+                                        agent=agent, route_reason='manual' if i % 2 else 'keywords')
+        # The router's own guesses are not training labels
+        for reason, agent in (('classifier', 'pricing'), ('history', 'contract'), ('stage', 'pricing'), ('', 'intake')):
+            Conversation.objects.create(lead=lead, message_id=reason, user_message="сколько стоит",
+                                        ai_response="ok", agent=agent, route_reason=reason)
+        # ...except intake for messages without keywords
+        for reason in ('default', 'stage'):
+            Conversation.objects.create(lead=lead, message_id=reason, user_message="добрый вечер",
+                                        ai_response="ok", agent='intake', route_reason=reason)
+        output = tmp_path / "model.json"
+
+        call_command('train_intent_classifier', output=str(output), min_samples=10)
+
+        assert IntentClassifier.load(str(output)).samples == len(SAMPLES) * 3 + 2
+
+    def test_model_from_keyword_routing_keeps_intake(self, tmp_path):
+        """Rows labelled by the router in production: keyword routing alone never yields intake"""
+        lead = Lead.objects.create(telegram_id=556, first_name="Иван")
+        output = tmp_path / "model.json"
+        with override_settings(INTENT_CLASSIFIER_PATH=str(output), INTENT_CLASSIFIER_MIN_CONFIDENCE=0.8):
+            for i, message in enumerate(PRODUCTION_MESSAGES * 3):
+                route = AgentOrchestrator().route(Mock(case_type=None, estimated_cost=None), message, {})
+                Conversation.objects.create(lead=lead, message_id=str(i), user_message=message, ai_response="ok",
+                                            agent=route.agent, route_reason=route.reason)
+            keyword_rows = Conversation.objects.filter(route_reason='keywords')
+
+            for rows, labels in ((keyword_rows, 'without'), (Conversation.objects.all(), 'with')):
+                samples = list(rows.values_list('user_message', 'agent'))
+                IntentClassifier.train(samples).save(str(output))
+                assert ('intake' in get_intent_classifier().labels) == (labels == 'with')
+                for message in ("привет", "добрый день", "лишили прав за пьянку", "меня остановили гаишники"):
+                    route = AgentOrchestrator().route(Mock(case_type=None, estimated_cost=None), message, {})
+                    assert route.agent == 'intake', (labels, message, route)
+
+            call_command('train_intent_classifier', output=str(output), min_samples=10)
+            assert 'intake' in IntentClassifier.load(str(output)).labels
+
+    def test_contract_keywords_are_not_overridden(self, model_path):
+        lead = Mock(case_type=None, estimated_cost=None)
+        # Contract and pricing keywords; the model leans to pricing on "сколько стоит"
+        assert AgentOrchestrator().route(lead, "сколько стоит договор", {}) == ('contract', 'keywords')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,90 @@
+"""
+Tests for the inverted keyword index behind KnowledgeBase.find_article_by_keywords
+"""
+
+import time
+
+import pytest
+
+from ai_engine.data.keyword_index import KeywordIndex
+from ai_engine.data.knowledge_base import KnowledgeBase
+
+
+MESSAGES = [
+    "Меня остановили пьяный, выпил пиво",
+    "Отказался от медосвидетельствования, не дунул в трубку",
+    "Превышение скорости на 45 км, камера сняла",
+    "Превышение скорости на 65 км",
+    "Ехал без прав, забыл права дома",
+    "Увезли машину на штрафстоянку",
+    "Второй раз пьяный за рулём, 264.1",
+    "Просто вопрос про ОСАГО",
+    "",
+]
+
+
+def linear_find(articles, text):
+    """Previous implementation, kept as the reference"""
+    text_lower = text.lower()
+    best_match, best_score = None, 0
+    for article in articles:
+        score = sum(1 for keyword in article.get('keywords', []) if keyword.lower() in text_lower)
+        if score > best_score:
+            best_score, best_match = score, article
+    return best_match
+
+
+@pytest.fixture(scope="module")
+def kb():
+    return KnowledgeBase()
+
+
+class TestKeywordIndex:
+    """Scanner semantics"""
+
+    def test_overlapping_and_prefix_keywords(self):
+        index = KeywordIndex([(0, ['отказ', 'отказался']), (1, ['пьяный']), (2, ['второй раз пьяный'])])
+        assert index.find_keywords("Отказался, второй раз пьяный") == {'отказ', 'отказался', 'пьяный', 'второй раз пьяный'}
+        assert index.score("отказался") == {0: 2}
+
+    def test_empty_index(self):
+        assert KeywordIndex().score("что угодно") == {}
+
+
+class TestFindArticleByKeywords:
+    """Index must reproduce the linear scan exactly"""
+
+    @pytest.mark.parametrize("message", MESSAGES)
+    def test_same_result_as_linear_scan(self, kb, message):
+        assert kb.find_article_by_keywords(message) is linear_find(kb.koap_articles, message)
+
+    def test_ties_keep_first_article(self, kb):
+        # 'превышение' + 'скорость' score 2 for three ч.3-5 ст.12.9 articles
+        assert kb.find_article_by_keywords("превышение скорости")['article'] == 'ч.3 ст.12.9 КоАП РФ'
+
+
+class TestLookupScaling:
+    """Lookup cost must not grow with the number of articles"""
+
+    def test_cost_flat_in_article_count(self):
+        message = "Меня остановили, инспектор говорит что превышение скорости и я был пьяный " * 3
+
+        def timed(articles):
+            index = KeywordIndex((i, a['keywords']) for i, a in enumerate(articles))
+            best = float('inf')
+            for _ in range(5):
+                start = time.perf_counter()
+                for _ in range(200):
+                    index.score(message)
+                best = min(best, time.perf_counter() - start)
+            return best
+
+        small = [{'keywords': ['пьяный', 'превышение', 'скорость']}]
+        large = small + [{'keywords': [f'статья{i}', f'нарушение{i}x', f'слово{i}']} for i in range(1000)]
+        small_time, large_time = timed(small), timed(large)
+        print(f"\nPer lookup: 1 article {small_time / 200 * 1e6:.1f}µs, 1001 articles {large_time / 200 * 1e6:.1f}µs")
+        assert large_time < small_time * 3
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
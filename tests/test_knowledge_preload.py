@@ -0,0 +1,60 @@
+"""
+Tests for preloading the knowledge base before gunicorn forks and reloading it on edits
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from ai_engine.data import knowledge_base, won_cases_db
+from ai_engine.data.knowledge_base import KnowledgeBase, get_knowledge_base, preload_knowledge
+
+
+@pytest.fixture
+def fresh_singletons():
+    saved = knowledge_base._kb_instance, knowledge_base._kb_next_check, won_cases_db._won_cases_db
+    knowledge_base._kb_instance, won_cases_db._won_cases_db = None, None
+    with override_settings(KNOWLEDGE_RELOAD_INTERVAL=0):
+        yield
+    knowledge_base._kb_instance, knowledge_base._kb_next_check, won_cases_db._won_cases_db = saved
+
+
+class TestPreload:
+    """Everything a first request needs is built in the master"""
+
+    def test_preload_builds_all_data(self, fresh_singletons):
+        preload_knowledge()
+
+        kb = knowledge_base._kb_instance
+        assert kb.koap_articles and kb.petition_templates
+        # Fines database and search index are part of the preloaded object
+        assert kb.koap_fines_complete and kb.search_index is not None
+        assert won_cases_db._won_cases_db.cases
+        assert get_knowledge_base() is kb
+
+
+class TestReload:
+    """Edited data files rebuild the singleton without a restart"""
+
+    def test_unchanged_files_keep_instance(self, fresh_singletons):
+        kb = get_knowledge_base()
+        assert get_knowledge_base() is kb
+
+    def test_edited_files_rebuild(self, fresh_singletons):
+        kb = get_knowledge_base()
+        with patch.object(KnowledgeBase, 'current_data_version', return_value=('edited', None)):
+            rebuilt = get_knowledge_base()
+            assert rebuilt is not kb
+            assert get_knowledge_base() is rebuilt
+
+    def test_check_interval(self, fresh_singletons):
+        kb = get_knowledge_base()
+        with override_settings(KNOWLEDGE_RELOAD_INTERVAL=3600):
+            get_knowledge_base()  # Schedules the next check an hour ahead
+            with patch.object(KnowledgeBase, 'current_data_version', return_value=('edited', None)):
+                assert get_knowledge_base() is kb
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,143 @@
+"""
+Tests for the shared cache of scraped КоАП articles
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ai_engine.data.knowledge_base import KnowledgeBase
+from ai_engine.services.koap_cache import KoapArticleCache
+from ai_engine.services.koap_scraper import KoapScraper
+
+
+ARTICLE = {'article': 'ст.12.15 КоАП РФ', 'title': 'Выезд на встречную полосу', 'scraped': True}
+
+
+@pytest.fixture
+def cache(fake_redis):
+    return KoapArticleCache(redis_client=fake_redis, ttl=3600, refresh_after=60, negative_ttl=30)
+
+
+@pytest.fixture
+def task():
+    with patch('ai_engine.tasks.refresh_koap_article_task') as task:
+        yield task
+
+
+@pytest.fixture
+def kb(cache):
+    kb = KnowledgeBase()
+    kb.article_cache = cache
+    return kb
+
+
+class TestKoapArticleCache:
+    """Positive, negative and stale entries"""
+
+    def test_parts_share_one_entry(self, cache):
+        cache.set('ч.4 ст.12.15 КоАП РФ', ARTICLE)
+        assert cache.get('12.15').article == ARTICLE
+        assert cache.get('ст. 12.15 ч. 1').stale is False
+
+    def test_miss_is_cached_with_short_ttl(self, cache, fake_redis):
+        cache.set('ст.99.99', None)
+        assert cache.get('99.99') == (None, False)
+        cache.set('ст.12.15', ARTICLE)
+        assert fake_redis.expiry['koap_article:99.99'] < fake_redis.expiry['koap_article:12.15']
+
+    def test_old_entry_is_stale(self, cache, fake_redis):
+        fake_redis.set('koap_article:12.15', json.dumps({'article': ARTICLE, 'fetched_at': 0}))
+        assert cache.get('12.15') == (ARTICLE, True)
+
+    def test_criminal_code_is_not_scraped(self, cache, task):
+        assert cache.get('ст.264.1 УК РФ') is None
+        assert cache.schedule_refresh('ст.264.1 УК РФ') is False
+        task.apply_async.assert_not_called()
+
+    def test_refresh_stores_result_and_releases_lock(self, cache, task):
+        assert cache.schedule_refresh('12.15') is True
+        assert cache.schedule_refresh('ч.2 ст.12.15') is False
+        task.apply_async.assert_called_once_with(args=['12.15'])
+
+        scraper = Mock(fetch_article_info=Mock(return_value=ARTICLE))
+        assert cache.refresh('12.15', scraper=scraper) == ARTICLE
+        assert cache.get('12.15').article == ARTICLE
+        assert cache.schedule_refresh('12.15') is True
+
+    def test_scrape_error_is_not_cached_as_miss(self, cache, task, fake_redis):
+        fake_redis.set('koap_article:12.15', json.dumps({'article': ARTICLE, 'fetched_at': 0}))
+        cache.schedule_refresh('12.15')
+        scraper = Mock(fetch_article_info=Mock(side_effect=ConnectionError("timeout")))
+        with pytest.raises(ConnectionError):
+            cache.refresh('12.15', scraper=scraper)
+        # Stale article is kept and the next request can retry
+        assert cache.get('12.15') == (ARTICLE, True)
+        assert cache.schedule_refresh('12.15') is True
+
+    def test_redis_errors_fail_open(self, task):
+        broken = Mock(get=Mock(side_effect=ConnectionError), set=Mock(side_effect=ConnectionError))
+        cache = KoapArticleCache(redis_client=broken, ttl=3600, refresh_after=60, negative_ttl=30)
+        assert cache.get('12.15') is None
+        assert cache.schedule_refresh('12.15') is False
+
+
+class TestScraperSlugs:
+    """Discovered URL slugs are shared through the cache"""
+
+    def test_slug_from_cache_skips_probes(self, cache):
+        cache.set_slug('77.77', '77-77-1')
+        scraper = KoapScraper(slug_store=cache)
+        scraper.session = Mock()
+        assert scraper._find_article_url('77.77') == '77-77-1'
+        scraper.session.head.assert_not_called()
+
+    def test_probed_slug_is_stored(self, cache):
+        scraper = KoapScraper(slug_store=cache)
+        scraper.session = Mock(head=Mock(return_value=Mock(status_code=200)))
+        assert scraper._find_article_url('78.78') == '78-78-1'
+        assert cache.get_slug('78.78') == '78-78-1'
+
+
+    def test_unreachable_site_is_not_a_miss(self):
+        scraper = KoapScraper()
+        scraper.session = Mock(head=Mock(side_effect=ConnectionError("reset")))
+        with pytest.raises(ConnectionError):
+            scraper.fetch_article_info('ст.79.79 КоАП РФ')
+        assert scraper.get_article_info('ст.79.79 КоАП РФ') is None
+
+    def test_absent_article_is_a_miss(self):
+        scraper = KoapScraper()
+        scraper.session = Mock(head=Mock(return_value=Mock(status_code=404)))
+        assert scraper.fetch_article_info('ст.79.79 КоАП РФ') is None
+
+
+class TestKnowledgeBaseScrapedArticles:
+    """get_article_by_code never scrapes in the request path"""
+
+    def test_cold_miss_schedules_scrape(self, kb, task):
+        with patch('ai_engine.services.koap_scraper.KoapScraper.get_article_info') as scrape:
+            assert kb.get_article_by_code('ч.1 ст.11.15 КоАП РФ') is None
+            assert kb.get_article_by_code('ч.1 ст.11.15 КоАП РФ') is None
+        scrape.assert_not_called()
+        task.apply_async.assert_called_once()
+
+    def test_cached_article_is_returned(self, kb, cache, task):
+        cache.set('11.15', ARTICLE)
+        assert kb.get_article_by_code('ч.1 ст.11.15 КоАП РФ') == ARTICLE
+        task.apply_async.assert_not_called()
+
+    def test_cached_miss_is_not_rescheduled(self, kb, cache, task):
+        cache.set('99.99', None)
+        assert kb.get_article_by_code('ст.99.99 КоАП РФ') is None
+        task.apply_async.assert_not_called()
+
+    def test_stale_article_is_served_and_refreshed(self, kb, fake_redis, task):
+        fake_redis.set('koap_article:12.15', json.dumps({'article': ARTICLE, 'fetched_at': 0}))
+        assert kb.get_article_by_code('12.15') == ARTICLE
+        task.apply_async.assert_called_once_with(args=['12.15'])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
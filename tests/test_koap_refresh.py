@@ -0,0 +1,171 @@
+"""
+Tests for the КоАП fines refresh pipeline against saved HTML fixtures
+"""
+
+import json
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+from django.core.management import call_command
+from django.test import override_settings
+
+from ai_engine.data.knowledge_base import KnowledgeBase
+from ai_engine.data.koap_snapshot import KoapSnapshotStore
+from ai_engine.services.koap_refresh import BASE_URL, KoapRefresher, parse_fines_table
+
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'koap'
+PAGE_1 = (FIXTURES / 'table_page1.html').read_text(encoding='utf-8')
+PAGE_2 = (FIXTURES / 'table_page2.html').read_text(encoding='utf-8')
+PAGE_2_URL = f"{BASE_URL}?page=2"
+
+
+class FakeSession:
+    """Serves fixture pages with ETags and honours If-None-Match"""
+
+    def __init__(self, pages):
+        self.pages = dict(pages)  # url -> (status, html)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        status, html = self.pages[url]
+        etag = f'"{hash(html)}"'
+        response = Mock(status_code=status, text=html, headers={'ETag': etag})
+        if status == 200 and (headers or {}).get('If-None-Match') == etag:
+            response.status_code = 304
+        if response.status_code >= 400:
+            response.raise_for_status.side_effect = requests.HTTPError(f"{status} error")
+        return response
+
+
+@pytest.fixture
+def store(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({'articles': {
+        '8.23': parse_fines_table(PAGE_1)['8.23'],
+        '12.9ч.2': {'description': 'Превышение скорости на 20-40 км/ч', 'punishment': 'Штраф 500 руб', 'fine': '500 ₽'},
+        '12.10ч.1': {'description': 'Пересечение ж/д переезда', 'punishment': 'Штраф 5000 руб', 'fine': '5000 ₽'},
+    }}, ensure_ascii=False), encoding='utf-8')
+    return KoapSnapshotStore(tmp_path / 'snapshots', baseline_path=baseline)
+
+
+@pytest.fixture
+def session():
+    return FakeSession({BASE_URL: (200, PAGE_1), PAGE_2_URL: (200, PAGE_2)})
+
+
+def refresher(store, session):
+    return KoapRefresher(store=store, session=session, pages=2, rate=1000, concurrency=2)
+
+
+class TestParseFinesTable:
+    """Table rows -> koap_fines_complete.json entries"""
+
+    def test_rows(self):
+        articles = parse_fines_table(PAGE_1)
+        assert list(articles) == ['8.23', '12.8ч.1', '12.9ч.2']
+        assert articles['12.8ч.1']['fine'] == '45000 ₽'
+        assert articles['8.23']['description'] == 'Штраф за превышение нормы загрязняющих веществ или шума'
+
+    def test_page_without_table(self):
+        assert parse_fines_table("<html><body>Ошибка</body></html>") == {}
+
+
+class TestKoapRefresher:
+    """Fetch, diff and publish"""
+
+    def test_first_run_publishes_diff(self, store, session):
+        result = refresher(store, session).run()
+        assert result.version == 1 and result.changed
+        assert result.diff == {
+            'added': ['12.26ч.1', '12.37ч.2', '12.8ч.1'],
+            'removed': ['12.10ч.1'],
+            'changed': ['12.9ч.2'],
+        }
+        version, dataset = store.load()
+        assert version == 1
+        assert len(dataset['articles']) == 5
+
+    def test_unchanged_pages_use_conditional_get(self, store, session):
+        refresher(store, session).run()
+        session.requests.clear()
+
+        result = refresher(store, session).run()
+
+        assert result == (1, False, {'added': [], 'removed': [], 'changed': []}, 2)
+        assert all('If-None-Match' in headers for _, headers in session.requests)
+        assert store.load()[0] == 1
+
+    def test_changed_page_keeps_not_modified_rows(self, store, session):
+        refresher(store, session).run()
+        session.pages[PAGE_2_URL] = (200, PAGE_2.replace('Штраф 800 руб', 'Штраф 1000 руб'))
+
+        result = refresher(store, session).run()
+
+        assert result.version == 2 and result.not_modified == 1
+        assert result.diff['changed'] == ['12.37ч.2']
+        assert store.load()[1]['articles']['12.8ч.1']['fine'] == '45000 ₽'
+
+    @pytest.mark.parametrize("page", [(500, ''), (200, '<html>Сайт на обслуживании</html>')])
+    def test_broken_page_publishes_nothing(self, store, session, page):
+        session.pages[PAGE_2_URL] = page
+        with pytest.raises(Exception):
+            refresher(store, session).run()
+        assert store.current_version() == 0
+
+    def test_dry_run(self, store, session):
+        assert refresher(store, session).run(dry_run=True).changed
+        assert store.current_version() == 0
+
+    def test_old_snapshots_are_pruned(self, store):
+        for i in range(KoapSnapshotStore.KEEP + 2):
+            store.publish({'articles': {'8.23': {'fine': f'{i} ₽'}}})
+        files = sorted(path.name for path in store.directory.glob('koap_fines_v*.json'))
+        assert len(files) == KoapSnapshotStore.KEEP
+        assert store.load()[1]['articles']['8.23']['fine'] == f'{KoapSnapshotStore.KEEP + 1} ₽'
+
+
+class TestHotReload:
+    """KnowledgeBase picks up published snapshots without a restart"""
+
+    def test_reload_after_publish(self, tmp_path, session):
+        with override_settings(KOAP_SNAPSHOT_DIR=str(tmp_path), KOAP_SNAPSHOT_CHECK_INTERVAL=0):
+            kb = KnowledgeBase()
+            assert kb.fines_version == 0
+            assert kb.get_fine_from_complete_db('ч.2 ст.12.9 КоАП РФ') is not None
+            assert kb.get_fine_from_complete_db('ч.1 ст.12.10 КоАП РФ') is not None
+
+            refresher(kb.snapshot_store, session).run()
+
+            assert kb.get_fine_from_complete_db('ч.2 ст.12.9 КоАП РФ')['punishment']['fine'] == '750 ₽'
+            assert kb.get_fine_from_complete_db('ч.1 ст.12.10 КоАП РФ') is None
+            assert kb.fines_version == 1
+            assert (tmp_path / 'koap_search_index_v1.json').exists()
+            assert kb.search_articles('ОСАГО полис')[0]['article'] == 'ч.2 ст.12.37 КоАП РФ'
+
+    def test_check_is_throttled(self, tmp_path):
+        with override_settings(KOAP_SNAPSHOT_DIR=str(tmp_path), KOAP_SNAPSHOT_CHECK_INTERVAL=3600):
+            kb = KnowledgeBase()
+            kb.reload_if_changed()
+            kb.snapshot_store.publish({'articles': {}})
+            assert kb.reload_if_changed() is False
+            assert kb.fines_version == 0
+
+
+class TestRefreshCommand:
+    """manage.py refresh_koap_fines"""
+
+    def test_publishes_snapshot(self, store, session, capsys):
+        with patch('ai_engine.services.koap_refresh.requests.Session', return_value=session), \
+                override_settings(KOAP_REFRESH_PAGES=2, KOAP_REFRESH_RATE=1000):
+            with patch('ai_engine.management.commands.refresh_koap_fines.KoapSnapshotStore', return_value=store):
+                call_command('refresh_koap_fines')
+        assert 'Published snapshot v1' in capsys.readouterr().out
+        assert store.current_version() == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
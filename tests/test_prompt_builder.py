@@ -0,0 +1,110 @@
+"""
+Tests for token-budgeted prompt assembly
+"""
+
+from unittest.mock import Mock
+
+import pytest
+
+from ai_engine import agents
+from ai_engine.services.memory import ConversationMemoryService
+from ai_engine.services.prompt_builder import (
+    PromptBuilder, clean_reply, estimate_tokens,
+)
+
+
+SYSTEM_PROMPT = "Вы юрист АвтоЮрист. " * 50
+
+
+def make_history(turns, reply_chars=400):
+    return [
+        {
+            "user": f"Сообщение клиента номер {i}",
+            "assistant": f"<b>Ответ {i}</b> " + "текст " * (reply_chars // 6) + "[CREATE_CONTRACT]",
+            "timestamp": f"2026-01-01T10:{i:02d}:00",
+        }
+        for i in range(turns)
+    ]
+
+
+class TestTokenEstimate:
+    """Heuristic token counting and reply cleaning"""
+
+    def test_cyrillic_is_denser_than_latin(self):
+        assert estimate_tokens("а" * 100) > estimate_tokens("a" * 100)
+        assert estimate_tokens("") == 0
+
+    def test_clean_reply_strips_markup(self):
+        cleaned = clean_reply("<b>Договор</b> готов [CONTRACT_READY:123]\n\n\n\nЖду оплату")
+        assert cleaned == "Договор готов \n\nЖду оплату"
+
+
+class TestPromptBuilder:
+    """History selection within the budget"""
+
+    @pytest.mark.parametrize("budget", [800, 1500, 3000, 8000])
+    def test_prompt_fits_budget(self, budget):
+        messages = PromptBuilder(budget, max_turns=10).build(SYSTEM_PROMPT, make_history(20), "Что дальше?")
+
+        assert PromptBuilder.count_tokens(messages) <= budget
+        assert messages[0]["content"] == SYSTEM_PROMPT
+        assert messages[-1] == {"role": "user", "content": "Что дальше?"}
+
+    def test_keeps_newest_turns_and_summarizes_older(self):
+        messages = PromptBuilder(1500, max_turns=10).build(SYSTEM_PROMPT, make_history(20), "Что дальше?")
+
+        assert messages[1]["role"] == "system"
+        assert "Краткое содержание" in messages[1]["content"]
+        assert messages[-3]["content"] == "Сообщение клиента номер 19"
+        assert "<b>" not in messages[-2]["content"] and "[CREATE_CONTRACT]" not in messages[-2]["content"]
+
+    def test_short_history_is_kept_verbatim(self):
+        history = make_history(3, reply_chars=60)
+        messages = PromptBuilder(8000).build("Система", history, "Привет")
+
+        assert len(messages) == 1 + 2 * 3 + 1
+        assert all(m["content"] != "" for m in messages)
+
+    def test_oversized_latest_turn_is_truncated(self):
+        history = make_history(1, reply_chars=20000)
+        messages = PromptBuilder(1000).build("Система", history, "Привет")
+
+        assert len(messages) == 4
+        assert messages[2]["content"].endswith("…")
+        assert PromptBuilder.count_tokens(messages) <= 1000
+
+    def test_summary_is_cached_per_conversation(self, fake_redis):
+        builder = PromptBuilder(1500, max_turns=10, summary_store=ConversationMemoryService(fake_redis))
+        history = make_history(20)
+
+        first = builder.build(SYSTEM_PROMPT, history, "Что дальше?", conversation_id=42)
+        assert fake_redis.get("conversation_summary:42") is not None
+
+        builder._summarize = Mock(side_effect=AssertionError("summary should come from cache"))
+        second = builder.build(SYSTEM_PROMPT, history, "Что дальше?", conversation_id=42)
+        assert first == second
+
+
+
+class TestAgentBudgets:
+    """Each agent builds its prompt within its own budget"""
+
+    @pytest.mark.parametrize("agent_class", ['ContractAgent', 'PetitionAgent', 'IntakeAgent', 'PricingAgent'])
+    def test_agent_prompt_fits_agent_budget(self, agent_class, fake_redis):
+        cls = getattr(agents, agent_class)
+        assert cls.prompt_token_budget is not None
+        memory = ConversationMemoryService(fake_redis)
+        memory.get_conversation_history = Mock(return_value=make_history(20, reply_chars=3000))
+        agent = cls(Mock(), memory)
+        agent.get_system_prompt = Mock(return_value=SYSTEM_PROMPT)
+
+        messages = agent.build_messages(Mock(telegram_id=42), "Что дальше?", {})
+        assert PromptBuilder.count_tokens(messages) <= cls.prompt_token_budget
+
+    def test_document_agents_get_more_history(self):
+        assert agents.ContractAgent.prompt_token_budget > agents.PricingAgent.prompt_token_budget
+        assert agents.ContractAgent.history_turns > agents.PricingAgent.history_turns
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,112 @@
+"""
+Tests for the LLM response cache around BaseAgent.call_ai
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ai_engine.services.deepseek import ERROR_RESPONSE
+from ai_engine.services.response_cache import LLMResponseCache
+from ai_engine.agents.base import BaseAgent
+from ai_engine.agents.contract_agent import ContractAgent
+from ai_engine.agents.intake_agent import IntakeAgent
+
+
+class CachedAgent(BaseAgent):
+    """Minimal agent with caching enabled"""
+
+    response_cache_ttl = 60
+
+    def process(self, lead, message, context):
+        return self.call_ai(self.build_messages(lead, message, context))
+
+    def get_system_prompt(self, lead, context):
+        return "Вы юрист АвтоЮрист."
+
+
+MESSAGES = [
+    {"role": "system", "content": "Вы юрист АвтоЮрист."},
+    {"role": "user", "content": "лишили прав за пьянку"},
+]
+
+
+@pytest.fixture
+def mock_deepseek():
+    """Mock DeepSeek API service"""
+    mock = Mock()
+    mock.chat_completion = Mock(return_value="ч.1 ст.12.8 КоАП РФ")
+    return mock
+
+
+@pytest.fixture
+def cache(fake_redis):
+    cache = LLMResponseCache(fake_redis, max_entries=3)
+    with patch('ai_engine.agents.base.get_response_cache', return_value=cache):
+        yield cache
+
+
+class TestResponseCache:
+    """Cache keys, LRU bound and metrics"""
+
+    def test_key_ignores_whitespace_and_case(self, cache):
+        other = [
+            {"role": "system", "content": "Вы  юрист АвтоЮрист. "},
+            {"role": "user", "content": "Лишили прав   за пьянку"},
+        ]
+        assert cache.make_key("IntakeAgent", 0.5, MESSAGES) == cache.make_key("IntakeAgent", 0.5, other)
+
+    def test_key_depends_on_agent_and_temperature(self, cache):
+        key = cache.make_key("IntakeAgent", 0.5, MESSAGES)
+        assert key != cache.make_key("PricingAgent", 0.5, MESSAGES)
+        assert key != cache.make_key("IntakeAgent", 0.7, MESSAGES)
+
+    def test_lru_eviction(self, cache, fake_redis):
+        keys = [cache.make_key("IntakeAgent", 0.5, [{"role": "user", "content": str(i)}]) for i in range(4)]
+        for key in keys[:3]:
+            cache.set(key, "ответ", 60)
+        cache.get("IntakeAgent", keys[0])  # Touch oldest entry
+        cache.set(keys[3], "ответ", 60)
+
+        assert fake_redis.get(keys[1]) is None  # Least recently used
+        assert cache.get("IntakeAgent", keys[0]) == "ответ"
+        assert fake_redis.zcard(LLMResponseCache.LRU_KEY) == 3
+
+
+class TestCallAiCaching:
+    """BaseAgent.call_ai integration"""
+
+    def test_second_call_is_served_from_cache(self, cache, mock_deepseek):
+        agent = CachedAgent(mock_deepseek)
+
+        assert agent.call_ai(MESSAGES, 0.5) == "ч.1 ст.12.8 КоАП РФ"
+        assert agent.call_ai(MESSAGES, 0.5) == "ч.1 ст.12.8 КоАП РФ"
+
+        assert mock_deepseek.chat_completion.call_count == 1
+        stats = cache.stats()["CachedAgent"]
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_errors_are_not_cached(self, cache, mock_deepseek):
+        mock_deepseek.chat_completion.return_value = ERROR_RESPONSE
+        agent = CachedAgent(mock_deepseek)
+
+        agent.call_ai(MESSAGES, 0.5)
+        agent.call_ai(MESSAGES, 0.5)
+
+        assert mock_deepseek.chat_completion.call_count == 2
+
+    def test_per_agent_policy(self, cache, mock_deepseek):
+        assert IntakeAgent.response_cache_ttl
+        assert ContractAgent.response_cache_ttl is None
+
+        agent = ContractAgent(mock_deepseek)
+        agent.call_ai(MESSAGES, 0.4)
+        agent.call_ai(MESSAGES, 0.4)
+
+        assert mock_deepseek.chat_completion.call_count == 2
+        assert cache.stats() == {}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,84 @@
+"""
+Tests for the stemmed BM25 KoAP search index
+"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+
+from ai_engine.data.knowledge_base import KnowledgeBase
+from ai_engine.data.russian_stemmer import stem
+from ai_engine.data.search_index import BM25Index, load_or_build_index
+
+
+@pytest.fixture(scope="module")
+def kb():
+    return KnowledgeBase()
+
+
+class TestStemmer:
+    """Snowball Russian stemmer"""
+
+    @pytest.mark.parametrize("words", [
+        ("пьяный", "пьяного", "пьяным"),
+        ("опьянение", "опьянении", "опьянения"),
+        ("выпил", "выпивший"),
+        ("скорость", "скорости"),
+        ("камера", "камеры", "камерой"),
+    ])
+    def test_word_forms_share_stem(self, words):
+        assert len({stem(word) for word in words}) == 1
+
+    def test_non_cyrillic_unchanged(self):
+        assert stem("12.8") == "12.8"
+
+
+class TestSearchArticles:
+    """Ranking and speed"""
+
+    @pytest.mark.parametrize("query,expected", [
+        ("пьяного водителя", "ч.1 ст.12.8 КоАП РФ"),
+        ("в опьянении", "ч.1 ст.12.8 КоАП РФ"),
+        ("превышение скорости", "ст.12.9 КоАП РФ"),
+        ("тонировка", "ч.3 ст.12.5 КоАП РФ"),
+    ])
+    def test_morphology_aware_ranking(self, kb, query, expected):
+        assert kb.search_articles(query)[0]['article'].endswith(expected)
+
+    def test_no_match(self, kb):
+        assert kb.search_articles("абракадабра") == []
+
+    def test_keyword_fallback_uses_stems(self, kb):
+        assert kb.find_article_by_keywords("был выпивший")['article'] == "ч.1 ст.12.8 КоАП РФ"
+
+    def test_search_is_sub_millisecond(self, kb):
+        kb.search_articles("штраф за езду пьяного водителя без прав")  # Warm stem cache
+        start = time.perf_counter()
+        for _ in range(100):
+            kb.search_articles("штраф за езду пьяного водителя без прав")
+        assert (time.perf_counter() - start) / 100 < 0.001
+
+
+class TestPersistence:
+    """Index is loaded from disk and rebuilt only when sources change"""
+
+    def test_workers_load_persisted_index(self, kb):
+        with patch.object(BM25Index, 'build', side_effect=AssertionError("index rebuilt")):
+            KnowledgeBase()
+
+    def test_stale_index_is_rebuilt(self, tmp_path, kb):
+        source = tmp_path / "articles.json"
+        source.write_text("v1")
+        index_path = tmp_path / "index.json"
+        first = load_or_build_index(index_path, [source], kb.koap_articles, {})
+
+        source.write_text("v2")
+        second = load_or_build_index(index_path, [source], kb.koap_articles, {})
+
+        assert first.fingerprint != second.fingerprint
+        assert BM25Index.load(index_path).fingerprint == second.fingerprint
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
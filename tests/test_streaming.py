@@ -0,0 +1,127 @@
+"""
+Tests for streaming LLM responses delivered to Telegram
+"""
+
+import json
+from unittest.mock import Mock
+
+import httpx
+import pytest
+
+from ai_engine.services.deepseek import DeepSeekAPIService
+from telegram_bot.client import TelegramAPIError
+from telegram_bot.streaming import PLACEHOLDER, TelegramStreamRenderer, visible_text
+
+
+def sse_body(chunks):
+    lines = []
+    for chunk in chunks:
+        event = {"choices": [{"delta": {"content": chunk}}]}
+        lines.append(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+    lines.append("data: [DONE]\n\n")
+    return "".join(lines).encode('utf-8')
+
+
+@pytest.fixture
+def telegram():
+    """Mock TelegramClient"""
+    client = Mock()
+    client.send_message.return_value = {'message_id': 99}
+    return client
+
+
+class TestDeepSeekStreaming:
+    """SSE consumption in DeepSeekAPIService"""
+
+    def test_stream_accumulates_chunks(self):
+        chunks = ["Шансы ", "высокие. ", "[UPDATE_LEAD_STATUS:HOT]"]
+
+        def handler(request):
+            assert json.loads(request.content)['stream'] is True
+            return httpx.Response(200, content=sse_body(chunks),
+                                  headers={'Content-Type': 'text/event-stream'})
+
+        seen = []
+        service = DeepSeekAPIService(client=httpx.Client(transport=httpx.MockTransport(handler)),
+                                     stream_handler=seen.append)
+
+        result = service.chat_completion([{"role": "user", "content": "шансы?"}])
+
+        # Full text with command tags is returned for _process_response_commands
+        assert result == "Шансы высокие. [UPDATE_LEAD_STATUS:HOT]"
+        assert seen == ["Шансы ", "Шансы высокие. ", result]
+
+    def test_non_stream_mode_unchanged(self):
+        def handler(request):
+            assert json.loads(request.content)['stream'] is False
+            return httpx.Response(200, json={"choices": [{"message": {"content": "Ответ"}}]})
+
+        service = DeepSeekAPIService(client=httpx.Client(transport=httpx.MockTransport(handler)))
+        assert service.chat_completion([{"role": "user", "content": "?"}]) == "Ответ"
+
+
+class TestStreamRenderer:
+    """Placeholder + throttled edits"""
+
+    def test_visible_text_hides_commands_and_partial_html(self):
+        assert visible_text("Готово [GENERATE_CONTRACT:Иванов|") == "Готово"
+        assert visible_text("Готово [SET_ANALYSIS:30000,80] дальше") == "Готово  дальше"
+        assert visible_text("<b>Расчет</b> выгоды <i") == "Расчет выгоды"
+
+    def test_placeholder_then_throttled_edits(self, telegram):
+        renderer = TelegramStreamRenderer(42, client=telegram, min_interval=0, min_chars=10)
+        renderer.start()
+        telegram.send_message.assert_called_once_with(42, PLACEHOLDER, parse_mode=None)
+
+        renderer.update("Короткий")  # 8 chars, below min_chars
+        renderer.update("Короткий ответ юриста")
+        renderer.update("Короткий ответ юриста.")  # +1 char, throttled
+
+        assert telegram.edit_message_text.call_count == 1
+        telegram.edit_message_text.assert_called_with(42, 99, "Короткий ответ юриста", parse_mode=None)
+
+    def test_time_throttle(self, telegram):
+        renderer = TelegramStreamRenderer(42, client=telegram, min_interval=60, min_chars=0)
+        renderer.start()
+        renderer.update("Первый кусок ответа")
+        telegram.edit_message_text.assert_not_called()
+
+    def test_finish_edits_with_processed_html(self, telegram):
+        renderer = TelegramStreamRenderer(42, client=telegram, min_interval=0, min_chars=0)
+        renderer.start()
+        renderer.finish("<b>Итог</b>")
+
+        telegram.edit_message_text.assert_called_with(42, 99, "<b>Итог</b>", parse_mode='HTML')
+        assert telegram.send_message.call_count == 1  # Placeholder only
+
+    def test_finish_retries_as_plain_text(self, telegram):
+        telegram.edit_message_text.side_effect = [
+            TelegramAPIError('editMessageText', 400, "can't parse entities"), {'message_id': 99}]
+        renderer = TelegramStreamRenderer(42, client=telegram, min_interval=0, min_chars=0)
+        renderer.start()
+        renderer.finish("<b>Итог</b> <i")
+
+        telegram.edit_message_text.assert_called_with(42, 99, "Итог", parse_mode=None)
+        assert telegram.send_message.call_count == 1  # Placeholder only
+
+    def test_finish_falls_back_to_new_message(self, telegram):
+        telegram.edit_message_text.side_effect = TelegramAPIError('editMessageText', 400, "message is too long")
+        renderer = TelegramStreamRenderer(42, client=telegram, min_interval=0, min_chars=0)
+        renderer.start()
+        renderer.finish("<b>Итог</b>")
+
+        telegram.delete_message.assert_called_once_with(42, 99)
+        telegram.send_message.assert_called_with(42, "<b>Итог</b>")
+
+    def test_empty_finish_removes_placeholder(self, telegram):
+        renderer = TelegramStreamRenderer(42, client=telegram, min_interval=0, min_chars=0)
+        renderer.start()
+        renderer.finish("  ")
+
+        telegram.delete_message.assert_called_once_with(42, 99)
+        telegram.edit_message_text.assert_not_called()
+        assert telegram.send_message.call_count == 1  # Placeholder only
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,200 @@
+"""
+Tests for the shared Telegram Bot API client
+"""
+
+import asyncio
+import json
+from unittest.mock import Mock, patch
+
+import httpx
+import pytest
+import redis
+from django.conf import settings
+from django.test import override_settings
+
+from telegram_bot.client import (
+    AsyncTelegramClient, RateLimiter, SharedRateLimiter, TelegramAPIError, TelegramClient, TokenBucket,
+    default_rate_limiter,
+)
+
+
+def make_response(status_code=200, body=None):
+    response = Mock()
+    response.status_code = status_code
+    response.json.return_value = body if body is not None else {'ok': True, 'result': {'message_id': 1}}
+    return response
+
+
+@pytest.fixture
+def limiter():
+    """Limiter that never delays"""
+    return RateLimiter(global_rate=1000, chat_rate=1000, chat_burst=1000)
+
+
+class TestRateLimiter:
+    """Token bucket limits"""
+
+    def test_bucket_allows_burst_then_delays(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+        assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+    def test_per_chat_limit_is_independent(self):
+        limiter = RateLimiter(global_rate=30, chat_rate=1, chat_burst=1)
+        assert limiter.reserve(1) == 0.0
+        assert limiter.reserve(1) == pytest.approx(1.0, abs=0.05)
+        # Another chat is not delayed by chat 1
+        assert limiter.reserve(2) == 0.0
+
+    def test_global_limit(self):
+        limiter = RateLimiter(global_rate=30, chat_rate=1, chat_burst=1)
+        delays = [limiter.reserve(chat_id) for chat_id in range(31)]
+        assert max(delays[:30]) == 0.0
+        assert delays[30] == pytest.approx(1 / 30, abs=0.01)
+
+
+
+def live_redis():
+    """Real Redis for the Lua script, None when no server is reachable"""
+    client = redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.2)
+    try:
+        client.ping()
+    except redis.RedisError:
+        return None
+    return client
+
+
+class TestSharedRateLimiter:
+    """Buckets in Redis, one budget for all processes"""
+
+    def make(self, script):
+        redis_client = Mock()
+        redis_client.register_script.return_value = script
+        return SharedRateLimiter(global_rate=30, chat_rate=1, chat_burst=1, redis_client=redis_client)
+
+    def test_reserves_global_and_chat_bucket_in_one_call(self):
+        script = Mock(return_value=b'0.5')
+        limiter = self.make(script)
+        assert limiter.reserve(42) == 0.5
+        script.assert_called_once_with(keys=['telegram_rate:global', 'telegram_rate:chat:42'], args=[30, 30, 1, 1])
+        limiter.reserve()
+        assert script.call_args.kwargs['keys'] == ['telegram_rate:global']
+
+    def test_redis_error_falls_back_to_process_buckets(self):
+        script = Mock(side_effect=redis.ConnectionError("down"))
+        limiter = self.make(script)
+        assert limiter.reserve(1) == 0.0
+        assert limiter.reserve(1) == pytest.approx(1.0, abs=0.05)
+        assert script.call_count == 1  # Redis is not retried on every send
+
+    def test_default_limiter(self):
+        with override_settings(TELEGRAM_SHARED_RATE_LIMIT=True), \
+                patch('ai_engine.services.memory.get_redis_client', return_value=Mock()):
+            assert isinstance(default_rate_limiter(), SharedRateLimiter)
+        with override_settings(TELEGRAM_SHARED_RATE_LIMIT=False):
+            assert type(default_rate_limiter()) is RateLimiter
+        assert settings.TELEGRAM_CHAT_BURST == 1
+
+    def test_limits_hold_across_limiters(self):
+        client = live_redis()
+        if client is None:
+            pytest.skip("Redis is not reachable")
+        client.delete('telegram_rate:global', 'telegram_rate:chat:-1', 'telegram_rate:chat:-2')
+        # Two processes: their reservations share one per-chat bucket
+        first, second = (SharedRateLimiter(global_rate=30, chat_rate=1, chat_burst=1, redis_client=client)
+                         for _ in range(2))
+        assert first.reserve(-1) == 0.0
+        assert second.reserve(-1) == pytest.approx(1.0, abs=0.05)
+        assert second.reserve(-2) == 0.0
+
+
+class TestTelegramClient:
+    """Sync client"""
+
+    def test_send_message_reuses_session(self, limiter):
+        session = Mock()
+        session.post.return_value = make_response()
+        client = TelegramClient(token='TOKEN', limiter=limiter, session=session)
+
+        client.send_message(42, "Привет")
+        client.send_message(42, "Ещё раз")
+
+        assert session.post.call_count == 2
+        url = session.post.call_args.args[0]
+        assert url == "https://api.telegram.org/botTOKEN/sendMessage"
+        assert session.post.call_args.kwargs['json'] == {
+            'chat_id': 42, 'text': "Ещё раз", 'parse_mode': 'HTML',
+        }
+        assert session.post.call_args.kwargs['timeout'] == client.timeout
+
+    def test_429_retry_after(self, limiter):
+        session = Mock()
+        session.post.side_effect = [
+            make_response(429, {'ok': False, 'parameters': {'retry_after': 2}}),
+            make_response(),
+        ]
+        client = TelegramClient(token='TOKEN', limiter=limiter, session=session)
+
+        with patch('telegram_bot.client.time.sleep') as sleep:
+            result = client.send_message(42, "Привет")
+
+        sleep.assert_called_once_with(2.0)
+        assert result == {'message_id': 1}
+
+    def test_error_raises(self, limiter):
+        session = Mock()
+        session.post.return_value = make_response(400, {'ok': False, 'description': 'chat not found'})
+        client = TelegramClient(token='TOKEN', limiter=limiter, session=session)
+
+        with pytest.raises(TelegramAPIError, match='chat not found'):
+            client.send_message(42, "Привет")
+
+    def test_send_document_rewinds_file_on_retry(self, limiter, tmp_path):
+        path = tmp_path / 'petition.docx'
+        path.write_bytes(b'docx-bytes')
+        uploaded = []
+
+        def post(url, data=None, files=None, timeout=None):
+            uploaded.append(files['document'].read())
+            return make_response(429, {'ok': False, 'parameters': {'retry_after': 0}}) \
+                if len(uploaded) == 1 else make_response()
+
+        session = Mock()
+        session.post.side_effect = post
+        client = TelegramClient(token='TOKEN', limiter=limiter, session=session)
+
+        with open(path, 'rb') as document, patch('telegram_bot.client.time.sleep'):
+            client.send_document(42, document, caption="📄 Ваше ходатайство готово")
+
+        assert uploaded == [b'docx-bytes', b'docx-bytes']
+
+
+class TestAsyncTelegramClient:
+    """Asyncio client"""
+
+    def test_send_message_with_retry(self, limiter):
+        calls = []
+
+        def handler(request):
+            calls.append(json.loads(request.content))
+            if len(calls) == 1:
+                return httpx.Response(429, json={'ok': False, 'parameters': {'retry_after': 0}})
+            return httpx.Response(200, json={'ok': True, 'result': {'message_id': 7}})
+
+        async def run():
+            client = AsyncTelegramClient(
+                token='TOKEN', limiter=limiter,
+                client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            )
+            result = await client.send_message(42, "Привет")
+            await client.aclose()
+            return result
+
+        assert asyncio.run(run()) == {'message_id': 7}
+        assert len(calls) == 2
+        assert calls[0]['chat_id'] == 42
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,179 @@
+"""
+Tests for idempotent Telegram update processing
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from django.test import RequestFactory, override_settings
+
+from telegram_bot.dedup import UpdateDeduplicator
+from telegram_bot.views import TelegramWebhookView
+
+
+@pytest.fixture
+def mock_redis():
+    """Mock Redis client"""
+    return Mock()
+
+
+def post_update(update: dict):
+    request = RequestFactory().post('/telegram/webhook/', data=json.dumps(update),
+                                    content_type='application/json')
+    return TelegramWebhookView.as_view()(request)
+
+
+UPDATE = {
+    'update_id': 555,
+    'message': {'message_id': 42, 'from': {'id': 777}, 'text': 'лишили прав'},
+}
+
+
+class TestUpdateDeduplicator:
+    """Test Redis dedup primitives"""
+
+    def test_claim_uses_set_nx_with_ttl(self, mock_redis):
+        mock_redis.set.return_value = True
+        dedup = UpdateDeduplicator(mock_redis)
+
+        assert dedup.claim_update(555) is True
+        mock_redis.set.assert_called_once_with(
+            "telegram_update:555", "1", nx=True, ex=dedup.ttl
+        )
+
+    def test_claim_rejects_redelivery(self, mock_redis):
+        mock_redis.set.return_value = None  # Key already exists
+        assert UpdateDeduplicator(mock_redis).claim_update(555) is False
+
+    def test_claim_fails_open_on_redis_error(self, mock_redis):
+        mock_redis.set.side_effect = ConnectionError("redis down")
+        assert UpdateDeduplicator(mock_redis).claim_update(555) is True
+
+    def test_default_client_is_shared(self):
+        from ai_engine.services.memory import get_redis_client
+        assert UpdateDeduplicator().redis_client is get_redis_client()
+        assert UpdateDeduplicator().redis_client is UpdateDeduplicator().redis_client
+
+    def test_release_deletes_claim(self, mock_redis):
+        UpdateDeduplicator(mock_redis).release_update(555)
+        mock_redis.delete.assert_called_once_with("telegram_update:555")
+
+    def test_response_replay(self, mock_redis):
+        dedup = UpdateDeduplicator(mock_redis)
+        dedup.cache_response(777, 42, "Ответ юриста")
+        mock_redis.setex.assert_called_once_with(
+            "telegram_response:777:42", dedup.ttl, "Ответ юриста"
+        )
+
+        mock_redis.get.return_value = "Ответ юриста".encode('utf-8')
+        assert dedup.get_cached_response(777, 42) == "Ответ юриста"
+
+        mock_redis.get.return_value = None
+        assert dedup.get_cached_response(777, 43) is None
+
+
+class TestWebhookDedup:
+    """Test dedup in front of TelegramWebhookView"""
+
+    @override_settings(TELEGRAM_ASYNC_WEBHOOK=False)
+    def test_duplicate_update_costs_one_redis_round_trip(self, mock_redis):
+        mock_redis.set.return_value = None
+        with patch('ai_engine.services.memory.get_redis_client', return_value=mock_redis), \
+                patch('telegram_bot.views.handle_update') as handle:
+            response = post_update(UPDATE)
+
+        assert response.status_code == 200
+        assert json.loads(response.content)['status'] == 'duplicate'
+        handle.assert_not_called()
+        assert len(mock_redis.method_calls) == 1
+
+    @override_settings(TELEGRAM_ASYNC_WEBHOOK=True)
+    def test_first_delivery_is_queued(self, mock_redis):
+        mock_redis.set.return_value = True
+        with patch('ai_engine.services.memory.get_redis_client', return_value=mock_redis), \
+                patch('telegram_bot.views.process_telegram_update_task') as task:
+            post_update(UPDATE)
+
+        task.apply_async.assert_called_once()
+        assert task.apply_async.call_args.kwargs['args'] == [UPDATE]
+
+    @override_settings(TELEGRAM_ASYNC_WEBHOOK=False)
+    def test_failed_update_is_released_for_redelivery(self, mock_redis):
+        mock_redis.set.return_value = True
+        with patch('ai_engine.services.memory.get_redis_client', return_value=mock_redis), \
+                patch('telegram_bot.views.handle_update', side_effect=RuntimeError("db down")):
+            response = post_update(UPDATE)
+
+        assert response.status_code == 500
+        mock_redis.delete.assert_called_once_with("telegram_update:555")
+
+    @override_settings(TELEGRAM_ASYNC_WEBHOOK=False, TELEGRAM_STREAM_RESPONSES=False)
+    def test_ai_failure_is_not_cached(self, mock_redis):
+        """The apology text must not become the replayed answer of the message"""
+        from telegram_bot import services
+
+        mock_redis.set.return_value = True
+        mock_redis.get.return_value = None
+        lead = Mock()
+        with patch('ai_engine.services.memory.get_redis_client', return_value=mock_redis), \
+                patch.object(services.Lead.objects, 'get_or_create', return_value=(lead, True)), \
+                patch('ai_engine.services.conversation.AIConversationService._process_with_agents',
+                      side_effect=RuntimeError("llm down")), \
+                patch.object(services, 'send_telegram_message') as send:
+            response = post_update(UPDATE)
+
+        assert response.status_code == 500
+        mock_redis.setex.assert_not_called()
+        mock_redis.delete.assert_called_once_with("telegram_update:555")
+        send.assert_not_called()
+
+    def test_cached_response_skips_ai(self, mock_redis):
+        """Repeated (chat_id, message_id) replays the stored answer without an LLM call"""
+        from telegram_bot import services
+
+        mock_redis.get.return_value = "Готовый ответ".encode('utf-8')
+        lead = Mock()
+        with patch('ai_engine.services.memory.get_redis_client', return_value=mock_redis), \
+                patch.object(services.Lead.objects, 'get_or_create', return_value=(lead, True)), \
+                patch.object(services, 'AIConversationService') as ai_service, \
+                patch.object(services, 'send_telegram_message') as send:
+            services.handle_update(UPDATE)
+
+        ai_service.assert_not_called()
+        send.assert_called_once_with(777, "Готовый ответ")
+
+
+class TestUpdateTask:
+    """Queued updates survive worker crashes and transient failures"""
+
+    def test_task_is_acked_after_running(self):
+        from telegram_bot.tasks import process_telegram_update_task as task
+
+        assert task.acks_late and task.reject_on_worker_lost
+        assert ConnectionError in task.autoretry_for
+        assert task.max_retries == 3
+
+    def test_transient_error_is_retried(self):
+        from telegram_bot.tasks import process_telegram_update_task as task
+
+        with patch('telegram_bot.services.handle_update',
+                   side_effect=[ConnectionError("redis down"), None]) as handle, \
+                patch.object(task, 'retry_backoff', False):
+            result = task.apply(args=[UPDATE])
+
+        assert result.successful()
+        assert handle.call_count == 2
+
+    def test_bug_is_not_retried(self):
+        from telegram_bot.tasks import process_telegram_update_task as task
+
+        with patch('telegram_bot.services.handle_update', side_effect=KeyError('from')) as handle:
+            result = task.apply(args=[UPDATE])
+
+        assert result.failed()
+        handle.assert_called_once()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,109 @@
+"""
+Load tests for Telegram webhook ingestion
+Webhook p99 must stay flat in async mode while LLM latency rises
+"""
+
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from django.test import RequestFactory, override_settings
+
+from telegram_bot.views import TelegramWebhookView
+
+
+LLM_LATENCIES = [0.0, 0.05, 0.2]  # Simulated DeepSeek latency, seconds
+REQUESTS_PER_RUN = 40
+CONCURRENCY = 4  # gunicorn: 2 workers x 2 threads
+
+
+def make_update(update_id: int) -> bytes:
+    """Build a raw Telegram text update"""
+    return json.dumps({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'from': {'id': 1000 + update_id % 7, 'first_name': 'Иван'},
+            'chat': {'id': 1000 + update_id % 7},
+            'text': 'лишили прав за пьянку',
+        },
+    }, ensure_ascii=False).encode('utf-8')
+
+
+def p99(samples: list) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, int(len(ordered) * 0.99) - 1)]
+
+
+def fire_webhooks(count: int = REQUESTS_PER_RUN) -> list:
+    """POST updates to the webhook concurrently and return per-request latencies"""
+    factory = RequestFactory()
+    view = TelegramWebhookView.as_view()
+    latencies = []
+    lock = threading.Lock()
+
+    def post(update_id):
+        request = factory.post('/telegram/webhook/', data=make_update(update_id),
+                               content_type='application/json')
+        start = time.perf_counter()
+        response = view(request)
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200
+        with lock:
+            latencies.append(elapsed)
+
+    # Every update is new; dedup is covered in test_update_dedup.py
+    with patch('telegram_bot.views.UpdateDeduplicator') as dedup:
+        dedup.return_value.claim_update.return_value = True
+        with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+            list(pool.map(post, range(count)))
+    return latencies
+
+
+class TestWebhookLoad:
+    """Webhook latency under rising LLM latency"""
+
+    @override_settings(TELEGRAM_ASYNC_WEBHOOK=True)
+    def test_async_webhook_p99_stays_flat(self):
+        """Queued updates are acknowledged without waiting for the LLM"""
+        results = {}
+        for llm_latency in LLM_LATENCIES:
+            # Worker pool standing in for the Celery bot_worker
+            workers = ThreadPoolExecutor(max_workers=CONCURRENCY)
+            with patch('telegram_bot.views.process_telegram_update_task') as task, \
+                    patch('telegram_bot.views.handle_update') as inline:
+                task.apply_async.side_effect = lambda args, queue: workers.submit(time.sleep, llm_latency)
+                results[llm_latency] = p99(fire_webhooks())
+                assert task.apply_async.call_count == REQUESTS_PER_RUN
+                inline.assert_not_called()
+            workers.shutdown(wait=True)
+
+        assert max(results.values()) < 0.05, results
+        assert max(results.values()) - min(results.values()) < 0.03, results
+
+    @override_settings(TELEGRAM_ASYNC_WEBHOOK=False)
+    def test_inline_webhook_p99_tracks_llm_latency(self):
+        """Baseline: inline processing holds the request for the whole LLM call"""
+        llm_latency = LLM_LATENCIES[-1]
+        with patch('telegram_bot.views.handle_update',
+                   side_effect=lambda update: time.sleep(llm_latency)):
+            result = p99(fire_webhooks(count=8))
+
+        assert result >= llm_latency
+
+    @override_settings(TELEGRAM_ASYNC_WEBHOOK=True)
+    def test_enqueue_failure_falls_back_to_inline(self):
+        """Broker outage must not drop the update"""
+        with patch('telegram_bot.views.process_telegram_update_task') as task, \
+                patch('telegram_bot.views.handle_update') as inline:
+            task.apply_async.side_effect = ConnectionError("broker down")
+            fire_webhooks(count=1)
+
+        inline.assert_called_once()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
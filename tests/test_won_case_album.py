@@ -0,0 +1,183 @@
+"""
+Tests for won case images sent as one album
+Timing harness runs against stubbed image and Telegram Bot API servers
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ai_engine.services.conversation import AIConversationService
+from ai_engine.services.won_cases_sender import send_won_case_image, send_won_case_images
+from telegram_bot.client import RateLimiter, TelegramAPIError, TelegramClient
+from telegram_bot.file_cache import CachedFile, TelegramFileCache
+
+IMAGE_DELAY = 0.15  # Simulated avtourist.info download time, seconds
+TELEGRAM_DELAY = 0.1  # Simulated Bot API upload time, seconds
+
+
+def sent(file_id):
+    return {'message_id': 1, 'document': {'file_id': file_id}}
+
+
+@pytest.fixture
+def file_cache(fake_redis):
+    return TelegramFileCache(redis_client=fake_redis)
+
+
+class TestMediaGroup:
+    """Album assembly in TelegramFileCache"""
+
+    def test_cached_and_uploaded_files_in_one_album(self, file_cache):
+        file_cache.set('a', 'FILE_A')
+        client = Mock()
+        client.send_media_group.return_value = [sent('FILE_A'), sent('FILE_B')]
+        load_a = Mock()
+
+        file_cache.send_media_group(client, 42, [
+            CachedFile('a', load_a), CachedFile('b', lambda: b'jpeg', 'b.jpg', 'image/jpeg'),
+        ], caption='Дело')
+
+        load_a.assert_not_called()
+        chat_id, media = client.send_media_group.call_args.args
+        assert media == [
+            {'type': 'document', 'media': 'FILE_A'},
+            {'type': 'document', 'media': 'attach://file1', 'caption': 'Дело', 'parse_mode': 'HTML'},
+        ]
+        assert client.send_media_group.call_args.kwargs['files'] == {'file1': ('b.jpg', b'jpeg', 'image/jpeg')}
+        assert file_cache.get('b') == 'FILE_B'
+
+    def test_failed_download_is_left_out(self, file_cache):
+        client = Mock()
+        client.send_document.return_value = sent('FILE_B')
+
+        def broken():
+            raise IOError("404")
+
+        file_cache.send_media_group(client, 42, [CachedFile('a', broken), CachedFile('b', lambda: b'jpeg')])
+
+        client.send_media_group.assert_not_called()
+        assert client.send_document.call_args.args == (42, b'jpeg')
+
+    def test_rejected_file_id_uploads_album_again(self, file_cache):
+        file_cache.set('a', 'EXPIRED')
+        client = Mock()
+        client.send_media_group.side_effect = [
+            TelegramAPIError('sendMediaGroup', 400, 'Bad Request: wrong file identifier/HTTP URL specified'),
+            [sent('FILE_A'), sent('FILE_B')],
+        ]
+
+        file_cache.send_media_group(client, 42, [CachedFile('a', lambda: b'a'), CachedFile('b', lambda: b'b')])
+
+        assert set(client.send_media_group.call_args.kwargs['files']) == {'file0', 'file1'}
+        assert file_cache.get('a') == 'FILE_A'
+
+
+class TestBackgroundDelivery:
+    """SEND_WON_CASE_IMAGES does not block the reply"""
+
+    def test_command_queues_task(self):
+        service = AIConversationService.__new__(AIConversationService)
+        lead = Mock(telegram_id=42)
+        with patch('ai_engine.tasks.send_won_case_images_task') as task, \
+                patch('ai_engine.services.won_cases_sender.send_won_case_images') as send:
+            service._process_response_commands(lead, "Вот наши дела [SEND_WON_CASE_IMAGES:12.8]", "покажите")
+        task.apply_async.assert_called_once_with(args=[42, '12.8'])
+        send.assert_not_called()
+
+    def test_broker_down_sends_inline(self):
+        service = AIConversationService.__new__(AIConversationService)
+        with patch('ai_engine.tasks.send_won_case_images_task') as task, \
+                patch('ai_engine.services.won_cases_sender.send_won_case_images') as send:
+            task.apply_async.side_effect = ConnectionError("broker down")
+            service._send_won_case_images(42, '12.8')
+        send.assert_called_once_with(42, '12.8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Image server (GET) and Bot API (POST) with fixed latency"""
+
+    image_requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            type(self).image_requests += 1
+        time.sleep(IMAGE_DELAY)
+        self._reply(b'\xff\xd8' + b'0' * 50000, 'image/jpeg')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(TELEGRAM_DELAY)
+        if self.path.endswith('/sendMediaGroup'):
+            count = body.count(b'"type": "document"')
+            result = [sent(f"FILE_{i}_{len(body)}") for i in range(count)]
+        else:
+            result = sent(f"FILE_{len(body)}")
+        self._reply(json.dumps({'ok': True, 'result': result}).encode(), 'application/json')
+
+    def _reply(self, payload, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    StubHandler.image_requests = 0
+    with patch('telegram_bot.client.API_BASE', base):
+        yield base
+    server.shutdown()
+    server.server_close()
+
+
+class TestAlbumTiming:
+    """Concurrent downloads + one sendMediaGroup vs. the previous serial download/upload per image"""
+
+    def test_album_is_faster_than_serial_sends(self, stub_server, file_cache):
+        images = [{'url': f"{stub_server}/images/Решение_{i}.jpg", 'filename': f"{i}.jpg"} for i in range(3)]
+        cases = [{'title': 'Дело', 'article': '12.8', 'images': images}]
+        client = TelegramClient(token='TOKEN', limiter=RateLimiter(global_rate=1000, chat_rate=1000, chat_burst=1000))
+
+        with patch('ai_engine.services.won_cases_sender.get_telegram_client', return_value=client), \
+                patch('ai_engine.services.won_cases_sender.get_won_cases_by_article', return_value=cases), \
+                patch('ai_engine.services.won_cases_sender.get_telegram_file_cache', return_value=file_cache):
+            start = time.perf_counter()
+            for img_data in images:
+                send_won_case_image(42, img_data, 'Дело')
+            serial = time.perf_counter() - start
+
+            file_cache.redis_client.delete('telegram_file_ids')
+            file_cache._local.clear()
+            StubHandler.image_requests = 0
+            start = time.perf_counter()
+            send_won_case_images(42, '12.8')
+            album = time.perf_counter() - start
+            assert StubHandler.image_requests == 3
+
+            start = time.perf_counter()
+            send_won_case_images(43, '12.8')
+            cached = time.perf_counter() - start
+            assert StubHandler.image_requests == 3  # file_ids reused, nothing downloaded
+
+        print(f"\nserial {serial * 1000:.0f}ms, album {album * 1000:.0f}ms, cached album {cached * 1000:.0f}ms")
+        assert serial >= 3 * (IMAGE_DELAY + TELEGRAM_DELAY)
+        assert album < serial * 0.6
+        assert cached < album
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
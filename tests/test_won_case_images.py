@@ -0,0 +1,113 @@
+"""
+Tests for the local won case image mirror
+"""
+
+import io
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from django.test import override_settings
+from PIL import Image
+
+from ai_engine.data.won_case_images import WonCaseImageMirror, local_image_path
+from ai_engine.data.won_cases_scraper import WonCasesScraper
+from ai_engine.services.won_cases_sender import image_key, load_image
+
+URL = 'https://avtourist.info/images/delo/ст.12.8 дело_1of2.jpg'
+
+
+def make_jpeg(size=(1600, 2200), color='white') -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', size, color).save(output, 'JPEG', quality=95)
+    return output.getvalue()
+
+
+def response(status_code=200, content=b'', etag=None):
+    return Mock(status_code=status_code, content=content, headers={'ETag': etag} if etag else {},
+                raise_for_status=Mock())
+
+
+@pytest.fixture
+def images_dir(tmp_path):
+    directory = tmp_path / 'won_cases_images'
+    with override_settings(WON_CASE_IMAGES_DIR=str(directory)):
+        yield directory
+
+
+@pytest.fixture
+def session():
+    session = Mock()
+    session.get.return_value = response(content=make_jpeg(), etag='"v1"')
+    return session
+
+
+class TestWonCaseImageMirror:
+    """Content-addressed originals and Telegram renditions"""
+
+    def test_mirror_stores_original_and_rendition(self, images_dir, session):
+        img = WonCaseImageMirror(session=session, max_side=1280, quality=80).mirror({'url': URL, 'filename': 'a.jpg'})
+
+        assert img['filename'] == 'a.jpg'
+        assert img['local'] == f"originals/{img['sha256'][:2]}/{img['sha256']}.jpg"
+        assert img['telegram'].endswith('_1280q80.jpg')
+        assert session.get.call_args.args[0].endswith('%D1%81%D1%82.12.8%20%D0%B4%D0%B5%D0%BB%D0%BE_1of2.jpg')
+        with Image.open(images_dir / img['telegram']) as rendition:
+            assert max(rendition.size) == 1280
+            assert rendition.format == 'JPEG'
+        assert (images_dir / img['telegram']).stat().st_size < (images_dir / img['local']).stat().st_size
+
+    def test_same_content_is_stored_once(self, images_dir, session):
+        mirror = WonCaseImageMirror(session=session)
+        first = mirror.mirror({'url': URL})
+        second = mirror.mirror({'url': URL.replace('1of2', 'copy')})
+        assert first['local'] == second['local']
+        assert len(list((images_dir / 'originals').rglob('*.jpg'))) == 1
+
+    def test_second_run_uses_conditional_get(self, images_dir, session):
+        WonCaseImageMirror(session=session).mirror_cases([{'images': [{'url': URL}]}])
+        rendition = next((images_dir / 'telegram').rglob('*.jpg'))
+        mtime = rendition.stat().st_mtime_ns
+        session.get.return_value = response(304)
+
+        cases = WonCaseImageMirror(session=session).mirror_cases([{'images': [{'url': URL}]}])
+
+        assert session.get.call_args.kwargs['headers']['If-None-Match'] == '"v1"'
+        assert cases[0]['images'][0]['telegram'] == str(rendition.relative_to(images_dir))
+        assert rendition.stat().st_mtime_ns == mtime
+
+    def test_failed_download_keeps_remote_url(self, images_dir, session):
+        session.get.return_value = response(500)
+        session.get.return_value.raise_for_status.side_effect = IOError("500")
+        assert WonCaseImageMirror(session=session).mirror({'url': URL}) == {'url': URL}
+
+
+class TestLocalSends:
+    """Mirrored images are read from disk"""
+
+    def test_load_image_without_network(self, images_dir, session):
+        img = WonCaseImageMirror(session=session).mirror({'url': URL})
+        with patch('ai_engine.services.won_cases_sender.requests.get', side_effect=AssertionError("network")):
+            assert load_image(img) == (images_dir / img['telegram']).read_bytes()
+        assert image_key(img) == img['telegram']
+
+    def test_unmirrored_image_is_downloaded(self, images_dir):
+        assert local_image_path({'url': URL, 'telegram': 'telegram/xx/missing.jpg'}) is None
+        with patch('ai_engine.services.won_cases_sender.requests.get', return_value=Mock(status_code=200, content=b'jpeg')):
+            assert load_image({'url': URL}) == b'jpeg'
+        assert image_key({'url': URL}) == URL
+
+    def test_scraper_records_paths(self, images_dir, tmp_path, session):
+        scraper = WonCasesScraper()
+        scraper.data_file = tmp_path / 'won_cases.json'
+        cases = [{'title': 'Дело', 'article': '12.8', 'images': [{'url': URL}]}]
+        with patch('ai_engine.data.won_case_images.requests.Session', return_value=session), \
+                patch('ai_engine.data.won_cases_db.get_won_cases_db'):
+            scraper.mirror_images(cases)
+            scraper._save_cases(cases)
+        saved = json.loads(scraper.data_file.read_text(encoding='utf-8'))
+        assert local_image_path(saved[0]['images'][0]).exists()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
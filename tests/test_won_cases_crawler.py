@@ -0,0 +1,224 @@
+"""
+Tests for the incremental won cases crawler against saved HTML fixtures
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from ai_engine.data import won_cases_scraper
+from ai_engine.data.won_cases_scraper import WonCasesScraper
+
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'won_cases'
+BASE_URL = "https://avtourist.info/vyigrannye-dela"
+CASE_URLS = [
+    f"{BASE_URL}/item/2893-otmena-lisheniya-po-st-12-8",
+    f"{BASE_URL}/item/2900-vyezd-na-vstrechku-12-15",
+    f"{BASE_URL}/item/3001-otkaz-ot-medosvidetelstvovaniya",
+]
+
+
+def page(name):
+    return (FIXTURES / name).read_bytes()
+
+
+class FakeSession:
+    """Serves fixture pages with ETags, honours If-None-Match and tracks concurrency"""
+
+    def __init__(self, delay=0.0):
+        self.pages = {
+            BASE_URL: page('listing_page1.html'),
+            f"{BASE_URL}?start=2": page('listing_page2.html'),
+            CASE_URLS[0]: page('item_2893.html'),
+            CASE_URLS[1]: page('item_2900.html'),
+            CASE_URLS[2]: page('item_3001.html'),
+        }
+        self.delay = delay
+        self.requests = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None):
+        with self._lock:
+            self.requests.append((url, dict(headers or {})))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        html = self.pages.get(url)
+        if html is None:
+            response = Mock(status_code=404, headers={})
+            response.raise_for_status.side_effect = requests.HTTPError("404 error")
+            return response
+        etag = f'"{hash(html)}"'
+        status = 304 if (headers or {}).get('If-None-Match') == etag else 200
+        return Mock(status_code=status, content=html, headers={'ETag': etag})
+
+    def fetched(self):
+        return [url for url, _ in self.requests]
+
+
+@pytest.fixture
+def session():
+    return FakeSession()
+
+
+@pytest.fixture
+def make_scraper(tmp_path):
+    def make(session, concurrency=4, rate=1000):
+        scraper = WonCasesScraper(session=session, concurrency=concurrency, rate=rate)
+        scraper.data_file = tmp_path / 'won_cases.json'
+        scraper.http_cache_file = tmp_path / 'won_cases_http_cache.json'
+        scraper.images_dir = tmp_path / 'won_cases_images'
+        return scraper
+
+    def mirror_images(cases):
+        # Records a rendition per image, as WonCaseImageMirror does
+        for case in cases:
+            for img in case['images']:
+                img['telegram'] = f"telegram/{abs(hash(img['url']))}.jpg"
+                rendition = tmp_path / 'won_cases_images' / img['telegram']
+                rendition.parent.mkdir(parents=True, exist_ok=True)
+                rendition.write_bytes(b'jpeg')
+        return cases
+
+    with patch.object(WonCasesScraper, 'mirror_images', side_effect=mirror_images) as mirror, \
+            patch('ai_engine.data.won_cases_db.get_won_cases_db'):
+        make.mirror = mirror
+        yield make
+
+
+class TestCrawl:
+    """Listing pages, pagination and detail pages"""
+
+    def test_first_crawl(self, make_scraper, session):
+        scraper = make_scraper(session)
+        cases = scraper.scrape_won_cases()
+
+        assert [case['url'] for case in cases] == CASE_URLS
+        assert sorted(set(session.fetched())) == sorted([BASE_URL, f"{BASE_URL}?start=2"] + CASE_URLS)
+        assert len(session.fetched()) == 5  # start=0 is page 1, /kontakty is not a listing
+
+        dui, oncoming, refusal = cases
+        assert dui['article'] == '12.8'
+        assert dui['category'] == 'Пьяная езда'
+        assert dui['description'].startswith('Клиента обвинили в управлении')
+        assert [img['url'] for img in dui['images']] == [
+            'https://avtourist.info/images/delo/ст.12.8 дело 5-44-16_1of2.jpg',
+            'https://avtourist.info/images/delo/ст.12.8 дело 5-44-16_2of2.jpg',
+        ]
+        assert dui['image_count'] == 2
+        # No images on the detail page: listing images of the same article
+        assert [img['alt'] for img in oncoming['images']] == ['ст.12.15 дело 12-77-17_1of1']
+        assert refusal['article'] == '12.26'
+        assert refusal['images'][0]['filename'] == 'ст.12.26 дело 5-301-18_1of1-fill-200x300.jpg'
+
+        assert json.loads(scraper.data_file.read_text(encoding='utf-8')) == cases
+        make_scraper.mirror.assert_called_once_with(cases)
+
+    def test_unchanged_site_is_not_rewritten(self, make_scraper, session):
+        make_scraper(session).scrape_won_cases()
+        scraper = make_scraper(session)
+        mtime = scraper.data_file.stat().st_mtime_ns
+        session.requests.clear()
+        make_scraper.mirror.reset_mock()
+
+        cases = scraper.scrape_won_cases()
+
+        assert len(cases) == 3
+        assert all('If-None-Match' in headers for _, headers in session.requests)
+        assert scraper.data_file.stat().st_mtime_ns == mtime
+        make_scraper.mirror.assert_not_called()
+
+    def test_only_changed_case_is_updated(self, make_scraper, session):
+        make_scraper(session).scrape_won_cases()
+        stored = json.loads((make_scraper(session).data_file).read_text(encoding='utf-8'))
+        stored[0]['images'][0]['telegram'] = 'telegram/ab/mirrored.jpg'  # Added by the image mirror
+        (make_scraper(session).images_dir / 'telegram' / 'ab').mkdir(parents=True)
+        (make_scraper(session).images_dir / 'telegram' / 'ab' / 'mirrored.jpg').write_bytes(b'jpeg')
+        make_scraper(session).data_file.write_text(json.dumps(stored, ensure_ascii=False), encoding='utf-8')
+        session.pages[CASE_URLS[1]] = session.pages[CASE_URLS[1]].replace('отсутствовала'.encode(), 'была стерта'.encode())
+        make_scraper.mirror.reset_mock()
+
+        cases = make_scraper(session).scrape_won_cases()
+
+        assert 'была стерта' in cases[1]['description']
+        assert cases[0]['images'][0]['telegram'] == 'telegram/ab/mirrored.jpg'
+        make_scraper.mirror.assert_called_once_with([cases[1]])
+
+    def test_unmirrored_case_is_mirrored_again(self, make_scraper, session):
+        scraper = make_scraper(session)
+        cases = scraper.scrape_won_cases()
+        (scraper.images_dir / cases[2]['images'][0]['telegram']).unlink()
+        make_scraper.mirror.reset_mock()
+
+        cases = make_scraper(session).scrape_won_cases()
+
+        make_scraper.mirror.assert_called_once_with([cases[2]])
+        assert (scraper.images_dir / cases[2]['images'][0]['telegram']).exists()
+
+    def test_failed_save_keeps_http_cache(self, make_scraper, session):
+        scraper = make_scraper(session)
+        scraper.scrape_won_cases()
+        http_cache = scraper.http_cache_file.read_bytes()
+        session.pages[CASE_URLS[1]] = session.pages[CASE_URLS[1]].replace('отсутствовала'.encode(), 'была стерта'.encode())
+
+        def write_json_atomic(path, data, indent=None):
+            if path == scraper.data_file:
+                raise OSError("disk full")
+            return real_write(path, data, indent=indent)
+
+        real_write = won_cases_scraper.write_json_atomic
+        with patch.object(won_cases_scraper, 'write_json_atomic', side_effect=write_json_atomic):
+            make_scraper(session).scrape_won_cases()
+
+        # Validators of the unsaved crawl would turn the next run into 304s
+        assert scraper.http_cache_file.read_bytes() == http_cache
+        assert 'была стерта' in make_scraper(session).scrape_won_cases()[1]['description']
+        assert 'была стерта' in scraper.data_file.read_text(encoding='utf-8')
+
+    def test_removed_case_and_failed_detail_page(self, make_scraper, session):
+        make_scraper(session).scrape_won_cases()
+        session.pages[f"{BASE_URL}?start=2"] = page('listing_page2.html').replace(b'item/3001', b'item/3002')
+        del session.pages[CASE_URLS[0]]
+
+        cases = make_scraper(session).scrape_won_cases()
+
+        assert [case['url'] for case in cases] == CASE_URLS[:2] + [f"{BASE_URL}/item/3002-otkaz-ot-medosvidetelstvovaniya"]
+        # 404 on a detail page keeps the stored case
+        assert cases[0]['description'].startswith('Клиента обвинили')
+
+    def test_failed_listing_page_keeps_file(self, make_scraper, session):
+        scraper = make_scraper(session)
+        scraper.scrape_won_cases()
+        before = scraper.data_file.read_bytes()
+        del session.pages[f"{BASE_URL}?start=2"]
+
+        assert make_scraper(session).scrape_won_cases() == []
+        assert scraper.data_file.read_bytes() == before
+
+
+class TestPoliteness:
+    """Bounded concurrency and per-host rate"""
+
+    def test_concurrency_is_bounded(self, make_scraper):
+        session = FakeSession(delay=0.05)
+        make_scraper(session, concurrency=2).scrape_won_cases()
+        assert session.peak == 2
+
+    def test_per_host_rate(self, make_scraper, session):
+        start = time.perf_counter()
+        make_scraper(session, concurrency=4, rate=20).scrape_won_cases()
+        # 5 requests to one host at 20/s: the last one waits ~0.2s
+        assert time.perf_counter() - start >= 0.18
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,115 @@
+"""
+Tests for the article/chapter index of WonCasesDB
+"""
+
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from ai_engine.data.won_cases_db import WonCasesDB
+from ai_engine.data.won_cases_scraper import WonCasesScraper
+
+
+def case(title, article, images=0):
+    return {'title': title, 'article': article, 'images': [{'url': f'https://example.com/{title}_{i}.jpg'} for i in range(images)]}
+
+
+CASES = [
+    case('a', '12.8'),
+    case('b', '12.8', images=1),
+    case('c', '12.9'),
+    case('d', '12.8', images=3),
+    case('e', '12.15', images=2),
+    case('f', ''),
+    case('g', '8.23'),
+]
+
+
+def linear_get_by_article(cases, article):
+    """Previous implementation, kept as the reference for which cases qualify"""
+    matching = [c for c in cases if c.get('article') == article]
+    if not matching:
+        matching = [c for c in cases if c.get('article', '').startswith(article.split('.')[0])]
+    return matching[:5]
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    data_file = tmp_path / 'won_cases.json'
+
+    def make(cases):
+        data_file.write_text(json.dumps(cases, ensure_ascii=False), encoding='utf-8')
+        db = WonCasesDB()
+        db.data_file = data_file
+        db.reload()
+        return db
+
+    with override_settings(KNOWLEDGE_RELOAD_INTERVAL=0):
+        yield make
+
+
+class TestGetByArticle:
+    """Dictionary lookups ranked by image availability"""
+
+    def test_exact_article_images_first(self, make_db):
+        db = make_db(CASES)
+        assert [c['title'] for c in db.get_by_article('12.8')] == ['d', 'b', 'a']
+
+    def test_chapter_fallback(self, make_db):
+        db = make_db(CASES)
+        assert [c['title'] for c in db.get_by_article('12.26')] == ['d', 'e', 'b', 'a', 'c']
+        assert db.get_by_article('99.1') == []
+
+    def test_top_five(self, make_db):
+        db = make_db([case(str(i), '12.8', images=i % 2) for i in range(10)])
+        result = db.get_by_article('12.8')
+        assert len(result) == 5
+        assert all(c['images'] for c in result)
+
+    @pytest.mark.parametrize("article", ['12.8', '12.14', '12.9', '8.23', '', '27.12'])
+    def test_same_cases_as_linear_scan_on_real_data(self, article):
+        db = WonCasesDB()
+        expected = linear_get_by_article(db.cases, article)
+        result = db.get_by_article(article)
+        assert len(result) == len(expected)
+        qualifying = [c for c in db.cases if c.get('article') == article] or [
+            c for c in db.cases if c.get('article', '').split('.')[0] == article.split('.')[0]
+        ]
+        assert all(c in qualifying for c in result)
+
+    def test_lookup_is_flat_in_case_count(self, make_db):
+        def timed(db):
+            start = time.perf_counter()
+            for _ in range(2000):
+                db.get_by_article('12.26')
+            return time.perf_counter() - start
+
+        small = min(timed(make_db(CASES)) for _ in range(3))
+        large = min(timed(make_db(CASES * 500)) for _ in range(3))
+        assert large < small * 3
+
+
+class TestReload:
+    """Index follows new data written by the scraper"""
+
+    def test_reload_if_changed(self, make_db):
+        db = make_db(CASES)
+        assert db.reload_if_changed() is False
+        db.data_file.write_text(json.dumps([case('new', '12.8', images=1)]), encoding='utf-8')
+        db.data_mtime -= 1  # Same-tick rewrites still count as a change
+        assert db.reload_if_changed() is True
+        assert [c['title'] for c in db.get_by_article('12.8')] == ['new']
+
+    def test_scraper_save_reloads_singleton(self, tmp_path):
+        scraper = WonCasesScraper()
+        scraper.data_file = tmp_path / 'won_cases.json'
+        with patch('ai_engine.data.won_cases_db.get_won_cases_db') as get_db:
+            scraper._save_cases(CASES)
+        get_db.return_value.reload.assert_called_once()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])